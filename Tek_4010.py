@@ -1,5 +1,4 @@
 """Tektronix 4010 Graphics Terminal Emulator"""
-import time
 import logging
 import PySimpleGUI as sg
 
@@ -25,8 +24,6 @@ class T4010_Console:
         self.pdp11 = pdp11
         self.dl11 = pdp11.dl11
         logging.info(f'T4010 dl11:{self.dl11}')
-        self.lock = pdp11.lock
-        logging.info(f'T4010 lock:{self.lock}')
         self.window_cycles = 0
         self.buffer = 0  # for holding LF after CR was sent
         self.window = 0
@@ -90,20 +87,6 @@ class T4010_Console:
 
         # autoscroll=True,
 
-    def wait_for_rcsr_done_get_lock(self):
-        """get lock, read RCSR. If it's done, keep the lock"""
-        #logging.debug('wait_for_rcsr_done_get_lock')
-        self.lock.acquire()
-        rcsr = self.dl11.read_RCSR()
-        while (rcsr & self.dl11.RCSR_RCVR_DONE) != 0:
-            #logging.debug('wait_for_rcsr_done_get_lock loop')
-            self.lock.release()
-            time.sleep(0.1)
-            self.lock.acquire()
-            rcsr = self.dl11.read_RCSR()
-        #logging.debug('got RCSR_DONE and lock')
-        # RCSR_RCVR_DONE == 0 and we have the python event lock
-
     def window_cycle(self):
         '''One PySimpleGUI window_cycle'''
         # parameters from PDP11
@@ -125,20 +108,10 @@ class T4010_Console:
         #pc_lights = self.window['pc_lights']
         #pc_lights.update(self.pc_to_blinky_lights())
 
-        # If there's a character in the dl11 transmit buffer,
-        # then send it to the display
-        self.lock.acquire()
-        #logging.debug(f'T4010 got lock {self.window_cycles}')
-        if (self.dl11.read_XCSR() & self.dl11.XCSR_XMIT_RDY) == 0:
-            XBUF = self.dl11.read_XBUF() # read_XBUF is supposed to set XCSR to XCSR_XMIT_RDY
-            logging.info(
-                f'cycle {self.window_cycles} {self.pdp11.CPU_cycles} dl11 XBUF sent us ' +
-                f'{oct(XBUF)} {XBUF} {self.safe_character(XBUF)}')
-
-            XCSR = self.dl11.read_XCSR()
-            if (XCSR & self.dl11.XCSR_XMIT_RDY) != self.dl11.XCSR_XMIT_RDY:
-                logging.error(f'XCSR {oct(XCSR)} was not set with {oct(self.dl11.XCSR_XMIT_RDY)}')
-
+        # Send whatever the dl11 has transmitted to the display.
+        # The dl11 keeps it in a FIFO, so this takes no lock and never holds up the CPU.
+        XBUF = self.dl11.transmitted_character()
+        while XBUF is not None:
             # Sure, DL11 can send us nulls; I just won't show them.
             if XBUF != 0:
                 # deal specially with <o15><o12> <13><11> CR LF
@@ -146,8 +119,7 @@ class T4010_Console:
                 # call update or cprint with key
                 if XBUF != 13:
                     sg.cprint(chr(XBUF), end='', sep='', autoscroll=True)
-        self.lock.release()
-        #logging.debug(f'T4010 release lock {self.window_cycles}')
+            XBUF = self.dl11.transmitted_character()
 
         event, values = self.window.read(timeout=0)
         # If the Enter key was hit
@@ -155,10 +127,7 @@ class T4010_Console:
         if event == 'keyboard_Enter':
             self.window['keyboard'].Update('')
             #logging.debug(f'{self.window_cycles} sending DL11 0o12 "CR"')
-            self.wait_for_rcsr_done_get_lock()
-            self.dl11.write_RBUF(0o15)
-            #logging.debug(f'T4010 released lock {self.window_cycles}')
-            self.lock.release()
+            self.dl11.type_character(0o15)
 
         # If there's a keyboard event
         # then send the character to the serial interface
@@ -167,10 +136,7 @@ class T4010_Console:
             self.window['keyboard'].Update('')
             o = ord(kbd[0:1])
             #logging.debug(f'{self.window_cycles} sending DL11 {o} {self.safe_character(o)}')
-            self.wait_for_rcsr_done_get_lock()
-            self.dl11.write_RBUF(o)
-            #logging.debug(f'T4010 released lock {self.window_cycles}')
-            self.lock.release()
+            self.dl11.type_character(o)
 
         if event in (sg.WIN_CLOSED, 'Quit'):  # if user closes window or clicks cancel
             #logging.debug('Quit')
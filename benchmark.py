@@ -0,0 +1,207 @@
+"""benchmark.py - run fixed guest workloads headlessly and report how fast the emulator runs them
+
+python3 benchmark.py                          run every workload and write benchmark_results.json
+python3 benchmark.py echo m9301_ya            run some of them
+python3 benchmark.py --save-baseline          also keep the results as benchmark_baseline.json
+python3 benchmark.py --threshold 10           exit 1 if a workload is more than 10% slower than the baseline
+
+Each workload runs in a fresh python process so its peak RSS is its own.
+The workloads feed and read the DL11 from a device poll instead of a console,
+and log only warnings while they're timed, so the results measure the emulator.
+"""
+import sys
+import json
+import time
+import logging
+import argparse
+import resource
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from pdp11 import PDP11
+from pdp11_boot import pdp11Boot
+from pdp11_serial import Serial
+
+RESULTS_FILE = 'benchmark_results.json'
+BASELINE_FILE = 'benchmark_baseline.json'
+# percent slower than the baseline that counts as a regression
+THRESHOLD = 10
+# instructions, including ones idled through, after which a workload that hasn't finished is wrong
+LIMIT = 100000000
+# basic_load times pdp11Boot.load_absolute_tape, which is Python rather than guest code,
+# so its rate is reported but not compared against the baseline; a wrong load still fails.
+# BASIC itself can't be a guest workload until TRAP is implemented.
+NOT_COMPARED = ['basic_load']
+
+hello_world = [0o012702,  # 2000 start:  MOV #177564,R2  ; r2 points to DL11 XCSR
+               0o177564,  # 2002
+               0o012701,  # 2004         MOV #2032,R1    ; r1 points to current char
+               0o002032,  # 2006
+               0o112100,  # 2010 nxtchr: MOVB (R1)+,R0   ; load xmt char
+               0o001405,  # 2012         BEQ done        ; string is terminated with 0
+               0o110062,  # 2014         MOVB R0,2(R2)   ; write char to transmit buffer
+               0o000002,  # 2016
+               0o105712,  # 2020 wait:   TSTB (R2)       ; character transmitted?
+               0o100376,  # 2022         BPL wait        ; no, loop
+               0o000771,  # 2024         BR nxtchr       ; transmit next character
+               0o000000,  # 2026 done:   HALT
+               0o000763]  # 2030         BR start
+                          # 2032         "Hello, World!"
+
+# Each workload sets up pdp11 before the clock starts, then returns a function that does the timed work.
+# That function returns (units of work done, unit, whether the output was right).
+
+def workload_hello_world(pdp11):
+    """hello_world.py's program printing a long message"""
+    boot = pdp11Boot(pdp11.reg, pdp11.ram)
+    boot.load_machine_code(hello_world, 0o2000)
+    message = "Hello, World!\r\n" * 1000
+    address = 0o2032
+    for character in message + chr(0):
+        pdp11.ram.write_byte(address, ord(character))
+        address = address + 1
+    pdp11.reg.set_pc(0o2000, "benchmark")
+    serial = Serial(pdp11.dl11)
+    pdp11.device_polls.append(serial.poll)
+
+    def run():
+        pdp11.run_until(lambda pdp11: False, LIMIT)
+        serial.poll()
+        return pdp11.CPU_cycles, 'instructions', serial.text() == message
+    return run
+
+def workload_echo(pdp11):
+    """pdp11Boot.echo echoing typed lines"""
+    boot = pdp11Boot(pdp11.reg, pdp11.ram)
+    boot.load_machine_code(boot.echo, boot.echo_address)
+    script = "THE QUICK BROWN FOX JUMPS OVER THE LAZY DOG\r" * 100
+    serial = Serial(pdp11.dl11, script)
+    pdp11.device_polls.append(serial.poll)
+
+    def run():
+        pdp11.run_until(lambda pdp11: len(serial.output) == len(script), LIMIT)
+        return pdp11.CPU_cycles, 'instructions', serial.text() == script
+    return run
+
+def workload_m9301_ya(pdp11):
+    """the M9301-YA diagnostics from power up, then console commands typed at its $ prompt"""
+    boot = pdp11Boot(pdp11.reg, pdp11.ram)
+    boot.read_pdp11_assembly_file('source/M9301-YA.txt')
+    pdp11.reg.set_pc(0o173000, "benchmark")
+    script = 'L 1000\r' + 'E\r' * 100
+    serial = Serial(pdp11.dl11, script)
+    pdp11.device_polls.append(serial.poll)
+
+    def prompted(pdp11):
+        return serial.typed == len(script) and serial.output[-2:] == ['$', '\x00']
+
+    def run():
+        pdp11.run_until(prompted, LIMIT)
+        return pdp11.CPU_cycles, 'instructions', prompted(pdp11) and serial.text().count('$') > script.count('\r')
+    return run
+
+def workload_basic_load(pdp11):
+    """loading the BASIC paper tape with the absolute loader format, 20 times"""
+    boot = pdp11Boot(pdp11.reg, pdp11.ram)
+    tape = boot.read_tape('source/pdp11basic.json')
+
+    def run():
+        right = True
+        for repeat in range(20):
+            right = right and boot.load_absolute_tape(tape) == 0o16104
+        return 20 * len(tape), 'bytes', right
+    return run
+
+WORKLOADS = {'hello_world': workload_hello_world,
+             'echo': workload_echo,
+             'm9301_ya': workload_m9301_ya,
+             'basic_load': workload_basic_load}
+
+def run_workload(name):
+    """Set up and time one workload. Run this in a fresh process.
+    Returns a dictionary of results."""
+    pdp11 = PDP11()
+    run = WORKLOADS[name](pdp11)
+    logging.disable(logging.INFO)
+    start = time.perf_counter()
+    work, unit, right = run()
+    wall_time = time.perf_counter() - start
+    logging.disable(logging.NOTSET)
+    # ru_maxrss is in kilobytes on Linux
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return {'workload': name,
+            'work': work,
+            'unit': unit,
+            'wall_time': wall_time,
+            'rate': work / wall_time,
+            'peak_rss_kb': peak_rss,
+            'right': right}
+
+def run_workloads(names):
+    """run each workload in its own process and return {name: results}"""
+    results = {}
+    context = multiprocessing.get_context('spawn')
+    for name in names:
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+            results[name] = pool.submit(run_workload, name).result()
+    return results
+
+def compare(results, baseline, threshold=THRESHOLD):
+    """Returns [(name, percent change in rate)] for every workload in both except NOT_COMPARED,
+    and [names] of the ones that are more than threshold percent slower than the baseline
+    or whose output was wrong."""
+    changes = []
+    regressions = []
+    for name, result in results.items():
+        if not result['right']:
+            regressions.append(name)
+        if name not in baseline or name in NOT_COMPARED:
+            continue
+        change = 100 * (result['rate'] - baseline[name]['rate']) / baseline[name]['rate']
+        changes.append((name, change))
+        if change < -threshold and name not in regressions:
+            regressions.append(name)
+    return changes, regressions
+
+def main(arguments):
+    """run the benchmarks named in arguments; returns the exit status"""
+    parser = argparse.ArgumentParser(description='run PDP11 emulator benchmarks')
+    parser.add_argument('workloads', nargs='*', default=list(WORKLOADS),
+                        help=f'workloads to run, from {", ".join(WORKLOADS)}; all of them if none are given')
+    parser.add_argument('--results', default=RESULTS_FILE, help='json file to write the results to')
+    parser.add_argument('--baseline', default=BASELINE_FILE, help='json file of results to compare against')
+    parser.add_argument('--threshold', type=float, default=THRESHOLD,
+                        help='percent slower than the baseline that fails')
+    parser.add_argument('--save-baseline', action='store_true', help='also write the results to the baseline file')
+    options = parser.parse_args(arguments)
+    for name in options.workloads:
+        if name not in WORKLOADS:
+            parser.error(f'unknown workload {name}')
+
+    results = run_workloads(options.workloads)
+    with open(options.results, 'w') as jsonfile:
+        json.dump(results, jsonfile, indent=2)
+    print('workload          work unit           wall s        rate  peak RSS kB  right')
+    for name, result in results.items():
+        print(f"{name:12} {result['work']:9d} {result['unit']:12} {result['wall_time']:8.3f} "
+              f"{result['rate']:11.0f} {result['peak_rss_kb']:12d}  {result['right']}")
+
+    if options.save_baseline:
+        with open(options.baseline, 'w') as jsonfile:
+            json.dump(results, jsonfile, indent=2)
+        return 0
+    try:
+        with open(options.baseline, 'r') as jsonfile:
+            baseline = json.load(jsonfile)
+    except FileNotFoundError:
+        print(f'no baseline in {options.baseline}')
+        baseline = {}
+    changes, regressions = compare(results, baseline, options.threshold)
+    for name, change in changes:
+        print(f'{name:12} {change:+7.1f}% against the baseline')
+    for name in regressions:
+        print(f'{name} regressed')
+    return 1 if regressions else 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -1,10 +1,9 @@
 """PDP-11 Emulator"""
 import time
 import logging
-from multiprocessing import Process, Lock
-import traceback
+import threading
+from multiprocessing import Process
 
-import pdp11_util as u
 from pdp11_logger import Logger
 from pdp11_config import Config
 from pdp11_hardware import Registers as reg
@@ -12,6 +11,7 @@ from pdp11_hardware import Ram
 from pdp11_hardware import PSW
 from pdp11_hardware import Stack
 from pdp11_hardware import AddressModes as am
+from pdp11_mmu import MMU
 
 from pdp11_br_ops import br_ops
 from pdp11_cc_ops import cc_ops
@@ -20,14 +20,21 @@ from pdp11_other_ops import other_ops
 from pdp11_rss_ops import rss_ops
 from pdp11_ss_ops import ss_ops
 from pdp11_ssdd_ops import ssdd_ops
+from pdp11_decode import DecodeTable
+from pdp11_icache import InstructionCache
+from pdp11_blocks import BlockCompiler
+from pdp11_disassembler import Disassembler
+from pdp11_idle import IdleLoops
+from pdp11_histogram import InstructionHistogram
+from pdp11_profiler import Profiler
+from pdp11_profiler import Symbols
+from pdp11_trace import InstructionTrace
+import pdp11_snapshot
 
 from pdp11_dl11 import DL11
 from pdp11_terminal import Terminal
-from pdp11_vt52_Console import VT52_Console
-from pdp11_tek4010_Console import TEK4010_Console
 from pdp11_boot import pdp11Boot as boot
 from pdp11_m9301 import M9301
-from pdp11_rk11 import RK11
 from stopwatches import StopWatches as sw
 
 # boot.load_machine_code(boot.bootstrap_loader, bootaddress)
@@ -50,36 +57,87 @@ from stopwatches import StopWatches as sw
 # https://docs.python.org/3/library/multiprocessing.html#exchanging-objects-between-processes
 # the i/o page becomes the shared object.
 
+# limits for adaptive burst sizes
+BURST_MINIMUM = 100
+BURST_MAXIMUM = 1000000
+
 class PDP11():
     """Timber's PDP11 emulator"""
     def __init__(self, ui="None"):
         """instantiate the PDP11 emulator components"""
         Logger()
         logging.info(f'pdp11CPU initializing with ui={ui}')
-        self.sw = sw()
-        self.lock = threading.Lock() # *** no threading
-
         config = Config()
+        # StopWatches can be turned off or sampled, because timing every instruction slows it down a lot
+        self.sw = sw(config.lookup('stopwatches', 'enabled'), config.lookup('stopwatches', 'sample'),
+                     config.lookup('stopwatches', 'histograms'))
+        self.lock = threading.Lock() # *** no threading
 
         # hardware
         self.reg = reg()
         self.ram = Ram(self.lock, self.reg, config.lookup('ram', 'bits'))
         self.psw = PSW(self.ram)
+        # Memory bigger than 16 bits is reached through the KT11 memory management unit.
+        # While it's mapping, the caches below, which are by virtual address, aren't used.
+        self.mmu = None
+        self.mapped = False
+        if self.ram.top_of_memory > 0o177777:
+            self.mmu = MMU(self.ram, self.psw, self.reg, self.mapping_changed)
         self.stack = Stack(self.reg, self.ram, self.psw)
         self.am = am(self.reg, self.ram, self.psw)
 
+        self.disassembler = Disassembler(self.ram)
+
         # operations
-        self.br = br_ops(self.reg, self.ram, self.psw, self.sw)
-        self.noopr_ops = noopr_ops(self.reg, self.ram, self.psw, self.stack, self.sw)
-        self.ss_ops = ss_ops(self.reg, self.ram, self.psw, self.am, self.sw)
-        self.ssdd_ops = ssdd_ops(self.reg, self.ram, self.psw, self.am, self.sw)
-        self.rss_ops = rss_ops(self.reg, self.ram, self.psw, self.am, self.sw)
-        self.other_ops = other_ops(self.reg, self.ram, self.psw, self.am, self.sw)
-        self.cc_ops = cc_ops(self.psw, self.sw)
-
-        self.executed = {}
+        self.br = br_ops(self.reg, self.ram, self.psw, self.sw, self.disassembler)
+        self.noopr_ops = noopr_ops(self.reg, self.ram, self.psw, self.stack, self.sw, self.disassembler)
+        self.ss_ops = ss_ops(self.reg, self.ram, self.psw, self.am, self.sw, self.disassembler)
+        self.ssdd_ops = ssdd_ops(self.reg, self.ram, self.psw, self.am, self.sw, self.disassembler)
+        self.rss_ops = rss_ops(self.reg, self.ram, self.psw, self.am, self.sw, self.disassembler)
+        self.other_ops = other_ops(self.reg, self.ram, self.psw, self.am, self.sw, self.disassembler)
+        self.cc_ops = cc_ops(self.psw, self.sw, self.disassembler)
+
+        # instruction word -> (handler, decoded fields), built once
+        self.decode = DecodeTable(self.cc_ops, self.br, self.noopr_ops, self.ss_ops,
+                                  self.rss_ops, self.ssdd_ops, self.other_ops)
+        self.icache = InstructionCache(self.ram, self.decode)
+        # hot straight-line code is compiled into Python functions
+        self.blocks = BlockCompiler(self.reg, self.ram, self.psw, self.decode,
+                                    self.ss_ops, self.ssdd_ops, self.rss_ops, self.other_ops)
+        self.use_blocks = True
+
+        # If trace is an InstructionTrace, instruction_cycle records every instruction in it.
+        # It's dumped to trace_file when the machine halts or something goes wrong.
+        # Compiled blocks aren't used while tracing.
+        self.trace = None
+        self.trace_file = config.lookup('trace', 'file')
+        if config.lookup('trace', 'enabled'):
+            self.trace_instructions(config.lookup('trace', 'size'))
         self.CPU_cycles = 0
 
+        # If histogram is an InstructionHistogram, instruction_cycle counts every instruction in it.
+        # If profiler is a Profiler, instruction_cycle gives it the PC of every instruction.
+        # Compiled blocks don't count instructions, so they aren't used while either is on.
+        self.histogram = None
+        self.profiler = None
+
+        # Instructions run in bursts between checks of the run flag and device polls.
+        # If burst_latency is set, burst_size adapts so a burst takes about that many seconds.
+        self.burst_size = config.lookup('cpu', 'burst_size')
+        self.burst_latency = config.lookup('cpu', 'burst_latency')
+
+        # A compiled block that branches back to itself might be a loop polling a device.
+        # If it is, the burst ends and the CPU waits for a device to signal,
+        # or for idle_timeout seconds, instead of going round the loop.
+        # WAIT also ends the burst, and the CPU sleeps until a device signals.
+        self.idle = IdleLoops(self.reg, self.ram, self.decode)
+        self.detect_idle = True
+        self.idle_timeout = config.lookup('cpu', 'idle_timeout')
+        self.idle_pc = None
+        self.idle_waits = 0
+        # instructions the guest would have spent going round polling loops
+        self.idle_cycles = 0
+
         # Set up event so control of whether CPU is running doesn't get stepped on
         self.run = False
         self.runEvent = threading.Event() # *** no threading
@@ -95,17 +153,78 @@ class PDP11():
         # this must eventually be definable in a file so it has to be here
         # reader status register 177560
         logging.info('pdp11CPU setting up DL111 at 0o177560')
-        self.dl11 = DL11(self.ram, 0o177560)
+        self.dl11 = DL11(self.ram, 0o177560, config.lookup('dl11', 'ready_depth'))
         logging.info(f'pdp11CPU initializing ui:{ui}')
+        # Device polls are called between bursts of instructions.
+        self.device_polls = []
+        # The consoles need PySimpleGUI, so they're only imported when they're used.
         if ui == 'VT52':
+            from pdp11_vt52_Console import VT52_Console
             self.vt52 = VT52_Console(self, self.sw)
         if ui == 'TEK4010':
+            from pdp11_tek4010_Console import TEK4010_Console
             self.tek4010 = TEK4010_Console(self, self.sw)
         else:
             self.terminal = Terminal(self.dl11, self.sw)
 
         logging.info('pdp11CPU initializing done')
 
+    def trace_instructions(self, size=100000):
+        """Start recording the last size instructions in a new InstructionTrace.
+        size 0 stops tracing."""
+        if size:
+            self.trace = InstructionTrace(size)
+        else:
+            self.trace = None
+
+    def dump_trace(self):
+        """write the instruction trace, if there is one, to trace_file"""
+        if self.trace is not None:
+            self.trace.dump(self.trace_file)
+
+    def mapping_changed(self, mapped):
+        """The MMU calls this when it starts or stops translating addresses.
+        The instruction cache, compiled blocks and idle loops are by unmapped address,
+        and their code watchers by physical address, so they stay right; they're just not used while mapping."""
+        self.mapped = mapped
+        self.icache.set_enabled(not mapped)
+        self.blocks.set_mapped(mapped)
+        # the disassembler remembers instructions by CPU address, which now means different memory
+        self.disassembler.clear()
+
+    def save_snapshot(self, file):
+        """write the registers, PSW, memory and device state to a snapshot file"""
+        pdp11_snapshot.save_snapshot(self, file)
+
+    def load_snapshot(self, file):
+        """Start from a snapshot file instead of from here.
+        Memory is mapped from the file, so this takes about as long whatever the memory size."""
+        # everything remembered about the code in memory is about the old memory
+        self.icache.clear()
+        self.blocks.clear()
+        self.disassembler.clear()
+        pdp11_snapshot.load_snapshot(self, file)
+        self.idle = IdleLoops(self.reg, self.ram, self.decode)
+
+    def count_instructions(self, count=True):
+        """start or stop counting executed instructions in a new InstructionHistogram"""
+        if count:
+            self.histogram = InstructionHistogram(self.decode)
+        else:
+            self.histogram = None
+
+    def profile(self, interval=100, listings=()):
+        """Start sampling the PC every interval instructions in a new Profiler,
+        naming addresses with the labels in the listing files.
+        interval 0 stops profiling."""
+        if interval:
+            symbols = Symbols()
+            for listing in listings:
+                symbols.read_listing(listing)
+            self.profiler = Profiler(interval, symbols)
+        else:
+            self.profiler = None
+
     def set_run(self, new_run):
         """thread-safe run setter"""
         self.runEvent.wait()
@@ -123,53 +242,144 @@ class PDP11():
         self.runEvent.set()
         return result
 
-    def dispatch_opcode(self, instruction):
-        """ top-level dispatch"""
-        #logging.debug(f'pdp11CPU dispatch_opcode {oct(instruction)} PSW:{oct(self.psw.get_psw())}')
-        # *** Redo this based on the table in PDP-11-10 processor manual.pdf II-1-34
-        run = True
-
-        if self.cc_ops.is_cc_op(instruction):
-            run, operand1, operand2, assembly, report = self.cc_ops.do_cc_op(instruction)
-
-        elif self.br.is_br_op(instruction):
-            run, operand1, operand2, assembly, report = self.br.do_br_op(instruction)
-
-        elif self.noopr_ops.is_noopr_op(instruction):
-            run, operand1, operand2, assembly, report = self.noopr_ops.do_noopr_op(instruction)
-
-        elif self.ss_ops.is_ss_op(instruction):
-            run, operand1, operand2, assembly, report = self.ss_ops.do_ss_op(instruction)
-
-        elif self.rss_ops.is_rss_op(instruction):
-            run, operand1, operand2, assembly, report = self.rss_ops.do_rss_op(instruction)
-
-        elif self.ssdd_ops.is_ssdd_op(instruction):
-            run, operand1, operand2, assembly, report = self.ssdd_ops.do_ssdd_op(instruction)
-
-        else:
-            run, operand1, operand2, assembly, report = self.other_ops.do_other_op(instruction)
-
-        #logging.debug(f'pdp11CPU dispatch_opcode returns run:{run} {assembly}')
-        return run, operand1, operand2, assembly, report
-
     def instruction_cycle(self):
         """Run one PDP11 fetch-decode-execute window_cycle"""
         # fetch opcode and increment program counter
         self.sw.start("instruction_cycle")
         pc = self.reg.get_pc()  # get pc without incrementing
-        instruction = self.ram.read_word_from_pc()  # read at pc and increment pc
-        run, operand1, operand2, assembly, report = self.dispatch_opcode(instruction)
-        logging.debug('instruction_cycle came back from dispatch_opcode')
-        logging.debug(f'instruction_cycle: {self.pdp11.CPU_cycles} {u.oct6(pc)} {u.oct6(instruction)} {u.pad(assembly, 20)};{self.reg.registers_to_string()} NZVC:{self.psw.get_nzvc()}')
+        cached = self.icache.lookup(pc)
+        if cached:
+            # already fetched and decoded; hand the index and immediate words to the address modes
+            handler, decoded, words = cached
+            self.reg.inc_pc('instruction_cycle')
+            self.am.prefetched = words
+            run = handler(decoded)
+            self.am.prefetched = ()
+        else:
+            instruction = self.ram.read_word_from_pc()  # read at pc and increment pc
+            handler, decoded = self.decode.table[instruction]
+            run = handler(decoded)
+        if self.trace is not None:
+            code = self.ram.physical(pc)
+            self.trace.append(self.CPU_cycles, pc, self.ram.memory[code:code + 6],
+                              self.reg.get_register_file(), self.psw.psw)
+        if self.histogram is not None:
+            self.histogram.counts[decoded.instruction] += 1
+        if self.profiler is not None:
+            self.profiler.count(pc)
         if pc == self.reg.get_pc():
             logging.error(f'instruction_cycle: pc was not changed at {oct(pc)}. Halting.')
-            result = False
         self.sw.stop("instruction_cycle")
-        self.executed[instruction] = f'{instruction},{assembly}'
         self.CPU_cycles = self.CPU_cycles + 1
         return run
 
+    def run_block(self):
+        """Run the compiled block at PC if there is one, otherwise one instruction_cycle.
+        This doesn't wait after a WAIT; run_burst does."""
+        if self.use_blocks and not (self.trace or self.histogram or self.profiler or self.mapped):
+            pc = self.reg.get_pc()
+            try:
+                result = self.blocks.execute(pc)
+            except Exception:
+                # the block set the PC; count the instructions it finished
+                self.CPU_cycles = self.CPU_cycles + self.blocks.finished
+                raise
+            if result is not None:
+                next_pc, count = result
+                self.reg.set_pc(next_pc, 'run_block')
+                self.CPU_cycles = self.CPU_cycles + count
+                if next_pc == pc and self.detect_idle and self.idle.is_idle(pc):
+                    self.idle_pc = pc
+                return True
+        run = self.instruction_cycle()
+        if self.noopr_ops.waiting:
+            self.idle_pc = self.reg.get_pc()
+        return run
+
+    def run_burst(self, n):
+        """Run about n instructions without checking the run flag or polling devices.
+        A compiled block is never split, so a burst can run a few more than n.
+        The burst ends early if the CPU is in a loop polling a device or executed WAIT.
+        A burst that starts after a WAIT first waits for an interrupt,
+        and if none comes it runs nothing.
+        Returns False if the machine halted."""
+        run_block = self.run_block
+        limit = self.CPU_cycles + n
+        run = True
+        self.idle_pc = None
+        if self.noopr_ops.waiting:
+            self.wait_for_interrupt()
+            if self.noopr_ops.waiting:
+                self.idle_pc = self.reg.get_pc()
+                return run
+        while run and self.CPU_cycles < limit and self.idle_pc is None:
+            run = run_block()
+        return run
+
+    def poll_devices(self):
+        """call every device poll"""
+        for poll in self.device_polls:
+            poll()
+
+    def run_until(self, predicate, limit=None):
+        """Run bursts of instructions until predicate(pdp11) is true,
+        the machine halts, or limit instructions have run.
+        The predicate and the device polls are checked between bursts.
+        The instruction trace is dumped if the machine halts or an instruction raises an exception.
+        Returns False if the machine halted."""
+        if limit is None:
+            end = float('inf')
+        else:
+            end = self.CPU_cycles + self.idle_cycles + limit
+        while self.CPU_cycles + self.idle_cycles < end:
+            burst = min(self.burst_size, end - self.CPU_cycles - self.idle_cycles)
+            start_cycles = self.CPU_cycles
+            start_time = time.perf_counter()
+            try:
+                run = self.run_burst(burst)
+            except Exception:
+                self.dump_trace()
+                raise
+            if self.burst_latency and self.idle_pc is None:
+                self.adapt_burst_size(burst, time.perf_counter() - start_time)
+            self.poll_devices()
+            if not run:
+                self.dump_trace()
+                return False
+            if predicate(self):
+                return True
+            if self.idle_pc is not None:
+                # The rest of the burst would only have gone round the polling loop or waited.
+                self.idle_cycles = self.idle_cycles + max(0, burst - (self.CPU_cycles - start_cycles))
+                # after a WAIT, the next run_burst waits for the interrupt
+                if not self.noopr_ops.waiting:
+                    self.wait_for_device()
+        return True
+
+    def wait_for_device(self):
+        """The CPU is in a loop polling a device.
+        Sleep until a device signals or idle_timeout seconds pass, then go round the loop again."""
+        self.idle_waits = self.idle_waits + 1
+        self.ram.wait_io(self.idle_timeout)
+
+    def wait_for_interrupt(self):
+        """The CPU executed WAIT. Sleep until a device signals.
+        run_burst calls this before it runs anything while the CPU is waiting.
+        Each sleep lasts at most idle_timeout seconds so run_until can check the predicate between them.
+        The time from the signal to the CPU running again goes in the "WAIT wakeup" StopWatch."""
+        self.idle_waits = self.idle_waits + 1
+        if self.ram.wait_io(self.idle_timeout):
+            self.sw.record("WAIT wakeup", self.ram.io_signal_time)
+            self.noopr_ops.waiting = False
+
+    def adapt_burst_size(self, burst, elapsed):
+        """steer burst_size toward the number of instructions that take burst_latency seconds"""
+        if elapsed <= 0 or burst < self.burst_size:
+            return
+        wanted = int(burst * self.burst_latency / elapsed)
+        wanted = max(BURST_MINIMUM, min(BURST_MAXIMUM, wanted))
+        self.burst_size = (self.burst_size + wanted) // 2
+
 class pdp11Run():
     """sets up and runs PDP11 emulator"""
     def __init__(self, pdp11):
@@ -185,15 +395,17 @@ class pdp11Run():
         # start the processor loop
         self.pdp11.set_run(True)
         self.pdp11.CPU_cycles = 0
-        self.pdp11.sw.start("CPU")
-        while self.pdp11.get_run():
-            self.pdp11.set_run(self.pdp11.instruction_cycle())
-            self.pdp11.CPU_cycles = self.pdp11.CPU_cycles + 1
-            self.pdp11.terminal.window_cycle()
-            if self.pdp11.CPU_cycles > limit:
-                logging.info('run: instruction limit reached')
-                self.pdp11.set_run(False)
-        self.pdp11.sw.stop("CPU")
+        self.pdp11.idle_cycles = 0
+        self.pdp11.device_polls.append(self.pdp11.terminal.cycle)
+        self.cpu_start = time.clock_gettime_ns(time.CLOCK_MONOTONIC)
+        if not self.pdp11.run_until(lambda pdp11: not pdp11.get_run(), limit):
+            logging.info('run: halted')
+        elif self.pdp11.CPU_cycles + self.pdp11.idle_cycles >= limit:
+            # run_until counts the instructions idled through against the limit too
+            logging.info('run: instruction limit reached')
+        self.pdp11.set_run(False)
+        self.pdp11.device_polls.remove(self.pdp11.terminal.cycle)
+        self.pdp11.sw.record("CPU", self.cpu_start)
 
         logging.info('run: stop PDP11 emulator')
         self.pdp11.am.address_mode_report()
@@ -204,11 +416,12 @@ class pdp11Run():
         processor_speed = self.pdp11.CPU_cycles / run_time  # (cycles per second)
         format_processor_speed = '{:5.0f}'.format(processor_speed)
         logging.info(f'self.pdp11.CPU_cycles:{self.pdp11.CPU_cycles}')
+        logging.info(f'idle waits:{self.pdp11.idle_waits} idle cycles:{self.pdp11.idle_cycles}')
         logging.info(f"processor speed: {self.pdp11.CPU_cycles} cycles / {run_time} seconds = {format_processor_speed} instructions per second")
-        logging.info('instructions executed:')
-        for item in self.pdp11.executed.keys():
-            logging.info(self.pdp11.executed[item])
-        logging.info('instructions executed report ends')
+        if self.pdp11.histogram is not None:
+            self.pdp11.histogram.report()
+        if self.pdp11.profiler is not None:
+            self.pdp11.profiler.report(disassembler=self.pdp11.disassembler)
 
     def cpuThread(self, pdp11):
         """Run CPU cycles in a separate thread"""
@@ -216,16 +429,11 @@ class pdp11Run():
 
         # assume that since we got started, we should run
         self.pdp11.set_run(True)
-        run = True;
-        while run:
-            if pdp11.instruction_cycle():
-                # check for whether something else called for a stop
-                run = self.pdp11.get_run()
-            else:
-                # instruction_cycle called for a stop
-                run = False
-                self.pdp11.set_run(False)
-                self.pdp11.sw.stop("CPU")
+        # check for whether something else called for a stop between bursts
+        if not pdp11.run_until(lambda pdp11: not pdp11.get_run()):
+            # the CPU halted
+            self.pdp11.set_run(False)
+            self.pdp11.sw.record("CPU", self.cpu_start)
 
         logging.info(f'cpuThread: end. Instructions_done:{self.pdp11.CPU_cycles}')
 
@@ -251,7 +459,7 @@ class pdp11Run():
             self.pdp11.runEvent.clear() # clear flag
             if (self.pdp11.run != was_cpu_run): # if run changed
                 if was_cpu_run:
-                    self.pdp11.sw.stop("CPU")
+                    self.pdp11.sw.record("CPU", self.cpu_start)
                     logging.info('stop CPU thread')
                     self.pdp11.run = False
                 else: # was_cpu_run == FALSE
@@ -259,7 +467,7 @@ class pdp11Run():
                     self.pdp11.run = True
                     self.cpuThread = Process.Thread(target=self.cpuThread, args=(self.pdp11,), daemon=True)
                     self.cpuThread.start()
-                    self.pdp11.sw.start("CPU")
+                    self.cpu_start = time.clock_gettime_ns(time.CLOCK_MONOTONIC)
                 was_cpu_run = self.pdp11.run
             self.pdp11.runEvent.set() # set the flag
 
@@ -272,11 +480,8 @@ class pdp11Run():
         processor_speed = self.pdp11.CPU_cycles / run_time  # (cycles per second)
         format_processor_speed = '{:5.0f}'.format(processor_speed)
         logging.info(f'self.pdp11.CPU_cycles:{self.pdp11.CPU_cycles}')
+        logging.info(f'idle waits:{self.pdp11.idle_waits} idle cycles:{self.pdp11.idle_cycles}')
         logging.info(f"processor speed: {self.pdp11.CPU_cycles} cycles / {run_time} seconds = {format_processor_speed} instructions per second")
-        logging.info('instructions executed:')
-        for item in self.pdp11.executed.keys():
-            logging.info(self.pdp11.executed[item])
-        logging.info('instructions executed report ends')
 
     def run_with_TEK4010_emulator(self):
         """run PDP11 with a PySimpleGUI terminal window."""
@@ -300,7 +505,7 @@ class pdp11Run():
             self.pdp11.runEvent.clear() # clear flag
             if (self.pdp11.run != was_cpu_run): # if run changed
                 if was_cpu_run:
-                    self.pdp11.sw.stop("CPU")
+                    self.pdp11.sw.record("CPU", self.cpu_start)
                     logging.info('stop CPU thread')
                     self.pdp11.run = False
                 else: # was_cpu_run == FALSE
@@ -309,7 +514,7 @@ class pdp11Run():
                     # *** no threading
                     self.cpuThread = threading.Thread(target=self.cpuThread, args=(self.pdp11,), daemon=True)
                     self.cpuThread.start()
-                    self.pdp11.sw.start("CPU")
+                    self.cpu_start = time.clock_gettime_ns(time.CLOCK_MONOTONIC)
                 was_cpu_run = self.pdp11.run
             self.pdp11.runEvent.set() # set the flag
 
@@ -322,8 +527,5 @@ class pdp11Run():
         processor_speed = self.pdp11.CPU_cycles / run_time  # (cycles per second)
         format_processor_speed = '{:5.0f}'.format(processor_speed)
         logging.info(f'self.pdp11.CPU_cycles:{self.pdp11.CPU_cycles}')
+        logging.info(f'idle waits:{self.pdp11.idle_waits} idle cycles:{self.pdp11.idle_cycles}')
         logging.info(f"processor speed: {self.pdp11.CPU_cycles} cycles / {run_time} seconds = {format_processor_speed} instructions per second")
-        logging.info('instructions executed:')
-        for item in self.pdp11.executed.keys():
-            logging.info(self.pdp11.executed[item])
-        logging.info('instructions executed report ends')
@@ -0,0 +1,528 @@
+"""pdp11_blocks.py - compile hot basic blocks of PDP11 code into Python functions"""
+import logging
+from array import array
+from pdp11_hardware import fix_sign, MASK_WORD
+
+MASK_LOW_BYTE = 0o000377
+MASK_HIGH_BYTE = 0o177400
+
+# Branch conditions, written the way br_ops tests them
+BRANCH_CONDITIONS = {}
+BRANCH_CONDITIONS[0o000400] = 'True'                    # BR
+BRANCH_CONDITIONS[0o001000] = 'z == 0'                  # BNE
+BRANCH_CONDITIONS[0o001400] = 'z == 1'                  # BEQ
+BRANCH_CONDITIONS[0o002000] = 'n | v == 0'              # BGE
+BRANCH_CONDITIONS[0o002400] = 'n ^ v == 1'              # BLT
+BRANCH_CONDITIONS[0o003000] = 'z | (n ^ v) == 0'        # BGT
+BRANCH_CONDITIONS[0o003400] = 'z | (n ^ v) == 1'        # BLE
+BRANCH_CONDITIONS[0o100000] = 'n == 0'                  # BPL
+BRANCH_CONDITIONS[0o100400] = 'n == 1'                  # BMI
+BRANCH_CONDITIONS[0o101000] = 'c == 0 and z == 0'       # BHI
+BRANCH_CONDITIONS[0o101400] = 'c | z == 1'              # BLOS
+BRANCH_CONDITIONS[0o102000] = 'v == 0'                  # BVC
+BRANCH_CONDITIONS[0o102400] = 'v == 1'                  # BVS
+BRANCH_CONDITIONS[0o103000] = 'c == 0'                  # BCC
+BRANCH_CONDITIONS[0o103400] = 'c == 1'                  # BCS
+
+# single-operand instructions that are compiled;
+# MARK, MTPS, MFPS and the previous-space instructions are left to the interpreter
+SS_COMPILED = [0o000300,
+               0o005000, 0o005100, 0o005200, 0o005300, 0o005400, 0o005500, 0o005600, 0o005700,
+               0o006000, 0o006100, 0o006200, 0o006300, 0o006700,
+               0o105000, 0o105100, 0o105200, 0o105300, 0o105400, 0o105500, 0o105600, 0o105700,
+               0o106000, 0o106100, 0o106200, 0o106300]
+
+# register-source instructions that are compiled; SOB is left to the interpreter
+RSS_COMPILED = [0o070000, 0o071000, 0o072000, 0o073000, 0o074000]
+
+class Block:
+    """One compiled basic block"""
+    def __init__(self, start, addresses, count, source, function):
+        self.start = start
+        self.addresses = addresses  # every word address the block was compiled from
+        self.count = count          # number of instructions
+        self.source = source
+        self.function = function
+        # Compiled code checks this after each memory write.
+        # If the write changed the block itself, the block stops.
+        # It stops the same way if the write turned on memory management.
+        self.valid = [True]
+        # Compiled code records how far it has got here before anything that can raise:
+        # the PC the interpreter would have, plus the instructions finished, shifted left 16.
+        self.progress = [0]
+
+class BlockCompiler:
+    """Finds basic blocks starting at a PC and turns them into Python functions.
+    Registers are read and written in the register list directly,
+    address modes are worked out when the block is compiled,
+    and branches test the PSW bits inline.
+    If an instruction raises, the PC and the instruction count are left as the interpreter would leave them.
+    The instructions themselves are done by the existing op class methods,
+    so results and condition codes match the interpreter.
+    Calling a block runs it and returns (next PC, instructions executed)."""
+    def __init__(self, reg, ram, psw, decode, ss, ssdd, rss, other, threshold=16, max_instructions=32):
+        logging.info('initializing BlockCompiler')
+        self.reg = reg
+        self.ram = ram
+        self.psw = psw
+        self.decode = decode
+        self.ss = ss
+        self.ssdd = ssdd
+        self.rss = rss
+        self.other = other
+        self.threshold = threshold
+        self.max_instructions = max_instructions
+
+        # pc: Block, or None if there is no block that can be compiled at pc
+        self.blocks = {}
+        # number of times execute was asked for a block that doesn't exist yet, by word address of its pc
+        self.heat = array('H', bytes(2 * 0o100000))
+        # word address: [start of every block compiled from that word]
+        self.covering = {}
+
+        # Compiled code checks this after each memory write too.
+        # A block calls Ram's unmapped accessors, so it stops once memory management starts translating.
+        self.mapped = [False]
+
+        self.compiled = 0
+        self.blocks_run = 0
+        # instructions the last block finished before it raised
+        self.finished = 0
+        # instructions finished in the block being translated
+        self.translating = 0
+
+    # ****************************************************
+    # running blocks
+    # ****************************************************
+
+    def execute(self, pc):
+        """Run the block at pc, compiling it once it is hot.
+        Returns (next PC, instructions executed), or None if the interpreter has to do it."""
+        try:
+            block = self.blocks[pc]
+        except KeyError:
+            heat = self.heat[pc >> 1] + 1
+            self.heat[pc >> 1] = heat
+            if heat < self.threshold:
+                return None
+            block = self.compile(pc)
+        if block is None:
+            return None
+        self.blocks_run = self.blocks_run + 1
+        try:
+            return block.function()
+        except Exception:
+            # leave the PC where the interpreter would have; run_block counts the finished instructions
+            progress = block.progress[0]
+            self.reg.set_pc(progress & MASK_WORD, 'block')
+            self.finished = progress >> 16
+            raise
+
+    def compile(self, pc):
+        """translate the block at pc and remember it"""
+        self.heat[pc >> 1] = 0
+        block = self.translate(pc)
+        self.blocks[pc] = block
+        if block is None:
+            # try again if this word changes
+            addresses = [pc]
+        else:
+            addresses = block.addresses
+            self.compiled = self.compiled + 1
+        for address in addresses:
+            try:
+                self.covering[address].append(pc)
+            except KeyError:
+                self.covering[address] = [pc]
+                self.ram.watch_code(address, self.invalidate)
+        return block
+
+    def invalidate(self, address):
+        """Ram calls this when a word a block was compiled from is written"""
+        for pc in self.covering.pop(address, []):
+            self.heat[pc >> 1] = 0
+            block = self.blocks.pop(pc, None)
+            if block is not None:
+                block.valid[0] = False
+
+    def set_mapped(self, mapped):
+        """Memory management calls this when it starts or stops translating addresses"""
+        self.mapped[0] = mapped
+
+    def clear(self):
+        """forget every compiled block"""
+        logging.info(f'BlockCompiler clear: {self.compiled} compiled, {self.blocks_run} run')
+        for block in self.blocks.values():
+            if block is not None:
+                block.valid[0] = False
+        for address in self.covering:
+            self.ram.unwatch_code(address, self.invalidate)
+        self.blocks = {}
+        self.heat = array('H', bytes(2 * 0o100000))
+        self.covering = {}
+
+    # ****************************************************
+    # translating blocks
+    # ****************************************************
+
+    def peek(self, address):
+        """read a word of code for translation, or None if it's not ordinary memory"""
+        if address + 1 >= MASK_WORD or address in self.ram.iomap_readers:
+            return None
+        return self.ram.read_word(address)
+
+    def read_name(self, bw):
+        """name of the memory read function for byte or word"""
+        if bw == 'B':
+            return 'rb'
+        return 'rw'
+
+    def write_name(self, bw):
+        """name of the memory write function for byte or word"""
+        if bw == 'B':
+            return 'wb'
+        return 'ww'
+
+    def emit_progress(self, pc, lines):
+        """Emit code that records the PC the interpreter would have at this point.
+        pc can be an expression."""
+        if self.translating:
+            lines.append(f'at[0] = {pc} | {oct(self.translating << 16)}')
+        else:
+            lines.append(f'at[0] = {pc}')
+
+    def emit_register(self, register, value, lines):
+        """Emit code that stores value in a register, checking it the way Registers.set does.
+        value can be an expression."""
+        lines.append(f'w = {value}')
+        lines.append(f'assert w <= {oct(MASK_WORD)}')
+        lines.append(f'R[{register}] = w')
+
+    def emit_get(self, bw, mode, register, pc, name, lines):
+        """Emit code that puts the operand in name and its address in name_a,
+        the way AddressModes.operand_get would.
+        pc is the address of the next word after what the instruction has read so far.
+        Returns the new pc, or None if this operand can't be compiled."""
+        read = self.read_name(bw)
+        if bw == 'B' and register not in (6, 7):
+            increment = 1
+        else:
+            increment = 2
+        address = f'{name}_a'
+
+        if mode == 0:
+            if register == 7:
+                lines.append(f'{name} = {oct(pc)}')
+            else:
+                lines.append(f'{name} = R[{register}]')
+        elif mode == 1:
+            if register == 7:
+                lines.append(f'{address} = {oct(pc)}')
+            else:
+                lines.append(f'{address} = R[{register}]')
+            lines.append(f'{name} = {read}({address})')
+        elif mode == 2:
+            if register == 7:
+                # immediate
+                word = self.peek(pc)
+                if word is None:
+                    return None
+                if bw == 'B':
+                    word = word & MASK_LOW_BYTE
+                lines.append(f'{address} = {oct(pc)}')
+                lines.append(f'{name} = {oct(word)}')
+                pc = pc + 2
+                self.emit_progress(oct(pc), lines)
+            else:
+                lines.append(f'{address} = R[{register}]')
+                lines.append(f'{name} = {read}({address})')
+                self.emit_register(register, f'{address} + {increment}', lines)
+        elif mode == 3:
+            if register == 7:
+                # absolute
+                word = self.peek(pc)
+                if word is None:
+                    return None
+                pc = pc + 2
+                self.emit_progress(oct(pc), lines)
+                lines.append(f'{address} = {oct(word)}')
+                lines.append(f'{name} = {read}({address})')
+            else:
+                lines.append(f'{address} = rw(R[{register}])')
+                lines.append(f'{name} = {read}({address})')
+                self.emit_register(register, f'R[{register}] + 2', lines)
+        elif mode == 4:
+            if register == 7:
+                return None
+            lines.append(f'R[{register}] = R[{register}] - {increment}')
+            lines.append(f'{address} = R[{register}]')
+            lines.append(f'{name} = {read}({address})')
+        elif mode == 5:
+            if register == 7:
+                return None
+            lines.append(f'R[{register}] = R[{register}] - 2')
+            lines.append(f'{address} = rw(R[{register}])')
+            lines.append(f'{name} = {read}({address})')
+        elif mode in (6, 7):
+            x = self.peek(pc)
+            if x is None:
+                return None
+            pc = pc + 2
+            self.emit_progress(oct(pc), lines)
+            offset = fix_sign(x)
+            if register == 7:
+                pointer = oct(pc + offset)
+            else:
+                pointer = f'R[{register}] + {oct(offset)}'
+            if mode == 6:
+                lines.append(f'{address} = {pointer}')
+            else:
+                lines.append(f'{address} = rw({pointer})')
+            lines.append(f'{name} = {read}({address})')
+        return pc
+
+    def emit_set(self, bw, mode, register, name, lines):
+        """emit code that stores name the way AddressModes.addressing_mode_set would"""
+        if mode == 0:
+            self.emit_register(register, name, lines)
+        else:
+            lines.append(f'{self.write_name(bw)}({name}_a, {name})')
+
+    def emit_jump(self, mode, register, pc, lines):
+        """Emit code that puts the jump address in j, the way AddressModes.jump_get would.
+        Returns the new pc, or None if this jump can't be compiled."""
+        if mode == 0:
+            # illegal; the interpreter halts
+            return None
+        if register == 7 and mode in (1, 4, 5):
+            return None
+        if mode == 1:
+            lines.append(f'j = R[{register}]')
+        elif mode == 2:
+            if register == 7:
+                lines.append(f'j = {oct(pc)}')
+                pc = pc + 2
+                self.emit_progress(oct(pc), lines)
+            else:
+                lines.append(f'j = R[{register}]')
+                self.emit_register(register, 'j + 2', lines)
+        elif mode == 3:
+            if register == 7:
+                word = self.peek(pc)
+                if word is None:
+                    return None
+                lines.append(f'j = {oct(word)}')
+                pc = pc + 2
+                self.emit_progress(oct(pc), lines)
+            else:
+                lines.append(f'j = rw(R[{register}])')
+                self.emit_register(register, f'R[{register}] + 2', lines)
+        elif mode == 4:
+            lines.append(f'R[{register}] = R[{register}] - 2')
+            lines.append(f'j = rw(R[{register}])')
+        elif mode == 5:
+            lines.append(f'R[{register}] = R[{register}] - 2')
+            lines.append(f'j = rw(rw(R[{register}]))')
+        elif mode in (6, 7):
+            x = self.peek(pc)
+            if x is None:
+                return None
+            pc = pc + 2
+            self.emit_progress(oct(pc), lines)
+            offset = fix_sign(x)
+            if register == 7:
+                pointer = oct(pc + offset)
+            else:
+                pointer = f'R[{register}] + {oct(offset)}'
+            if mode == 6:
+                lines.append(f'j = {pointer}')
+            else:
+                # jump_get adds the word to the PC
+                lines.append(f'j = {oct(pc)} + rw(rw({pointer}))')
+        return pc
+
+    def translate_one(self, pc, count, lines, names):
+        """Emit code for the instruction at pc.
+        Returns (next pc, ends block), or (None, True) if it can't be compiled."""
+        instruction = self.peek(pc)
+        if instruction is None:
+            return None, True
+        handler, decoded = self.decode.table[instruction]
+        kind = decoded.kind
+        start = pc
+        pc = pc + 2
+        self.translating = count - 1
+        body = []
+        self.emit_progress(oct(pc), body)
+        ends_block = False
+        writes_memory = False
+
+        if kind == 'ssdd':
+            if decoded.dst_mode == 0 and decoded.dst_reg == 7:
+                return None, True
+            method = f'ssdd_{decoded.opcode & 0o070000:o}'
+            names[method] = self.ssdd.double_operand_SSDD_instructions[decoded.opcode & 0o070000]
+            pc = self.emit_get(decoded.bw, decoded.src_mode, decoded.src_reg, pc, 's', body)
+            if pc is None:
+                return None, True
+            pc = self.emit_get(decoded.bw, decoded.dst_mode, decoded.dst_reg, pc, 'd', body)
+            if pc is None:
+                return None, True
+            body.append(f"d, report = {method}('{decoded.bw}', s, d)")
+            self.emit_set(decoded.bw, decoded.dst_mode, decoded.dst_reg, 'd', body)
+            writes_memory = decoded.dst_mode != 0
+            mnemonic = self.ssdd.double_operand_SSDD_instruction_names[decoded.opcode]
+
+        elif kind == 'ss':
+            if decoded.opcode == 0o000100:
+                # JMP
+                pc = self.emit_jump(decoded.dst_mode, decoded.dst_reg, pc, body)
+                if pc is None:
+                    return None, True
+                body.append(f'return j, {count}')
+                ends_block = True
+            elif decoded.opcode in SS_COMPILED:
+                if decoded.dst_mode == 0 and decoded.dst_reg == 7:
+                    return None, True
+                method = f'ss_{decoded.opcode:o}'
+                names[method] = self.ss.single_operand_instructions[decoded.opcode]
+                pc = self.emit_get(decoded.bw, decoded.dst_mode, decoded.dst_reg, pc, 'd', body)
+                if pc is None:
+                    return None, True
+                body.append(f"d, report = {method}(d, '{decoded.bw}')")
+                self.emit_set(decoded.bw, decoded.dst_mode, decoded.dst_reg, 'd', body)
+                writes_memory = decoded.dst_mode != 0
+            else:
+                return None, True
+            mnemonic = self.ss.single_operand_instruction_names[decoded.opcode]
+
+        elif kind == 'rss':
+            if decoded.opcode not in RSS_COMPILED or decoded.src_reg >= 6:
+                return None, True
+            method = f'rss_{decoded.opcode:o}'
+            names[method] = self.rss.double_operand_RSS_instructions[decoded.opcode]
+            # exec_rss_op reads the source in byte mode
+            pc = self.emit_get('B', decoded.dst_mode, decoded.dst_reg, pc, 's', body)
+            if pc is None:
+                return None, True
+            body.append(f'r, report = {method}({decoded.src_reg}, s)')
+            self.emit_register(decoded.src_reg, 'r', body)
+            mnemonic = self.rss.double_operand_RSS_instruction_names[decoded.opcode]
+
+        elif kind == 'br':
+            offset = 2 * decoded.offset
+            if offset > MASK_LOW_BYTE:
+                offset = fix_sign(offset | MASK_HIGH_BYTE)
+            target = pc + offset
+            condition = BRANCH_CONDITIONS[decoded.opcode]
+            if condition == 'True':
+                body.append(f'return {oct(target)}, {count}')
+            else:
+                body.append('p = psw.psw')
+                body.append('n = (p & 0o10) >> 3')
+                body.append('z = (p & 0o4) >> 2')
+                body.append('v = (p & 0o2) >> 1')
+                body.append('c = p & 0o1')
+                body.append(f'if {condition}:')
+                body.append(f'    return {oct(target)}, {count}')
+                body.append(f'return {oct(pc)}, {count}')
+            ends_block = True
+            mnemonic = 'branch'
+
+        elif kind == 'cc':
+            bits = instruction & 0o000017
+            if (instruction & 0o000260) == 0o000260:
+                body.append(f'psw.set_nzvc({oct(bits)})')
+            else:
+                body.append(f'psw.set_nzvc(psw.psw & ~{oct(bits)})')
+            mnemonic = 'CC'
+
+        elif kind == 'other' and decoded.opcode == 0o004000:
+            # JSR R,DD
+            register = decoded.src_reg
+            pc = self.emit_jump(decoded.dst_mode, decoded.dst_reg, pc, body)
+            if pc is None:
+                return None, True
+            if register == 7:
+                body.append(f'push = {oct(pc)}')
+            else:
+                body.append(f'push = R[{register}]')
+            body.append('R[6] = R[6] - 2')
+            body.append('ww(R[6], push)')
+            if register != 7:
+                body.append(f'R[{register}] = {oct(pc)}')
+            body.append(f'return j, {count}')
+            ends_block = True
+            mnemonic = 'JSR'
+
+        elif kind == 'other' and decoded.opcode == 0o000200:
+            # RTS R
+            register = decoded.src_reg
+            if register != 7:
+                # RTS sets the PC before it pops
+                self.emit_progress(f'R[{register}]', body)
+            body.append('popped = rw(R[6])')
+            self.emit_register(6, 'R[6] + 2', body)
+            if register == 7:
+                body.append(f'return popped, {count}')
+            else:
+                body.append(f'j = R[{register}]')
+                body.append(f'R[{register}] = popped')
+                body.append(f'return j, {count}')
+            ends_block = True
+            mnemonic = 'RTS'
+
+        else:
+            # HALT, WAIT, traps and the rest are left to the interpreter
+            return None, True
+
+        lines.append(f'# {start:06o} {instruction:06o} {mnemonic}')
+        if kind in ('br', 'cc'):
+            # nothing here can raise
+            body = [line for line in body if not line.startswith('at[0]')]
+        lines.extend(body)
+        if writes_memory:
+            lines.append('if not valid[0] or mapped[0]:')
+            lines.append(f'    return {oct(pc)}, {count}')
+        return pc, ends_block
+
+    def translate(self, start):
+        """Translate the basic block at start into a Python function.
+        Returns a Block, or None if not even the first instruction can be compiled."""
+        lines = []
+        names = {}
+        pc = start
+        count = 0
+        ends_block = False
+        while not ends_block and count < self.max_instructions:
+            next_pc, ends = self.translate_one(pc, count + 1, lines, names)
+            if next_pc is None:
+                break
+            pc = next_pc
+            ends_block = ends
+            count = count + 1
+        if count == 0:
+            return None
+        if not ends_block:
+            lines.append(f'return {oct(pc)}, {count}')
+
+        valid = [True]
+        progress = [0]
+        namespace = {'R': self.reg.get_register_file(), 'psw': self.psw,
+                     'rb': self.ram.read_byte, 'rw': self.ram.read_word,
+                     'wb': self.ram.write_byte, 'ww': self.ram.write_word,
+                     'valid': valid, 'mapped': self.mapped, 'at': progress}
+        namespace.update(names)
+        arguments = ', '.join(f'{name}={name}' for name in namespace)
+        function_name = f'block_{start:06o}'
+        source = f'def {function_name}({arguments}):\n'
+        source = source + ''.join(f'    {line}\n' for line in lines)
+        code = compile(source, f'<{function_name}>', 'exec')
+        exec(code, namespace)
+
+        addresses = list(range(start, pc, 2))
+        block = Block(start, addresses, count, source, namespace[function_name])
+        block.valid = valid
+        block.progress = progress
+        #logging.debug(f'compiled {function_name}:\n{source}')
+        return block
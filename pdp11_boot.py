@@ -1,4 +1,5 @@
 """PDP11 bootstrap utilities"""
+import json
 import logging
 
 #from pdp11_hardware import Registers as reg
@@ -109,3 +110,39 @@ class pdp11Boot:
 
         logging.info(f'read_pdp11_assembly_file "{file}" returns base address:{oct(base)}')
         return base
+
+    def read_tape(self, file):
+        """read the bytes of a paper tape image in PCjs json format, like source/pdp11basic.json"""
+        with open(file, 'r', encoding="utf-8") as text:
+            tape = json.load(text)
+        return bytes(tape['values'])
+
+    def load_absolute_tape(self, tape):
+        """Load a tape in DEC absolute loader format into ram, as the absolute loader would.
+        Each block is 1, 0, byte count (low, high), load address (low, high), data, checksum.
+        The byte count includes the six header bytes; a block with no data ends the tape
+        and its load address is the start address.
+        :param tape: the bytes of the tape
+        :return: start address
+        """
+        position = 0
+        blocks = 0
+        while position < len(tape):
+            # skip the leader and anything else between blocks
+            if tape[position] != 1 or tape[position + 1] != 0:
+                position = position + 1
+                continue
+            count = tape[position + 2] + (tape[position + 3] << 8)
+            address = tape[position + 4] + (tape[position + 5] << 8)
+            block = tape[position:position + count + 1]
+            if sum(block) & 0o377 != 0:
+                raise ValueError(f'load_absolute_tape: bad checksum in block at {oct(address)}')
+            blocks = blocks + 1
+            if count == 6:
+                logging.info(f'load_absolute_tape: {blocks} blocks, start address:{oct(address)}')
+                return address
+            for byte in tape[position + 6:position + count]:
+                self.ram.write_byte(address, byte)
+                address = address + 1
+            position = position + count + 1
+        raise ValueError('load_absolute_tape: tape has no end block')
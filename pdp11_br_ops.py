@@ -1,5 +1,8 @@
 """pdp11_br_ops.py branch instructions"""
 import logging
+from pdp11_decode import decode_word
+from pdp11_decode import is_br_op
+from pdp11_disassembler import BRANCH_NAMES
 
 # masks for accessing words and bytes
 MASK_LOW_BYTE = 0o000377
@@ -16,12 +19,14 @@ MASK_BYTE_MSB = 0o000200
 
 class br_ops:
     """Implements PDP11 branch operations"""
-    def __init__(self, reg, ram, psw, sw):
+    def __init__(self, reg, ram, psw, sw, disassembler=None):
         logging.info('initializing branchOps')
         self.reg = reg
         self.ram = ram
         self.psw = psw
         self.sw = sw
+        # the PDP11's Disassembler, for do_br_op
+        self.disassembler = disassembler
 
         self.branch_instructions = {}
         self.branch_instructions[0o000400] = self.BR
@@ -40,22 +45,7 @@ class br_ops:
         self.branch_instructions[0o103000] = self.BCC  # BHIS
         self.branch_instructions[0o103400] = self.BCS  # BLO
 
-        self.branch_instruction_names = {}
-        self.branch_instruction_names[0o000400] = "BR"
-        self.branch_instruction_names[0o001000] = "BNE"
-        self.branch_instruction_names[0o001400] = "BEQ"
-        self.branch_instruction_names[0o002000] = "BGE"
-        self.branch_instruction_names[0o002400] = "BLT"
-        self.branch_instruction_names[0o003000] = "BGT"
-        self.branch_instruction_names[0o003400] = "BLE"
-        self.branch_instruction_names[0o100000] = "BPL"
-        self.branch_instruction_names[0o100400] = "BMI"
-        self.branch_instruction_names[0o101000] = "BHI"
-        self.branch_instruction_names[0o101400] = "BLOS"
-        self.branch_instruction_names[0o102000] = "BVC"
-        self.branch_instruction_names[0o102400] = "BVS"
-        self.branch_instruction_names[0o103000] = "BCC"  # BCC = BHIS
-        self.branch_instruction_names[0o103400] = "BCS"  # BCS = BLO
+        self.branch_instruction_names = BRANCH_NAMES
 
 
     # ****************************************************
@@ -168,29 +158,21 @@ class br_ops:
 
     def is_br_op(self, instruction):
         """Using instruction bit pattern, determine whether it's a branch instruction"""
-        # *0 ** xxx
-        # bit 15 can be 1 or 0; mask = 0o100000
-        # bits 14-12 = 0; mask = 0o070000
-        # bit 11,10,9,8; mask = 0o007400
-        # bits 7,6, 5,4,3, 2,1,0 are the offset; mask = 0o000377
-        blankbits = instruction & 0o070000 == 0o000000
-        lowbits0 = instruction & 0o107400 in [          0o000400, 0o001000, 0o001400, 0o002000, 0o002400, 0o003000, 0o003400]
-        lowbits1 = instruction & 0o107400 in [0o100000, 0o100400, 0o101000, 0o101400, 0o102000, 0o102400, 0o103000, 0o103400]
-        # logging.info(f'{instruction} {blankbits} and ({lowbits0} or {lowbits1})')
-        return blankbits and (lowbits0 or lowbits1)
+        return is_br_op(instruction)
 
     def do_br_op(self, instruction):
-        """dispatch a branch opcode"""
-        #parameter: opcode of form X 000 0XX X** *** ***
+        """execute a branch instruction and disassemble it.
+        The CPU runs exec_br_op straight from the decode table; this is for tests.
+        returns: run, operand1, operand2, assembly, report"""
+        assembly = self.disassembler.decode_fetched(instruction, self.reg.get_pc())[1]
+        run = self.exec_br_op(decode_word(instruction))
+        return run, '', '', assembly, ''
+
+    def exec_br_op(self, decoded):
+        """execute a branch instruction without disassembling it.
+        parameter: Decoded fields from the decode table
+        returns: run"""
         self.sw.start("br")
-        opcode = instruction & MASK_HIGH_BYTE
-        offset = instruction & MASK_LOW_BYTE
-        try:
-            assembly = f'{self.branch_instruction_names[opcode]} {oct(offset)}' #     ; branch offset {oct(2*offset+2)}'
-            result = self.branch_instructions[opcode](offset)
-        except KeyError:
-            assembly = 'Error: branch opcode not found'
-            result = False
-
+        result = self.branch_instructions[decoded.opcode](decoded.offset)
         self.sw.stop("br")
-        return result, '', '', assembly, ''
+        return result
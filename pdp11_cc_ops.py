@@ -1,34 +1,44 @@
 """pdp11_cc_ops.py - no-operand instructions 00 00 00 through 00 00 06"""
 import logging
+from pdp11_decode import decode_word
+from pdp11_decode import is_cc_op
 
 class cc_ops:
     """Implements PDP11 condition code operators"""
     # See pdp11-40 page 4-79
     # The cvzn condition codes are mapped into bits 4-0 of these operations.
     # set and get are mapped onto bit 5 of these operations,
-    def __init__(self, psw, sw):
+    def __init__(self, psw, sw, disassembler=None):
         logging.info('initializing ConditionCodeOps')
         self.psw = psw
         self.sw = sw
+        # the PDP11's Disassembler, for do_cc_op
+        self.disassembler = disassembler
         self.set_opcode = 0o000260
         self.clear_opcode = 0o000240
         self.psw_bits = 0o000017
 
     def is_cc_op(self, instruction):
-        '''returns true if the unstruction is a condition-code instruction'''
-        return (0o0000240 <= instruction) & (instruction <= 0o0000277)
+        """Using instruction bit pattern, determine whether it's a condition-code instruction"""
+        return is_cc_op(instruction)
 
     def do_cc_op(self, instruction):
-        """dispatch a condition code instruction"""
+        """execute a condition code instruction and disassemble it.
+        The CPU runs exec_cc_op straight from the decode table; this is for tests.
+        returns: run, operand1, operand2, assembly, report"""
+        assembly = self.disassembler.decode_fetched(instruction, 0)[1]
+        run = self.exec_cc_op(decode_word(instruction))
+        return run, '', '', assembly, ''
+
+    def exec_cc_op(self, decoded):
+        """execute a condition code instruction without disassembling it.
+        parameter: Decoded fields from the decode table
+        returns: run"""
         self.sw.start("cc")
+        instruction = decoded.instruction
         if (instruction & self.set_opcode) == self.set_opcode:
-            set_bits = instruction & self.psw_bits
-            assembly = f'SETCC {oct(set_bits)}'
-            self.psw.set_nzvc(set_bits)
+            self.psw.set_nzvc(instruction & self.psw_bits)
         elif (instruction & self.clear_opcode) == self.clear_opcode:
-            clr_bits = instruction & self.psw_bits
-            set_bits = self.psw.psw & ~clr_bits
-            assembly = f'CLRCC {oct(clr_bits)}'
-            self.psw.set_nzvc(set_bits)
+            self.psw.set_nzvc(self.psw.psw & ~(instruction & self.psw_bits))
         self.sw.stop("cc")
-        return True, '', '', assembly, ''
+        return True
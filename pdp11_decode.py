@@ -0,0 +1,208 @@
+"""pdp11_decode.py - instruction decode table"""
+import logging
+
+# The two instructions whose low six bits aren't an address mode and register
+MARK = 0o006400
+SOB = 0o077000
+
+# Decoding every word takes a while and the result doesn't depend on the machine,
+# so it is done once per process and shared by every DecodeTable.
+decoded_words = []
+
+def extension_words(mode, register):
+    """How many words follow the instruction for this operand:
+    index and index deferred modes, and the PC modes immediate and absolute."""
+    if mode in (6, 7):
+        return 1
+    if register == 7 and mode in (2, 3):
+        return 1
+    return 0
+
+class Decoded:
+    """The fields of one instruction word, extracted when the decode table is built"""
+    def __init__(self, instruction, kind):
+        self.instruction = instruction
+        self.kind = kind
+        self.bw = ''        # 'B' for byte instructions, 'W' or '' for word
+        self.opcode = instruction   # instruction with operand fields masked off
+        self.src_mode = 0   # source address mode; RSS and JSR: 0
+        self.src_reg = 0    # source register; RSS, JSR, RTS: the R field
+        self.dst_mode = 0   # destination address mode
+        self.dst_reg = 0    # destination register
+        self.offset = 0     # branch offset byte; SOB and MARK: the NN field
+        self.words = 0      # index and immediate words following the instruction
+
+        if kind == 'br':
+            self.opcode = instruction & 0o177400
+            self.offset = instruction & 0o000377
+        elif kind == 'ss':
+            # ss_ops uses 'B' and ''
+            if instruction & 0o100000:
+                self.bw = 'B'
+            self.opcode = instruction & 0o107700
+            if self.opcode == MARK:
+                # MARK NN: the low six bits are a count, not an operand
+                self.offset = instruction & 0o000077
+                return
+            self.dst_mode = (instruction & 0o000070) >> 3
+            self.dst_reg = instruction & 0o000007
+            self.words = extension_words(self.dst_mode, self.dst_reg)
+        elif kind == 'rss':
+            self.opcode = instruction & 0o077000
+            self.src_reg = (instruction & 0o000700) >> 6
+            if self.opcode == SOB:
+                # SOB R,NN: the low six bits are a branch offset, not an operand
+                self.offset = instruction & 0o000077
+                return
+            self.dst_mode = (instruction & 0o000070) >> 3
+            self.dst_reg = instruction & 0o000007
+            self.words = extension_words(self.dst_mode, self.dst_reg)
+        elif kind == 'ssdd':
+            # ssdd_ops uses 'B' and 'W'
+            if instruction & 0o100000:
+                self.bw = 'B'
+            else:
+                self.bw = 'W'
+            self.opcode = instruction & 0o170000
+            self.src_mode = (instruction & 0o007000) >> 9
+            self.src_reg = (instruction & 0o000700) >> 6
+            self.dst_mode = (instruction & 0o000070) >> 3
+            self.dst_reg = instruction & 0o000007
+            self.words = extension_words(self.src_mode, self.src_reg) + \
+                         extension_words(self.dst_mode, self.dst_reg)
+        elif kind == 'other':
+            if instruction & 0o777000 == 0o004000:
+                # JSR R,DD
+                self.opcode = 0o004000
+                self.src_reg = (instruction & 0o000700) >> 6
+                self.dst_mode = (instruction & 0o000070) >> 3
+                self.dst_reg = instruction & 0o000007
+                self.words = extension_words(self.dst_mode, self.dst_reg)
+            else:
+                # RTS R and the rest
+                self.opcode = instruction & 0o777700
+                self.src_reg = instruction & 0o000007
+
+    def to_string(self):
+        """describe the decoded fields for the log"""
+        return f'{oct(self.instruction)} {self.kind} {self.bw} opcode:{oct(self.opcode)} ' \
+               f'src:{self.src_mode}{self.src_reg} dst:{self.dst_mode}{self.dst_reg} offset:{oct(self.offset)}'
+
+# ****************************************************
+# Instruction classes by bit pattern.
+# The instruction classes' is_ methods call these, and classify tries them in the order the CPU used to.
+# ****************************************************
+
+def is_cc_op(instruction):
+    """returns true if the instruction is a condition-code instruction"""
+    return 0o000240 <= instruction <= 0o000277
+
+def is_br_op(instruction):
+    """Using instruction bit pattern, determine whether it's a branch instruction"""
+    # *0 ** xxx
+    # bit 15 can be 1 or 0; mask = 0o100000
+    # bits 14-12 = 0; mask = 0o070000
+    # bit 11,10,9,8; mask = 0o007400
+    # bits 7,6, 5,4,3, 2,1,0 are the offset; mask = 0o000377
+    blankbits = instruction & 0o070000 == 0o000000
+    lowbits0 = instruction & 0o107400 in [          0o000400, 0o001000, 0o001400, 0o002000, 0o002400, 0o003000, 0o003400]
+    lowbits1 = instruction & 0o107400 in [0o100000, 0o100400, 0o101000, 0o101400, 0o102000, 0o102400, 0o103000, 0o103400]
+    return blankbits and (lowbits0 or lowbits1)
+
+def is_noopr_op(instruction):
+    """Using instruction bit pattern, determine whether it's a no-operand instruction:
+    HALT, WAIT, RTI, BPT, IOT, RESET, RTT"""
+    return 0o000000 <= instruction <= 0o000006
+
+def is_ss_op(instruction):
+    """Using instruction bit pattern, determine whether it's a single-operand instruction"""
+    # 15  12 10  876 543 210
+    #  * 000 101 *** *** ***
+    #  * 000 110 *** *** ***
+    # bit 15 can be 1 or 0
+    # bits 14,13,12 must be 0
+    # bits 11,10,9 must be 5 or 6
+    # bits 8,7,6 can be anything
+    # bits 5-0 can be anything
+    # 0o000301 is one of these
+    # 0 000 000 101 *** ***
+    bits_14_13_12 = instruction & 0o070000 == 0o000000
+    bits_11_10_9 = instruction & 0o007000 in [0o006000, 0o005000]
+    is_jmp = instruction & 0o177700 == 0o000100
+    is_swab = instruction & 0o177700 == 0o000300
+    return (bits_14_13_12 and bits_11_10_9) or is_swab or is_jmp
+
+def is_rss_op(instruction):
+    """Using instruction bit pattern, determine whether it's an RSS RDD RNN instruction"""
+    # 077R00 0 111 111 *** 000 000 SOB (jump & subroutine)
+    # bit 15 = 0
+    # bits 14-12 = 7
+    # bits 9 10 11 in [0,1,2,3,4,7]
+    bit15 = instruction & 0o100000 == 0o000000
+    bits14_12 = instruction & 0o070000 == 0o070000
+    bits11_9 = instruction & 0o077000 in [0o070000, 0o071000, 0o072000, 0o073000, 0o074000, 0o077000]
+    return bit15 and bits14_12 and bits11_9
+
+def is_ssdd_op(instruction):
+    """Using instruction bit pattern, determine whether it's a double operand instruction"""
+    # bits 14 - 12 in [1, 2, 3, 4, 5, 6]
+    return instruction & 0o070000 in [0o010000, 0o020000, 0o030000, 0o040000, 0o050000, 0o060000]
+
+def is_other_op(instruction):
+    """Using instruction bit pattern, determine whether it's one of the leftover instructions"""
+    masked1 = instruction & 0o777700
+    masked2 = instruction & 0o777000
+    return masked1 in [0o000200, 0o002000, 0o004000, 0o006400] or masked2 in [0o004000]
+
+def classify(instruction):
+    """Which instruction class an instruction word is in.
+    Done here without needing a machine so the disassembler can use the table too."""
+    if is_cc_op(instruction):
+        return 'cc'
+    if is_br_op(instruction):
+        return 'br'
+    if is_noopr_op(instruction):
+        return 'noopr'
+    if is_ss_op(instruction):
+        return 'ss'
+    if is_rss_op(instruction):
+        return 'rss'
+    if is_ssdd_op(instruction):
+        return 'ssdd'
+    return 'other'
+
+def decode_all_words():
+    """Decode all 65536 instruction words. Only the first call does any work."""
+    if not decoded_words:
+        logging.info('decoding all instruction words')
+        for instruction in range(0o200000):
+            decoded_words.append(Decoded(instruction, classify(instruction)))
+        logging.info('decoding all instruction words done')
+    return decoded_words
+
+def decode_word(instruction):
+    """the Decoded fields of an instruction word"""
+    return decode_all_words()[instruction]
+
+class DecodeTable:
+    """Maps every instruction word straight to its bound handler and decoded fields"""
+    def __init__(self, cc, br, noopr, ss, rss, ssdd, other):
+        logging.info('initializing DecodeTable')
+        # The handlers take the decoded fields and return just the run flag.
+        self.executors = {}
+        self.executors['cc'] = cc.exec_cc_op
+        self.executors['br'] = br.exec_br_op
+        self.executors['noopr'] = noopr.exec_noopr_op
+        self.executors['ss'] = ss.exec_ss_op
+        self.executors['rss'] = rss.exec_rss_op
+        self.executors['ssdd'] = ssdd.exec_ssdd_op
+        self.executors['other'] = other.exec_other_op
+
+        # table[instruction] = (handler, decoded)
+        decoded = decode_all_words()
+        self.table = [(self.executors[entry.kind], entry) for entry in decoded]
+        logging.info('initializing DecodeTable done')
+
+    def lookup(self, instruction):
+        """return the (handler, decoded) pair for an instruction word"""
+        return self.table[instruction]
@@ -0,0 +1,301 @@
+"""pdp11_disassembler.py - PDP11 disassembler"""
+import logging
+import pdp11_util as u
+from pdp11_hardware import fix_sign
+from pdp11_decode import decode_word
+from pdp11_decode import MARK
+from pdp11_decode import SOB
+
+# ****************************************************
+# Mnemonics. The instruction classes use these tables too.
+# ****************************************************
+
+NO_OPERAND_NAMES = {}
+NO_OPERAND_NAMES[0o000000] = "HALT"
+NO_OPERAND_NAMES[0o000001] = "WAIT"
+NO_OPERAND_NAMES[0o000002] = "RTI"
+NO_OPERAND_NAMES[0o000003] = "BPT"
+NO_OPERAND_NAMES[0o000004] = "IOT"
+NO_OPERAND_NAMES[0o000005] = "RESET"
+NO_OPERAND_NAMES[0o000006] = "RTT"
+
+BRANCH_NAMES = {}
+BRANCH_NAMES[0o000400] = "BR"
+BRANCH_NAMES[0o001000] = "BNE"
+BRANCH_NAMES[0o001400] = "BEQ"
+BRANCH_NAMES[0o002000] = "BGE"
+BRANCH_NAMES[0o002400] = "BLT"
+BRANCH_NAMES[0o003000] = "BGT"
+BRANCH_NAMES[0o003400] = "BLE"
+BRANCH_NAMES[0o100000] = "BPL"
+BRANCH_NAMES[0o100400] = "BMI"
+BRANCH_NAMES[0o101000] = "BHI"
+BRANCH_NAMES[0o101400] = "BLOS"
+BRANCH_NAMES[0o102000] = "BVC"
+BRANCH_NAMES[0o102400] = "BVS"
+BRANCH_NAMES[0o103000] = "BCC"  # BCC = BHIS
+BRANCH_NAMES[0o103400] = "BCS"  # BCS = BLO
+
+SINGLE_OPERAND_NAMES = {}
+SINGLE_OPERAND_NAMES[0o000100] = "JMP"
+SINGLE_OPERAND_NAMES[0o000300] = "SWAB"
+
+SINGLE_OPERAND_NAMES[0o005000] = "CLR"
+SINGLE_OPERAND_NAMES[0o005100] = "COM"
+SINGLE_OPERAND_NAMES[0o005200] = "INC"
+SINGLE_OPERAND_NAMES[0o005300] = "DEC"
+SINGLE_OPERAND_NAMES[0o005400] = "NEG"
+SINGLE_OPERAND_NAMES[0o005500] = "ADC"
+SINGLE_OPERAND_NAMES[0o005600] = "SBC"
+SINGLE_OPERAND_NAMES[0o005700] = "TST"
+SINGLE_OPERAND_NAMES[0o006000] = "ROR"
+SINGLE_OPERAND_NAMES[0o006100] = "ROL"
+SINGLE_OPERAND_NAMES[0o006200] = "ASR"
+SINGLE_OPERAND_NAMES[0o006300] = "ASL"
+SINGLE_OPERAND_NAMES[0o006400] = "MARK"
+SINGLE_OPERAND_NAMES[0o006500] = "MFPI"
+SINGLE_OPERAND_NAMES[0o006600] = "MTPI"
+SINGLE_OPERAND_NAMES[0o006700] = "SXT"
+
+SINGLE_OPERAND_NAMES[0o105000] = "CLRB"
+SINGLE_OPERAND_NAMES[0o105100] = "COMB"
+SINGLE_OPERAND_NAMES[0o105200] = "INCB"
+SINGLE_OPERAND_NAMES[0o105300] = "DECB"
+SINGLE_OPERAND_NAMES[0o105400] = "NEGB"
+SINGLE_OPERAND_NAMES[0o105500] = "ADCB"
+SINGLE_OPERAND_NAMES[0o105600] = "SBCB"
+SINGLE_OPERAND_NAMES[0o105700] = "TSTB"
+SINGLE_OPERAND_NAMES[0o106000] = "RORB"
+SINGLE_OPERAND_NAMES[0o106100] = "ROLB"
+SINGLE_OPERAND_NAMES[0o106200] = "ASRB"
+SINGLE_OPERAND_NAMES[0o106300] = "ASLB"
+SINGLE_OPERAND_NAMES[0o106400] = "MTPS"
+SINGLE_OPERAND_NAMES[0o106500] = "MFPD"
+SINGLE_OPERAND_NAMES[0o106600] = "MTPD"
+SINGLE_OPERAND_NAMES[0o106700] = "MFPS"
+
+RSS_NAMES = {}
+RSS_NAMES[0o070000] = "MUL"
+RSS_NAMES[0o071000] = "DIV"
+RSS_NAMES[0o072000] = "ASH"
+RSS_NAMES[0o073000] = "ASHC"
+RSS_NAMES[0o074000] = "XOR"
+RSS_NAMES[0o077000] = "SOB"
+
+SSDD_NAMES = {}
+SSDD_NAMES[0o010000] = "MOV"
+SSDD_NAMES[0o020000] = "CMP"
+SSDD_NAMES[0o030000] = "BIT"
+SSDD_NAMES[0o040000] = "BIC"
+SSDD_NAMES[0o050000] = "BIS"
+SSDD_NAMES[0o060000] = "ADD"
+SSDD_NAMES[0o110000] = "MOVB"
+SSDD_NAMES[0o120000] = "CMPB"
+SSDD_NAMES[0o130000] = "BITB"
+SSDD_NAMES[0o140000] = "BICB"
+SSDD_NAMES[0o150000] = "BISB"
+SSDD_NAMES[0o160000] = "SUB"
+
+OTHER_NAMES = {}
+OTHER_NAMES[0o000200] = "RTS"
+OTHER_NAMES[0o004000] = "JSR"
+
+# condition code bits, in the order MACRO-11 names them
+CONDITION_CODE_NAMES = [(0o000010, 'N'), (0o000004, 'Z'), (0o000002, 'V'), (0o000001, 'C')]
+
+REGISTER_NAMES = ['R0', 'R1', 'R2', 'R3', 'R4', 'R5', 'SP', 'PC']
+
+class Disassembler:
+    """Disassembles PDP11 code in memory without running it.
+    memory is a Ram or a memory image (bytes, bytearray or memoryview) starting at address 0.
+    Reading memory never calls i/o device handlers and never changes registers.
+    Results are remembered by address. Ram tells the disassembler when a word it has read is written;
+    for a memory image the words are compared each time."""
+    def __init__(self, memory):
+        logging.info('initializing Disassembler')
+        self.memory = memory
+        # Ram has watchers; a plain image doesn't
+        self.ram = memory if hasattr(memory, 'watch_code') else None
+
+        # address: (words, text)
+        self.cache = {}
+        # word address: [address of every cached instruction that includes that word]
+        self.covering = {}
+
+        self.hits = 0
+        self.misses = 0
+
+    def read_word(self, address):
+        """read a word without side effects"""
+        if self.ram is not None:
+            return self.ram.peek_word(address)
+        return self.memory[address] | (self.memory[address + 1] << 8)
+
+    def top(self):
+        """first address past the end of memory; CPU addresses stop at 16 bits however big memory is"""
+        if self.ram is not None:
+            return min(self.ram.top_of_memory, 0o177777)
+        return len(self.memory) - 1
+
+    def disassemble(self, address):
+        """returns (words, text): the instruction and operand words at address and its assembly"""
+        try:
+            words, text = self.cache[address]
+            if self.ram is not None or all(self.read_word(address + 2 * i) == word for i, word in enumerate(words)):
+                self.hits = self.hits + 1
+                return words, text
+        except KeyError:
+            pass
+        self.misses = self.misses + 1
+        words, text = self.decode(address)
+        self.remember(address, words, text)
+        return words, text
+
+    def remember(self, address, words, text):
+        """cache a result and have Ram tell us if its words change"""
+        if self.ram is not None:
+            addresses = [address + 2 * i for i in range(len(words))]
+            for word_address in addresses:
+                if word_address >= self.ram.io_base or self.ram.peek_physical(word_address) is None:
+                    # i/o page words change without being written,
+                    # and a word the CPU can't read has no physical address to watch
+                    return
+            for word_address in addresses:
+                try:
+                    self.covering[word_address].append(address)
+                except KeyError:
+                    self.covering[word_address] = [address]
+                    self.ram.watch_code(word_address, self.invalidate)
+        self.cache[address] = (words, text)
+
+    def clear(self):
+        """forget every remembered instruction and stop Ram reporting writes to them"""
+        if self.ram is not None:
+            self.ram.unwatch_all(self.invalidate)
+        self.cache = {}
+        self.covering = {}
+
+    def invalidate(self, address):
+        """Ram calls this when a word this disassembler has read is written"""
+        for instruction_address in self.covering.pop(address, []):
+            self.cache.pop(instruction_address, None)
+
+    def disassemble_range(self, start, end):
+        """Disassemble every instruction from start up to end.
+        returns a list of listing lines: address, words, assembly"""
+        lines = []
+        address = start & ~1
+        end = min(end, self.top())
+        while address < end:
+            words, text = self.disassemble(address)
+            octal_words = ' '.join(u.oct6(word) for word in words)
+            lines.append(f'{u.oct6(address)} {u.pad(octal_words, 20)} {text}')
+            address = address + 2 * len(words)
+        return lines
+
+    # ****************************************************
+    # decoding
+    # ****************************************************
+
+    def operand(self, mode, register, address, words):
+        """Disassemble one operand.
+        address is where the next operand word would be; any word read is appended to words.
+        returns the operand text and the next address"""
+        name = REGISTER_NAMES[register]
+        if register == 7 and mode in (2, 3, 6, 7):
+            word = self.read_word(address)
+            words.append(word)
+            address = address + 2
+            if mode == 2:
+                return f'#{word:o}', address
+            if mode == 3:
+                return f'@#{u.oct6(word)}', address
+            # relative: the address is the word plus the PC after the word
+            target = (address + fix_sign(word)) & 0o177777
+            if mode == 6:
+                return u.oct6(target), address
+            return f'@{u.oct6(target)}', address
+        if mode == 0:
+            return name, address
+        if mode == 1:
+            return f'({name})', address
+        if mode == 2:
+            return f'({name})+', address
+        if mode == 3:
+            return f'@({name})+', address
+        if mode == 4:
+            return f'-({name})', address
+        if mode == 5:
+            return f'@-({name})', address
+        word = self.read_word(address)
+        words.append(word)
+        address = address + 2
+        if mode == 6:
+            return f'{fix_sign(word):o}({name})', address
+        return f'@{fix_sign(word):o}({name})', address
+
+    def condition_codes(self, instruction):
+        """disassemble a condition code instruction"""
+        bits = instruction & 0o000017
+        if instruction & 0o000020:
+            if bits == 0o17:
+                return 'SCC'
+            verb = 'SE'
+        else:
+            if bits == 0:
+                return 'NOP'
+            if bits == 0o17:
+                return 'CCC'
+            verb = 'CL'
+        return '!'.join(f'{verb}{letter}' for mask, letter in CONDITION_CODE_NAMES if bits & mask)
+
+    def decode(self, address):
+        """disassemble the instruction at address. returns (words, text)"""
+        return self.decode_fetched(self.read_word(address), address + 2)
+
+    def decode_fetched(self, instruction, pc):
+        """disassemble an instruction word that has already been read; its operand words start at pc.
+        returns (words, text)"""
+        words = [instruction]
+        decoded = decode_word(instruction)
+        kind = decoded.kind
+        if kind == 'cc':
+            text = self.condition_codes(instruction)
+        elif kind == 'br':
+            offset = decoded.offset
+            if offset & 0o200:
+                offset = offset - 0o400
+            target = (pc + 2 * offset) & 0o177777
+            text = f'{BRANCH_NAMES[decoded.opcode]} {u.oct6(target)}'
+        elif kind == 'noopr':
+            text = NO_OPERAND_NAMES[instruction]
+        elif kind == 'ss' and decoded.opcode == MARK:
+            text = f'MARK {decoded.offset:o}'
+        elif kind == 'ss':
+            destination, pc = self.operand(decoded.dst_mode, decoded.dst_reg, pc, words)
+            text = f'{SINGLE_OPERAND_NAMES[decoded.opcode]} {destination}'
+        elif kind == 'rss':
+            register = REGISTER_NAMES[decoded.src_reg]
+            name = RSS_NAMES[decoded.opcode]
+            if decoded.opcode == SOB:
+                # SOB R,NN branches back
+                target = (pc - 2 * decoded.offset) & 0o177777
+                text = f'{name} {register},{u.oct6(target)}'
+            else:
+                source, pc = self.operand(decoded.dst_mode, decoded.dst_reg, pc, words)
+                if decoded.opcode == 0o074000:
+                    text = f'{name} {register},{source}'
+                else:
+                    text = f'{name} {source},{register}'
+        elif kind == 'ssdd':
+            source, pc = self.operand(decoded.src_mode, decoded.src_reg, pc, words)
+            destination, pc = self.operand(decoded.dst_mode, decoded.dst_reg, pc, words)
+            text = f'{SSDD_NAMES[decoded.opcode]} {source},{destination}'
+        elif decoded.opcode == 0o004000:
+            destination, pc = self.operand(decoded.dst_mode, decoded.dst_reg, pc, words)
+            text = f'JSR {REGISTER_NAMES[decoded.src_reg]},{destination}'
+        elif decoded.opcode == 0o000200 and instruction & 0o000070 == 0:
+            text = f'RTS {REGISTER_NAMES[decoded.src_reg]}'
+        else:
+            text = f'.WORD {u.oct6(instruction)}'
+        return tuple(words), text
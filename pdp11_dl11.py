@@ -2,15 +2,71 @@
 import logging
 import pdp11_util as u
 
+# characters each FIFO holds
+FIFO_SIZE = 256
+# Characters the guest can queue before XMIT_RDY clears.
+# A real DL11 clears it after every character until the line has sent it, which is a depth of 1.
+# The default lets the guest run a whole FIFO ahead of the terminal.
+READY_DEPTH = FIFO_SIZE
+
+class Fifo:
+    """A bounded queue of bytes between one producer thread and one consumer thread.
+    Only put moves tail and only get moves head, and a slot is filled before tail moves past it,
+    so neither side needs a lock and neither ever waits for the other."""
+    def __init__(self, size=FIFO_SIZE, contents=()):
+        self.size = size
+        self.slots = [0] * size
+        self.head = 0   # count of bytes taken out
+        self.tail = 0   # count of bytes put in
+        for byte in contents:
+            self.put(byte)
+
+    def __len__(self):
+        return self.tail - self.head
+
+    def full(self):
+        """True if put would fail"""
+        return self.tail - self.head == self.size
+
+    def put(self, byte):
+        """producer: add byte to the queue. Returns False, and drops byte, if the queue is full."""
+        tail = self.tail
+        if tail - self.head == self.size:
+            return False
+        self.slots[tail % self.size] = byte
+        self.tail = tail + 1
+        return True
+
+    def get(self):
+        """consumer: remove and return the oldest byte, or None if the queue is empty"""
+        head = self.head
+        if head == self.tail:
+            return None
+        byte = self.slots[head % self.size]
+        self.head = head + 1
+        return byte
+
+    def refill(self, contents):
+        """Empty the queue and put contents in it, for loading.
+        The same object stays in place, so a terminal holding it keeps working.
+        Only right while neither side is running."""
+        self.head = self.tail
+        for byte in contents:
+            self.put(byte)
+
+    def contents(self):
+        """the bytes in the queue, oldest first, for saving. Only right while neither side is running."""
+        return [self.slots[i % self.size] for i in range(self.head, self.tail)]
+
 class DL11:
     """DEC DL11 serial interface emulator"""
-    def __init__(self, ram, base_address):
-        """dl11(ram object, base address for this device)"""
+    def __init__(self, ram, base_address, ready_depth=READY_DEPTH):
+        """dl11(ram object, base address for this device, characters queued before XMIT_RDY clears)"""
         logging.info(f'initializing dl11({oct(base_address)})')
+        assert 1 <= ready_depth <= FIFO_SIZE, f'dl11 ready_depth {ready_depth} is not 1 to {FIFO_SIZE}'
+        self.ready_depth = ready_depth
         self.ram = ram
         logging.info(f'dl11 ram:{self.ram}')
-        self.lock = ram.lock
-        logging.info(f'dl11 lock:{self.lock}')
         self.RCSR_address = base_address
         self.RBUF_address = base_address + 2
         self.XCSR_address = base_address + 4
@@ -49,27 +105,38 @@ class DL11:
         self.XCSR = self.XCSR_XMIT_RDY   # transmit status register ready on init
         self.XBUF = 0   # transmit buffer
 
-        self.i_set_lock = False
-        logging.info(f'ram.lock: {self.lock}')
+        # The terminal puts typed characters in receive_fifo and the CPU takes them out;
+        # the CPU puts transmitted characters in transmit_fifo and the terminal takes them out.
+        self.receive_fifo = Fifo()
+        self.transmit_fifo = Fifo()
         logging.info('initializing dl11 done')
 
-    # All reads and writes to IO buffers and CSRs must be protected.
-    # CPU access to these routines is supposed to happen through hardware ram.read and ram.write methods.
-    # DL11 access happens directly through these calls.
-
-    def get_lock(self, whocalled=''):
-        logging.info(f'get_lock called by {whocalled}')
-        if not self.lock.locked(): #self.lock.is_set(): # lock was NOT set
-            self.lock.acquire()
-            logging.info('dl11 got lock')
-            self.i_set_lock = True
-
-    def release_lock(self, whocalled=''):
-        logging.info(f'release_lock called by {whocalled}')
-        if self.i_set_lock:
-            self.lock.release()
-            logging.info('dl11 released lock')
-            self.i_set_lock = False
+    # The registers belong to the CPU thread: only the methods the CPU calls through
+    # ram.read and ram.write change them. A terminal, on whatever thread it runs,
+    # only calls type_character, transmitted_character and input_pending,
+    # which go through the FIFOs, so neither side takes a lock or waits for the other.
+
+    def type_character(self, byte):
+        """The terminal calls this when a key is typed.
+        Returns False, and drops the character, if the CPU has let the receive FIFO fill up."""
+        if not self.receive_fifo.put(byte & 0o377):
+            logging.warning(f'dl11 receive FIFO full; dropped {self.safe_character(byte & 0o177)}')
+            return False
+        # wake the CPU if it is waiting for a character
+        self.ram.signal_io()
+        return True
+
+    def transmitted_character(self):
+        """The terminal calls this for the next character the CPU transmitted, or None if there isn't one."""
+        byte = self.transmit_fifo.get()
+        if byte is not None and (self.XCSR & self.XCSR_XMIT_RDY) == 0:
+            # wake the CPU if it is waiting for room in the transmit FIFO
+            self.ram.signal_io()
+        return byte
+
+    def input_pending(self):
+        """True while a typed character hasn't been read from RBUF yet"""
+        return len(self.receive_fifo) != 0 or (self.RCSR & self.RCSR_RCVR_DONE) != 0
 
     def safe_character(self, byte):
         """return character if it is printable"""
@@ -93,17 +160,21 @@ class DL11:
     def write_RCSR(self, byte):
         """write to receiver status register"""
         #logging.info(f' dl11.write_RCSR({oct(byte)})')
-        self.get_lock('write_RCSR')
         self.RCSR = byte
-        self.release_lock('write_RCSR')
 
     def read_RCSR(self):
         """read from receiver status register"""
+        self.receive()
         #logging.info(f' dl11.read_RCSR() returns {oct(self.RCSR)}')
-        self.get_lock('read_RCSR')
-        result = self.RCSR
-        self.release_lock('read_RCSR')
-        return result
+        return self.RCSR
+
+    def receive(self):
+        """If RBUF has been read, move the next typed character into it and set the done bit"""
+        if (self.RCSR & self.RCSR_RCVR_DONE) == 0:
+            byte = self.receive_fifo.get()
+            if byte is not None:
+                self.RBUF = byte
+                self.RCSR = self.RCSR | self.RCSR_RCVR_DONE
 
     # RBUF receiver data buffer (ro)
     # 15: error
@@ -112,81 +183,62 @@ class DL11:
     # 12: receive parity error
     # 7-0 received data
     def write_RBUF(self, byte):
-        """DL11 calls this to write to receiver buffer and set ready bit"""
-        logging.info(f'dl11.write_RBUF {oct(byte)} {self.safe_character(byte)}')
-        self.get_lock(f'write_RBUF({oct(byte)})')
+        """Write to receiver buffer and set ready bit.
+        Maintenance loopback does this; so does the CPU writing RBUF, which real hardware ignores."""
+        #logging.info(f'dl11.write_RBUF {oct(byte)} {self.safe_character(byte & 0o177)}')
         self.RBUF = byte
         self.RCSR = self.RCSR | self.RCSR_RCVR_DONE
-        if (self.RCSR & self.RCSR_RCVR_DONE) != self.RCSR_RCVR_DONE:
-            logging.error(f'XCSR {oct(self.RCSR)} was not set with {oct(self.RCSR_RCVR_DONE)}')
-        self.release_lock('write_RBUF')
-        logging.info('dl11.write_RBUF exit')
 
     def read_RBUF(self):
         """PDP11 calls this to read from receiver buffer. Read buffer and reset ready bit"""
-        self.get_lock('read_RBUF')
+        self.receive()
         result = self.RBUF
         #logging.info(f'dl11.read_RBUF() returns {oct(result)} {self.safe_character(result)}')
-        RCSR = self.RCSR & ~self.RCSR_RCVR_DONE
-        self.RCSR = RCSR
-        if (self.RCSR & self.RCSR_RCVR_DONE) == self.RCSR_RCVR_DONE:
-            logging.error(f'XCSR {oct(self.RCSR)} was not cleared with {oct(self.RCSR_RCVR_DONE)}')
         #   cleared when RBUF is read
-        self.release_lock('read_RBUF')
+        self.RCSR = self.RCSR & ~self.RCSR_RCVR_DONE
         return result
 
     # Transmitter enables CPU to send characters to a terminal.
     # XCSR transmit status register (rw)
     # 7: transmitter ready (ro).
-    #   Cleared when XBUF is loaded.
+    #   Cleared when XBUF is loaded and the transmit FIFO is full.
     #   Set when XBUF can accept another character.
     # 6: transmit interrupt enable (rw)
     # 2: maintenance. when set sends serial output to serial input (rw)
     # 0: break. when set sends continuous space (rw)
     def write_XCSR(self, byte):
         """write to transmitter status register"""
-        self.get_lock('write_XCSR')
         #logging.debug(f'dl11.write_XCSR({oct(byte)})') # often gives uninteresting results
         # make the RW and RO bits play nice
         # only two are implemented so far
         self.XCSR = byte
-        self.release_lock('write_XCSR')
 
     def read_XCSR(self):
         """read from transitter status register"""
-        self.get_lock('read_XCSR')
-        result = self.XCSR
-        self.release_lock('read_XCSR')
-        #logging.debug(f'dl11.read_XCSR returns {oct(result)}')
-        return result
+        if (self.XCSR & self.XCSR_XMIT_RDY) == 0 and len(self.transmit_fifo) < self.ready_depth \
+                and not self.transmit_fifo.full():
+            self.XCSR = self.XCSR | self.XCSR_XMIT_RDY
+        #logging.debug(f'dl11.read_XCSR returns {oct(self.XCSR)}')
+        return self.XCSR
 
     # XBUF transmit data buffer (wo)
     # 7-0 transmitted data buffer
     def write_XBUF(self, byte):
         """PDP11 calls this to write to transmitter buffer register."""
-        self.get_lock('write_XBUF({oct(byte)})')
         #logging.debug(f'dl11.write_XBUF({oct(byte)}) {self.safe_character(byte)}"')
         self.XBUF = byte
-        # self.XCSR_XMIT_RDY is cleared when XBUF is loaded
-        XCSR = self.XCSR & ~self.XCSR_XMIT_RDY
-        self.XCSR = XCSR
-        if (self.XCSR & self.XCSR_XMIT_RDY) == self.XCSR_XMIT_RDY:
-            logging.error(f'XCSR {oct(self.XCSR)} was not cleared with {oct(self.XCSR_XMIT_RDY)}')
         # check for Maintenance mode
         if (self.XCSR & self.XCSR_MAINT) == self.XCSR_MAINT:
             self.write_RBUF(byte)
-        self.release_lock('write_XBUF')
+            return
+        if not self.transmit_fifo.put(byte & 0o377):
+            logging.warning(f'dl11 transmit FIFO full; dropped {self.safe_character(byte & 0o177)}')
+        # self.XCSR_XMIT_RDY is cleared when the terminal has fallen ready_depth characters behind
+        if len(self.transmit_fifo) >= self.ready_depth or self.transmit_fifo.full():
+            self.XCSR = self.XCSR & ~self.XCSR_XMIT_RDY
 
     def read_XBUF(self):
-        """DL11 calls this to read from transmitter buffer register."""
-        self.get_lock('read_XBUF')
-        result = self.XBUF
-        # self.XCSR_XMIT_RDY is set when XBUF can accept another character
-        XCSR = self.XCSR | self.XCSR_XMIT_RDY # this works
-        self.XCSR = XCSR # This fails! *****
-        if (self.XCSR & self.XCSR_XMIT_RDY) != self.XCSR_XMIT_RDY:
-            logging.error(f'XCSR {oct(self.XCSR)} was not set with {oct(self.XCSR_XMIT_RDY)}')
-        #logging.debug(f'dl11.read_XBUF returns {oct(result)} {self.safe_character(result)}')
-        self.release_lock('read_XBUF')
-        return result
+        """PDP11 calls this to read from transmitter buffer register.
+        XBUF is write-only, so this is the last character written and changes nothing."""
+        return self.XBUF
 
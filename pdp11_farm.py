@@ -0,0 +1,160 @@
+"""pdp11_farm.py - run many independent guest jobs in parallel from one warm machine
+
+python3 pdp11_farm.py job1.txt job2.txt ...                   boot the M9301-YA console, then type each file in a worker
+python3 pdp11_farm.py --snapshot warm.snapshot job1.txt ...   start from a snapshot instead of booting
+python3 pdp11_farm.py --workers 8 --results farm.json ...     eight workers at a time; results as json
+
+The runner sets up one PDP11, then forks a worker process for each job.
+A worker inherits the warm machine copy-on-write, so starting a job costs a fork, not a boot,
+and a job's changes to memory are its own. Workers need the fork start method, so this runs on Linux and macOS.
+"""
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import multiprocessing
+
+from pdp11 import PDP11
+from pdp11_boot import pdp11Boot
+from pdp11_serial import Serial
+
+# instructions, including ones idled through, after which a job that hasn't finished is stopped
+LIMIT = 10000000
+# The M9301-YA console prompt. It pads the prompt with NULs, which finished ignores.
+PROMPT = '$'
+
+# The warm machine every worker is forked from.
+# It's a module global so a forked worker finds it without it being pickled.
+warm = None
+
+class Job:
+    """One guest run: the text to type at the console, optionally a program to load and start first,
+    and the output that says it's finished. With no until, it runs until the guest halts or limit."""
+    def __init__(self, name, script='', until=None, program=None, address=0o1000, limit=LIMIT):
+        self.name = name
+        self.script = script
+        self.until = until
+        self.program = program
+        self.address = address
+        self.limit = limit
+
+def run_job(job):
+    """Run one job on the warm machine in this worker. Returns a dictionary of results."""
+    pdp11 = warm
+    logging.disable(logging.INFO)
+    if job.program is not None:
+        boot = pdp11Boot(pdp11.reg, pdp11.ram)
+        boot.load_machine_code(job.program, job.address)
+        pdp11.reg.set_pc(job.address, 'run_job')
+    serial = Serial(pdp11.dl11, job.script)
+    pdp11.device_polls.append(serial.poll)
+
+    # how much output there was when the last character was typed;
+    # until has to come after that, not be the prompt the last line was typed at
+    typed = []
+
+    def finished(pdp11):
+        if job.until is None or serial.typed < len(job.script):
+            return False
+        if not typed:
+            typed.append(len(serial.output))
+        return ''.join(serial.output[typed[0]:]).rstrip('\x00').endswith(job.until)
+
+    cycles = pdp11.CPU_cycles
+    idle_cycles = pdp11.idle_cycles
+    start = time.perf_counter()
+    run = pdp11.run_until(finished, job.limit)
+    wall_time = time.perf_counter() - start
+    serial.poll()
+    return {'job': job.name,
+            'pid': os.getpid(),
+            'output': serial.text(),
+            'finished': finished(pdp11) or (job.until is None and not run),
+            'halted': not run,
+            'instructions': pdp11.CPU_cycles - cycles,
+            'idle_instructions': pdp11.idle_cycles - idle_cycles,
+            'wall_time': wall_time}
+
+class RunFarm:
+    """Runs jobs in worker processes forked from pdp11, at most workers at a time.
+    Each worker runs one job and exits, so every job starts from the same warm state."""
+    def __init__(self, pdp11, workers=None):
+        logging.info('initializing RunFarm')
+        self.pdp11 = pdp11
+        if workers is None:
+            workers = os.cpu_count()
+        self.workers = workers
+
+    def run(self, jobs):
+        """run every job and return their results, in the same order as jobs"""
+        global warm
+        warm = self.pdp11
+        context = multiprocessing.get_context('fork')
+        start = time.perf_counter()
+        try:
+            # a reused worker would start its next job from the memory the last one changed
+            with context.Pool(self.workers, maxtasksperchild=1) as pool:
+                results = pool.map(run_job, jobs, chunksize=1)
+        finally:
+            warm = None
+        logging.info(f'RunFarm run: {len(jobs)} jobs in {time.perf_counter() - start:.3f} s with {self.workers} workers')
+        return results
+
+def summary(results, elapsed):
+    """totals for a list of job results that took elapsed seconds"""
+    instructions = sum(result['instructions'] for result in results)
+    return {'jobs': len(results),
+            'finished': sum(1 for result in results if result['finished']),
+            'instructions': instructions,
+            'elapsed': elapsed,
+            'rate': instructions / elapsed if elapsed else 0}
+
+def boot_m9301(pdp11):
+    """run the M9301-YA diagnostics until the console prompts"""
+    boot = pdp11Boot(pdp11.reg, pdp11.ram)
+    boot.read_pdp11_assembly_file('source/M9301-YA.txt')
+    pdp11.reg.set_pc(0o173000, 'boot_m9301')
+    serial = Serial(pdp11.dl11)
+    pdp11.device_polls.append(serial.poll)
+    pdp11.run_until(lambda pdp11: serial.text().rstrip('\x00').endswith(PROMPT), LIMIT)
+    pdp11.device_polls.remove(serial.poll)
+
+def main(arguments):
+    """run a job for each script file; returns the exit status"""
+    parser = argparse.ArgumentParser(description='run PDP11 guest jobs in parallel from one warm machine')
+    parser.add_argument('scripts', nargs='+', help='files of console input, one job each')
+    parser.add_argument('--snapshot', help='start from this snapshot instead of booting the M9301-YA console')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='worker processes at a time')
+    parser.add_argument('--until', default=PROMPT, help='output that ends a job')
+    parser.add_argument('--limit', type=int, default=LIMIT, help='instructions after which a job is stopped')
+    parser.add_argument('--results', help='json file to write the results to')
+    options = parser.parse_args(arguments)
+
+    pdp11 = PDP11()
+    if options.snapshot:
+        pdp11.load_snapshot(options.snapshot)
+    else:
+        boot_m9301(pdp11)
+    jobs = []
+    for file in options.scripts:
+        with open(file, 'r', encoding='utf-8') as script:
+            # console input ends lines with CR
+            jobs.append(Job(file, script.read().replace('\n', '\r'), options.until, limit=options.limit))
+
+    start = time.perf_counter()
+    results = RunFarm(pdp11, options.workers).run(jobs)
+    totals = summary(results, time.perf_counter() - start)
+    if options.results:
+        with open(options.results, 'w') as jsonfile:
+            json.dump({'summary': totals, 'jobs': results}, jsonfile, indent=2)
+    for result in results:
+        print(f"{result['job']:20} {result['instructions']:10d} instructions {result['wall_time']:8.3f} s  "
+              f"finished:{result['finished']}")
+    print(f"{totals['finished']} of {totals['jobs']} jobs finished, "
+          f"{totals['instructions']} instructions in {totals['elapsed']:.3f} s, {totals['rate']:.0f} per second")
+    return 0 if totals['finished'] == totals['jobs'] else 1
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -1,6 +1,8 @@
 """PDP11 Registers, RAM, PSW, Stack"""
 
 import sys
+import mmap
+import time
 import logging
 import threading
 import pdp11_util as u
@@ -12,6 +14,14 @@ MASK_BYTE_MSB = 0o000200
 MASK_LOW_BYTE = 0o000377
 MASK_HIGH_BYTE = 0o177400
 
+# Ram.resident_pages reports memory in pages the size of an MMU page
+PAGE_SIZE = 0o20000
+ZERO_PAGE = bytes(PAGE_SIZE)
+
+class NonExistentMemory(Exception):
+    """A block transfer reached past the top of memory.
+    On a real Unibus nothing answers there, and the device controller reports NXM."""
+
 def fix_sign(word):
     """fix a negative word so it will work with python math"""
     if word & MASK_WORD_MSB:
@@ -27,15 +37,6 @@ def address_offset(address, offset):
     result = address + fix_sign(offset)
     return result
 
-def formatted_offset(offset):
-    '''Format affset for disassembly'''
-    formatted = offset
-    # if the high bit is set, it's negative
-    if offset & MASK_WORD_MSB == MASK_WORD_MSB:
-        # mask it off and subtract what's left
-        formatted = -(0o077777 - (offset & 0o077777)) * 2
-    return f'{oct(formatted)}'
-
 class Registers:
     """PDP11 registers including PC and SP"""
     def __init__(self):
@@ -113,6 +114,10 @@ class Registers:
         assert newsp <= MASK_WORD
         self.__registers[self.__sp] = newsp
 
+    def get_register_file(self):
+        """the list R0-R7 itself, for compiled code that reads and writes registers directly"""
+        return self.__registers
+
     def registers_to_string(self):
         """logging.info all the registers in the log"""
         index = 0
@@ -122,6 +127,18 @@ class Registers:
             index = index + 1
         return report
 
+class LittleEndianWords:
+    """Ram.words on a big-endian host, where a memoryview cast to 'H' would swap the bytes"""
+    def __init__(self, memory):
+        self.memory = memory
+
+    def __getitem__(self, index):
+        return (self.memory[2 * index + 1] << 8) + self.memory[2 * index]
+
+    def __setitem__(self, index, value):
+        self.memory[2 * index + 1] = (value & MASK_HIGH_BYTE) >> 8
+        self.memory[2 * index] = value & MASK_LOW_BYTE
+
 class Ram:
     """PDP11 Random Access Memory including I/O page"""
     # Sixteen-bit words are stored little-endian.
@@ -149,13 +166,26 @@ class Ram:
         # the io page is the top 4k words (8kB) of memory
         self.io_space = self.top_of_memory - 0o017777
         logging.info(f'{bits} bits -> top_of_memory: {oct(self.top_of_memory)} = {self.top_of_memory}; io_space:{oct(self.io_space)} io_space={self.io_space}')
+        # The CPU only makes 16-bit addresses. Without memory management,
+        # the top 8kB of them, from io_base, are the io page at the top of physical memory.
+        # Devices are registered at these addresses. With 16 bits they're the same as the physical ones.
+        self.io_base = 0o160000
+        self.io_offset = self.io_space - self.io_base
 
         # instantiate the byte array
         # Nobody outside this class is supposed to access this.
         # Sometimes I really hate Python and people's attitudes when you want a feature. 
         # For example, when people suggest that Python shoudl have private variables, 
         # the responses are the usual: you don't need that, don't write it that way, whaty's wrong with ugly code? 
-        self.memory = bytearray(self.top_of_memory+1)
+        # It's an anonymous mmap rather than a bytearray:
+        # the operating system gives it zeroed pages the first time they're touched,
+        # so memory the guest never uses costs no RSS and no time to set up.
+        # It's private, so a forked copy of the emulator gets its own memory.
+        if hasattr(mmap, 'MAP_PRIVATE'):
+            self.memory = mmap.mmap(-1, self.top_of_memory+1, flags=mmap.MAP_PRIVATE)
+        else:
+            self.memory = mmap.mmap(-1, self.top_of_memory+1)
+        self.view_words()
 
         # set up always-ready i/o device status words
         #self.write_word(self. TKS, 0o000000)
@@ -167,37 +197,35 @@ class Ram:
         # io map is dictionaries of addresses, methods, and locks
         self.iomap_readers = {}
         self.iomap_writers = {}
+        # The same handlers in arrays with a slot for each byte of the io page, None where there's no device,
+        # so an access only has to compare its address with io_space to know it's ordinary memory.
+        self.io_readers = [None] * (self.top_of_memory + 1 - self.io_space)
+        self.io_writers = [None] * (self.top_of_memory + 1 - self.io_space)
+
+        # Code caches watch the words they have decoded.
+        # A write to a watched word calls its invalidate methods.
+        # word address: [invalidate methods]
+        self.code_watchers = {}
+
+        # Devices set this event when their state changes,
+        # to wake a CPU that is waiting for them.
+        # io_signal_time is when the last one did, a CLOCK_MONOTONIC time in nanoseconds.
+        self.io_event = threading.Event()
+        self.io_signal_time = 0
 
         # set up the vector space
         # the bottom area is io device handler vectors
         self.top_of_vector_space = 0o274
-        for address in range(0o0, self.top_of_vector_space):
-           self.write_byte(address, 0o277)
+        self.memory[0:self.top_of_vector_space] = bytes([0o277]) * self.top_of_vector_space
 
-        # Initialize the shadow RAM for io page.
+        # The shadow RAM for io page starts out 0, like the rest of the new bytearray.
         # If there's a read or write to some address in io page
         # that's not been assigned, it will just read 0 or whatever was written.
-        for address in range(self.io_space, self.top_of_memory):
-           self.write_byte(address, 0o0)
 
+        # io handlers are called without taking lock.
+        # Devices that talk to other threads, like DL11 to the terminals, do it through their own FIFOs.
         self.lock = lock
-        self.i_set_lock = False
-        logging.info(f'Ram init done. Lock object:{self.lock}')
-
-    # emulator interface to locking
-    # The idea is that any time there's unlocked access to IO page RAM,
-    # It's the CPU doing it and that section needs to be locked.
-    def get_lock(self, whocalled=''):
-        if not self.lock.locked(): #self.ram.lock.is_set(): # lock was NOT set
-            self.lock.acquire()
-            logging.info(f'{whocalled} got lock')
-            self.i_set_lock = True
-
-    def release_lock(self, whocalled=''):
-        if self.i_set_lock:
-            self.lock.release()
-            logging.debug(f'{whocalled} released lock')
-            self.i_set_lock = False
+        logging.info('Ram init done')
 
     def safe_character(self, byte):
         """return character if it is printable"""
@@ -214,52 +242,247 @@ class Ram:
         return result
 
     def register_io_writer(self, device_address, method):
-        """map i/o write handler into memory"""
-        assert device_address < self.top_of_memory
-        assert device_address >= self.io_space
-        # The actual criteria are a little more stringent.
+        """map i/o write handler into memory.
+        device_address can be the CPU address, from io_base, or the physical one, from io_space."""
+        index = self.io_index(device_address)
         logging.info(f'register_io_writer({oct(device_address)}, {method.__name__})')
-        self.iomap_writers[device_address] = method
+        self.iomap_writers[self.io_base + index] = method
+        self.io_writers[index] = method
 
     def register_io_reader(self, device_address, method):
-        """map i/o read handler into memory"""
-        assert device_address < self.top_of_memory
-        assert device_address >= self.io_space
-        # The actual criteria are a little more stringent.
+        """map i/o read handler into memory.
+        device_address can be the CPU address, from io_base, or the physical one, from io_space."""
+        index = self.io_index(device_address)
         logging.info(f'register_io_reader({oct(device_address)}, {method.__name__})')
-        self.iomap_readers[device_address] = method
+        self.iomap_readers[self.io_base + index] = method
+        self.io_readers[index] = method
         # This has been confirmed to work from here
 
+    def io_index(self, device_address):
+        """the slot in the handler arrays for a device register address"""
+        assert device_address < self.top_of_memory
+        if device_address >= self.io_space:
+            return device_address - self.io_space
+        assert device_address >= self.io_base
+        # The actual criteria are a little more stringent.
+        return device_address - self.io_base
+
+    def signal_io(self):
+        """a device calls this when its state changes"""
+        self.io_signal_time = time.clock_gettime_ns(time.CLOCK_MONOTONIC)
+        self.io_event.set()
+
+    def wait_io(self, timeout):
+        """Wait until a device signals or timeout seconds pass.
+        Returns True if a device signalled.
+        The event is only cleared after a signal: a device that signals just after
+        a timeout is still seen by the next wait."""
+        signalled = self.io_event.wait(timeout)
+        if signalled:
+            self.io_event.clear()
+        return signalled
+
+    def resident_pages(self):
+        """Returns [(physical address, memoryview)] for every PAGE_SIZE page of memory that isn't all zero,
+        so snapshots and dumps can leave out memory the guest never touched.
+        The memoryviews are of memory itself, so they can be written out without copying.
+        Reading a page that was never touched doesn't make it resident."""
+        pages = []
+        view = memoryview(self.memory)
+        for address in range(0, self.top_of_memory + 1, PAGE_SIZE):
+            if self.memory[address:address + PAGE_SIZE] != ZERO_PAGE:
+                pages.append((address, view[address:address + PAGE_SIZE]))
+        return pages
+
+    def load_image(self, file, offset=0):
+        """Make memory a copy-on-write mapping of the memory image at offset in file.
+        Nothing is read until the guest touches it, and writes don't go back to the file.
+        Code caches must be cleared first: every code watcher is forgotten.
+        The memory it replaces is closed, unless a view from read_block still uses it;
+        then it goes when the last view does."""
+        with open(file, 'rb') as image:
+            memory = mmap.mmap(image.fileno(), self.top_of_memory + 1, access=mmap.ACCESS_COPY, offset=offset)
+        old = self.memory
+        if isinstance(self.words, memoryview):
+            self.words.release()
+        self.memory = memory
+        self.view_words()
+        self.code_watchers = {}
+        try:
+            old.close()
+        except BufferError:
+            pass
+
+    def view_words(self):
+        """Set up words, the same memory as 16-bit words, so an aligned word access is a single index."""
+        # PDP-11 words are little-endian, like the host's native words on most machines.
+        if sys.byteorder == 'little':
+            self.words = memoryview(self.memory).cast('H')
+        else:
+            self.words = LittleEndianWords(self.memory)
+
+    def physical(self, address):
+        """The physical address of a CPU address.
+        Memory management swaps this for a method that translates through the page registers."""
+        if address >= self.io_base:
+            return address + self.io_offset
+        return address
+
+    def peek_physical(self, address):
+        """The physical address of a CPU address, or None if the CPU can't read it.
+        Unlike physical, this never aborts; memory management swaps it too."""
+        return self.physical(address)
+
+    def peek_word(self, address):
+        """Read a word of memory without calling i/o device handlers, for disassembly and dumps.
+        In the i/o page this returns whatever is in the shadow RAM.
+        A page memory management doesn't let the CPU read reads as 0."""
+        address = self.peek_physical(address)
+        if address is None:
+            return 0
+        if address & 1:
+            return (self.memory[address + 1] << 8) + self.memory[address]
+        return self.words[address >> 1]
+
+    def watch_code(self, address, invalidate):
+        """call invalidate(word address) the next time the word at address is written.
+        Watches are kept by physical address, so a write through any mapping finds them."""
+        word_address = address & ~1
+        physical = self.physical(word_address)
+        try:
+            self.code_watchers[physical].append((invalidate, word_address))
+        except KeyError:
+            self.code_watchers[physical] = [(invalidate, word_address)]
+
+    def unwatch_code(self, address, invalidate):
+        """stop calling invalidate for the word at address"""
+        watchers = self.code_watchers.get(self.physical(address & ~1), [])
+        for watcher in watchers:
+            if watcher[0] == invalidate:
+                watchers.remove(watcher)
+                return
+
+    def unwatch_all(self, invalidate):
+        """stop calling invalidate for every word it watches.
+        Watches are found by callback rather than by address, so this works after the mapping changes."""
+        for physical in list(self.code_watchers):
+            watchers = [watcher for watcher in self.code_watchers[physical] if watcher[0] != invalidate]
+            if watchers:
+                self.code_watchers[physical] = watchers
+            else:
+                del self.code_watchers[physical]
+
+    def invalidate_code(self, physical):
+        """tell every code cache watching this word that it changed"""
+        watchers = self.code_watchers.pop(physical & ~1, [])
+        for invalidate, address in watchers:
+            invalidate(address)
+
+    # Device controllers move whole sectors and buffers with read_block and write_block.
+    # Their addresses are bus addresses: physical ones, from io_space for the io page,
+    # because DMA doesn't go through the CPU's memory management.
+
+    def check_block(self, address, length):
+        """raise NonExistentMemory unless the length bytes from physical address are all in memory"""
+        if address < 0 or length < 0 or address + length > self.top_of_memory + 1:
+            raise NonExistentMemory(f'block of {length} bytes at {oct(address)} is outside memory')
+
+    def read_block(self, address, length):
+        """Returns a memoryview of the length bytes of physical memory from address, for a device to DMA out of.
+        Below the io page it's a view of memory itself, so there's no copy,
+        and it's only good until the next load_image.
+        Any part in the io page is read through the device handlers, like a word at a time on the bus,
+        so that part is a copy."""
+        self.check_block(address, length)
+        end = address + length
+        if end <= self.io_space:
+            return memoryview(self.memory)[address:end]
+        block = bytearray(self.memory[address:end])
+        for physical in range(max(address, self.io_space), end):
+            if physical & 1 == 0 and physical + 1 < end:
+                word = self.read_word_physical(physical)
+                block[physical - address] = word & MASK_LOW_BYTE
+                block[physical + 1 - address] = word >> 8
+            elif physical & 1 == 0 or physical == address:
+                block[physical - address] = self.read_byte_physical(physical)
+        return memoryview(block)
+
+    def write_block(self, address, buffer):
+        """Copy buffer, anything that has the buffer protocol, into physical memory from address, for a device to DMA into.
+        Below the io page it's a single slice assignment.
+        Code caches watching any word it changes are told, and any part in the io page
+        is written through the device handlers, like a word at a time on the bus."""
+        buffer = memoryview(buffer).cast('B')
+        length = len(buffer)
+        self.check_block(address, length)
+        end = min(address + length, self.io_space)
+        if end > address:
+            self.memory[address:end] = buffer[:end - address]
+        for physical in range(max(address, self.io_space), address + length):
+            if physical & 1 == 0 and physical + 1 < address + length:
+                self.write_word_physical(physical, buffer[physical - address] + (buffer[physical + 1 - address] << 8))
+            elif physical & 1 == 0 or physical == address:
+                self.write_byte_physical(physical, buffer[physical - address])
+        if self.code_watchers and end > address:
+            self.invalidate_block(address, end)
+
+    def invalidate_block(self, address, end):
+        """tell code caches about every watched word with a byte from address up to end"""
+        first = address & ~1
+        if len(self.code_watchers) < (end - first) >> 1:
+            changed = [physical for physical in self.code_watchers if first <= physical < end]
+        else:
+            changed = [physical for physical in range(first, end, 2) if physical in self.code_watchers]
+        for physical in changed:
+            self.invalidate_code(physical)
+
+    # The CPU reads and writes memory with write_byte, read_byte, write_word and read_word.
+    # Each of those does ordinary memory below io_base itself and hands the io page
+    # to the one that takes a physical address.
+    # Memory management replaces them on the instance with methods that translate the address first.
+    # Their addresses are 16-bit CPU addresses; physical ones above that go to the *_physical methods.
+
     def write_byte(self, address, data):
         """write a byte to memory.
         Address can be even or odd"""
-        assert address <= self.top_of_memory    # *** should be a trap
+        assert address <= MASK_WORD, f'write_byte: {oct(address)} is not a CPU address; use write_byte_physical'
+        if address >= self.io_base:
+            self.write_byte_physical(address + self.io_offset, data)
+            return
+        self.memory[address] = data & MASK_LOW_BYTE
+        if (address & ~1) in self.code_watchers:
+            self.invalidate_code(address)
+
+    def write_byte_physical(self, address, data):
+        """write a byte to a physical address"""
         data = data & MASK_LOW_BYTE
-        if address in self.iomap_writers:
-            if data != 0:
-                logging.debug(f'write_byte io self_lock:{self.lock.locked()} @{oct(address)}, {oct(data)} {self.safe_character(data)}')
-            self.get_lock()
-            self.iomap_writers[address](data)
-            self.release_lock()
-        else:
-            #logging.debug(f'; write_byte({u.oct6(address)}, {u.oct3(data)} {self.safe_character(data)})')
-            self.memory[address] = data
+        if address >= self.io_space:
+            writer = self.io_writers[address - self.io_space]
+            if writer is not None:
+                writer(data)
+                return
+        #logging.debug(f'; write_byte({u.oct6(address)}, {u.oct3(data)} {self.safe_character(data)})')
+        self.memory[address] = data
+        if (address & ~1) in self.code_watchers:
+            self.invalidate_code(address)
 
     def read_byte(self, address):
         """Read one byte of memory.
         Address can be even or odd."""
-        assert address <= self.top_of_memory
-        if address in self.iomap_readers:
-            #logging.debug(f'read_byte IO(@{oct(address)})')
-            self.get_lock()
-            result = self.iomap_readers[address]()
-            self.release_lock()
-            if result != 0:
-                logging.debug(f'read_byte io self_lock:{self.lock.locked()} @{oct(address)} returns {oct(result)} {self.safe_character(result)}')
-        else:
-            result = self.memory[address]
-            #logging.debug(f'; read byte {u.oct6(address)}) = {u.oct3(result)}')
-        return result
+        assert address <= MASK_WORD, f'read_byte: {oct(address)} is not a CPU address; use read_byte_physical'
+        if address >= self.io_base:
+            return self.read_byte_physical(address + self.io_offset)
+        return self.memory[address]
+
+    def read_byte_physical(self, address):
+        """read a byte from a physical address"""
+        if address >= self.io_space:
+            reader = self.io_readers[address - self.io_space]
+            if reader is not None:
+                #logging.debug(f'read_byte IO(@{oct(address)})')
+                return reader()
+        #logging.debug(f'; read byte {u.oct6(address)}) = {u.oct3(result)}')
+        return self.memory[address]
 
     def write_word(self, address, data):
         """write a two-word data chunk to memory.
@@ -269,18 +492,28 @@ class Ram:
         :param data:
         """
         #logging.debug(f'write_word(@{oct(address)}, {oct(data)})')
-        assert address < self.top_of_memory   # *** should be a trap
+        assert address < MASK_WORD, f'write_word: {oct(address)} is not a CPU address; use write_word_physical'
         assert address % 2 == 0                # *** should be a trap
         assert data <= MASK_WORD
-        if address in self.iomap_writers:
-            logging.debug(f'write_word io @{oct(address)}, {oct(data)}')
-            self.get_lock()
-            self.iomap_writers[address](data)
-            self.release_lock()
-        else:
-            self.memory[address + 1] = (data & MASK_HIGH_BYTE) >> 8
-            self.memory[address] = data & MASK_LOW_BYTE
-            #logging.debug(f'write_word RAM(@{oct(address)}, {oct(data)})')
+        if address >= self.io_base:
+            self.write_word_physical(address + self.io_offset, data)
+            return
+        self.words[address >> 1] = data & MASK_WORD
+        if address in self.code_watchers:
+            self.invalidate_code(address)
+        #logging.debug(f'write_word RAM(@{oct(address)}, {oct(data)})')
+
+    def write_word_physical(self, address, data):
+        """write a word to a physical address"""
+        assert address % 2 == 0                # *** should be a trap
+        if address >= self.io_space:
+            writer = self.io_writers[address - self.io_space]
+            if writer is not None:
+                writer(data)
+                return
+        self.words[address >> 1] = data & MASK_WORD
+        if address in self.code_watchers:
+            self.invalidate_code(address)
 
     def read_word(self, address):
         """Read a word of memory.
@@ -289,19 +522,31 @@ class Ram:
         Crashes simulator if we go out of bounds."""
         # Low bytes are stored at even-numbered memory locations.
         # High bytes at are stored at odd-numbered memory locations.
-        assert address < self.top_of_memory   # *** should be a trap
+        assert address < MASK_WORD, f'read_word: {oct(address)} is not a CPU address; use read_word_physical'
         assert address % 2 == 0                # *** should be a trap
-        result = ""
-        if address in self.iomap_readers:
-            #logging.debug(f'read word IO({u.oct6(address)})')
-            self.get_lock()
-            result =  self.iomap_readers[address]()
-            self.release_lock()
-            logging.debug(f'read word IO({u.oct6(address)}) returns {u.oct6(result)}')
-        else:
-            result = (self.memory[address + 1] << 8) + self.memory[address]
-            #logging.debug(f'read word RAM {u.oct6(address)} = {u.oct6(result)}')
-        return result
+        if address >= self.io_base:
+            return self.read_word_physical(address + self.io_offset)
+        #logging.debug(f'read word RAM {u.oct6(address)} = {u.oct6(result)}')
+        return self.words[address >> 1]
+
+    def read_word_physical(self, address):
+        """read a word from a physical address"""
+        assert address % 2 == 0                # *** should be a trap
+        if address >= self.io_space:
+            reader = self.io_readers[address - self.io_space]
+            if reader is not None:
+                #logging.debug(f'read word IO({u.oct6(address)})')
+                return reader()
+        return self.words[address >> 1]
+
+    def read_word_previous(self, address):
+        """Read a word from the previous mode's address space, for MFPI and MFPD.
+        Without memory management every mode sees the same memory."""
+        return self.read_word(address)
+
+    def write_word_previous(self, address, data):
+        """Write a word to the previous mode's address space, for MTPI and MTPD."""
+        self.write_word(address, data)
 
     def read_word_from_pc(self):
         """Read word from PC and increment PC"""
@@ -382,7 +627,14 @@ class PSW:
 
         # This class keeps the deinitive version of the PSW.
         # When it changes, this class sets it into RAM.
-        self.psw = 0o0
+        self._psw = 0o0
+
+        # Condition codes are worked out lazily.
+        # Instructions that set N and Z from their result call set_result,
+        # which only records (result, byte or word, VC bits to clear, VC bits to set).
+        # Anything that reads the PSW resolves the pending result first.
+        # Most results are overwritten by the next instruction before anything looks at them.
+        self.pending = None
 
         self.c_mode_mask = 0o140000
         self.p_mode_mask = 0o030000
@@ -400,6 +652,51 @@ class PSW:
         self.ram.register_io_reader(self.psw_address, self.get_psw)
         logging.info(f'psw initilialized @{oct(self.psw_address)}')
 
+    @property
+    def psw(self):
+        """the processor status word with any pending condition codes worked out"""
+        if self.pending is not None:
+            self.resolve()
+        return self._psw
+
+    @psw.setter
+    def psw(self, value):
+        self.pending = None
+        self._psw = value
+
+    def set_result(self, b, result, clear=0o000002, set_bits=0):
+        """Record the result of an instruction that sets N and Z from it.
+        The condition codes are not worked out until something reads the PSW.
+
+        :param b: "B" for Byte; anything else is Word
+        :param result: value N and Z come from
+        :param clear: V and C bits the instruction clears; default clears V
+        :param set_bits: V and C bits the instruction sets
+        """
+        pending = self.pending
+        if pending is not None:
+            # The earlier result's N and Z are overwritten by this one.
+            # Only its V and C bits still have to be applied.
+            self._psw = (self._psw & ~pending[2]) | pending[3]
+        self.pending = (result, b, clear, set_bits)
+
+    def resolve(self):
+        """work out the condition codes for the pending result"""
+        result, b, clear, set_bits = self.pending
+        self.pending = None
+        if b == 'B':
+            n_mask = MASK_BYTE_MSB
+            z_mask = MASK_LOW_BYTE
+        else:
+            n_mask = MASK_WORD_MSB
+            z_mask = MASK_WORD
+        nz = 0
+        if result & n_mask:
+            nz = self.n_mask
+        if result & z_mask == 0:
+            nz = nz | self.z_mask
+        self._psw = (self._psw & ~(self.n_mask | self.z_mask | clear)) | nz | set_bits
+
     def get_psw(self):
         return self.psw
 
@@ -550,8 +847,8 @@ class Stack:
 
 class AddressModes:
     '''Implements the 8 standrad address modes of the PDP11 instruction set.
-    Every instruction that needs to set these up calls addressing_mode_get to get the praneter,
-    addressing_mode_R7 to implement program counter jumps, and
+    Every instruction that needs to set these up calls operand_get to get the praneter,
+    jump_get to implement program counter jumps, and
     addressing_mode_set to handle address modes for destination register.
     Autoincrement and autodecrement operations on a register are
     by 1 in byte instructions, by 2 in word instructions,
@@ -565,109 +862,128 @@ class AddressModes:
 
         self.address_modes_used = {0:0, 1:0, 2:0, 3:0, 4:0, 5:0, 6:0, 7:0}
 
-    def addressing_mode_get(self, b, mode_register):
-        """copy the value from the location indicated by byte_register
+        # Index and immediate words the instruction cache already read for this instruction.
+        self.prefetched = ()
 
-        :param b: "W" for word, "B" for byte
-        :param mode_register: bits of opcode that contain address mode and register number
-        :return: the parameter
-        """
-        # B sets the byte/word mode. It is empty for word and 'B' for byte mode.
-        # Thus it is useful as the mode indicator and to label instructions in log correctly.
-        # mode_register contains the six bits that specify the mode and the register.
-        # This could be for either of the two parameters of an SSDD instruction.
-        # PC points to the instruction.
-        addressmode = (mode_register & 0o70) >> 3
+    def read_extension_word(self):
+        """Read the word following the instruction and step the PC past it.
+        If the instruction cache already has the word, memory isn't read again."""
+        if self.prefetched:
+            word = self.prefetched[0]
+            self.prefetched = self.prefetched[1:]
+            self.reg.inc_pc('read_extension_word')
+            return word
+        return self.ram.read_word_from_pc()
 
-        self.address_modes_used[addressmode] = self.address_modes_used[addressmode] + 1
+    def addressing_mode_set(self, b, addressmode, result, register, address):
+        """copy the result into the register or address specified
 
-        register = mode_register & 0o07
-        address = 0
-        operand_word = ''
-        if addressmode != 0 and register==7:
-            operand_word = u.oct6(self.ram.read_word(self.reg.get(7)))
-        assembly = ''
+        Parameters:
+            b: 'B' or ''
+            addressmode: address mode of destination
+            result: word or byte
+            register: if address is zero, put it in this register
+            address: otherwise put it here
+        """
+        #logging.debug(f'addressing_mode_set "{b}" result:{oct(result)} register:{register} address:{address}')
+        if addressmode == 0:
+            self.reg.set(register, result)
+        else:
+            if b == 'B':
+                self.ram.write_byte(address, result)
+            else:
+                self.ram.write_word(address, result)
 
-        #logging.debug(f'addressing_mode_get("{b}", {oct(mode_register)}) address mode:{oct(addressmode)} register:{oct(register)}')
+    def operand_get(self, b, addressmode, register):
+        """get the operand from the location indicated by the address mode and register
 
+        :param b: "B" for byte, anything else for word
+        :param addressmode: address mode 0-7
+        :param register: register number 0-7
+        :return: operand, address
+        """
+        self.address_modes_used[addressmode] = self.address_modes_used[addressmode] + 1
         if b == 'B':
             ram_read = self.ram.read_byte
-            increment = 1
-            b = 'B'
+            if register in (6, 7):
+                increment = 2
+            else:
+                increment = 1
         else:
             ram_read = self.ram.read_word
             increment = 2
-            b = ''
-        if register in (6, 7):
-            increment = 2
 
         if addressmode == 0:
-            #logging.debug(f'mode 0 Register: R{register}: register contains operand')
-            operand = self.reg.get(register)
-            assembly = f'R{register}'
-            #logging.debug(f'; addressing_mode_get mode 0 R{register} = operand:{oct(operand)}')
-        elif addressmode == 1:
-            #logging.debug(f'mode 1 Register Deferred: (R{register}): register contains address of operand')
+            return self.reg.get(register), 0
+        if addressmode == 1:
             address = self.reg.get(register)
-            operand = ram_read(address)
-            assembly = f'@R{register}'
-            #logging.debug(f'mode 1 @@{oct(address)} = operand:{oct(operand)}')
-        elif addressmode == 2:
-            #logging.debug(f'mode 2 Autoincrement: (R{register})+: register contains address of operand then incremented')
+            return ram_read(address), address
+        if addressmode == 2:
             address = self.reg.get(register)
-            operand = ram_read(address)
-            self.reg.set(register, self.reg.get(register) + increment)
-            assembly = f'(R{register})+'
-            #logging.debug(f'mode 2 R{register}=@{oct(address)} = operand:{oct(operand)}')
-        elif addressmode == 3:  # autoincrement deferred
-            #logging.debug(f'mode 3 Autoincrement Deferred: @(R{register})+: register contains pointer to address of operand, then incremented')
-            pointer = self.reg.get(register)
-            address = self.ram.read_word(pointer)
+            if register == 7 and self.prefetched:
+                operand = self.read_extension_word()
+                if b == 'B':
+                    operand = operand & MASK_LOW_BYTE
+            else:
+                operand = ram_read(address)
+                self.reg.set(register, address + increment)
+            return operand, address
+        if addressmode == 3:
+            if register == 7 and self.prefetched:
+                address = self.read_extension_word()
+                return ram_read(address), address
+            address = self.ram.read_word(self.reg.get(register))
             operand = ram_read(address)
             self.reg.set(register, self.reg.get(register) + 2)
-            assembly = f'@(R{register})+'
-            #logging.debug(f'mode 3 R{register} pointer:{oct(pointer)} @@{oct(address)} = operand:{oct(operand)}')
-        elif addressmode == 4:  # autodecrement direct
-            #logging.debug(f'mode 4 Autodecrement: -(R{register}): register is decremented, then contains address of operand')
-            self.reg.set(register, self.reg.get(register) - increment)
-            address = self.reg.get(register)
-            operand = ram_read(address)
-            assembly = f'-(R{register})'
-            #logging.debug(f'mode 4 R{register}=@@{oct(address)} = operand:{oct(operand)}')
-        elif addressmode == 5:  # autodecrement deferred
-            #logging.debug(f'mode 5 Autodecrement Deferred: @-(R{register}): register is decremented, then contains address of address of operand')
-            self.reg.set(register, self.reg.get(register) - 2)
-            pointer = self.reg.get(register)
+            return operand, address
+        if addressmode == 4:
+            address = self.reg.get(register) - increment
+            self.reg.set(register, address)
+            return ram_read(address), address
+        if addressmode == 5:
+            pointer = self.reg.get(register) - 2
+            self.reg.set(register, pointer)
             address = self.ram.read_word(pointer)
-            operand = ram_read(address)
-            assembly = f'@-(R{register})'
-            #logging.debug(f'mode 5 R{register}=@@{oct(address)} = operand:{oct(operand)}')
-        elif addressmode == 6:  # index
-            # Value X, stored in a word following the instruction,
-            # is added to the resgiter.
-            # The sum contains the address of the operand.
-            # Neither X nor the register are modified.
-            x = self.ram.read_word_from_pc()
-            #logging.debug(f'mode 6 Index: X(R{register}): immediate value {oct(x)} is added to R{register} to produce address of operand')
-            address = address_offset(self.reg.get(register), x)
-            #logging.debug(f'mode 6 X:{oct(x)} address:@{oct(address)}')
-            operand = ram_read(address)
-            operand_word = u.oct6(x)
-            assembly = f'{formatted_offset(x)}(R{register})'
-            #logging.debug(f'mode 6 R{register}=@@{oct(address)} = operand:{oct(operand)}')
-        elif addressmode == 7:  # index deferred
-            x = self.ram.read_word_from_pc()
-            #logging.debug(f'mode 7 Index Deferred: @X(R{register}): immediate value {oct(x)} is added to R{register} then used as address of address of operand')
-            pointer = address_offset(self.reg.get(register), x)
-            address = self.ram.read_word(pointer)
-            #logging.debug(f'mode 7 X:{oct(x)} pointer:{oct(pointer)} address:@{oct(address)}')
-            operand = ram_read(address)
-            operand_word = u.oct6(x)
-            assembly = f'@{formatted_offset(x)}(R{register})'
-            #logging.debug(f'mode 7 R{register}=@@{oct(address)} = operand:{oct(operand)}')
-
-        #logging.debug(f'; addressing_mode_get returns operand:{bin(operand)}')
-        return operand, register, address, operand_word, assembly, addressmode
+            return ram_read(address), address
+        x = self.read_extension_word()
+        address = address_offset(self.reg.get(register), x)
+        if addressmode == 7:
+            address = self.ram.read_word(address)
+        return ram_read(address), address
+
+    def operand_address(self, addressmode, register):
+        """The address of a word operand in address mode 1-7, without reading the operand.
+        Registers are stepped the way operand_get steps them.
+        MFPI and MTPI use this to read or write the operand in another address space."""
+        self.address_modes_used[addressmode] = self.address_modes_used[addressmode] + 1
+        if addressmode == 1:
+            return self.reg.get(register)
+        if addressmode == 2:
+            address = self.reg.get(register)
+            if register == 7 and self.prefetched:
+                self.read_extension_word()
+            else:
+                self.reg.set(register, address + 2)
+            return address
+        if addressmode == 3:
+            if register == 7 and self.prefetched:
+                return self.read_extension_word()
+            address = self.ram.read_word(self.reg.get(register))
+            self.reg.set(register, self.reg.get(register) + 2)
+            return address
+        if addressmode == 4:
+            address = self.reg.get(register) - 2
+            self.reg.set(register, address)
+            return address
+        if addressmode == 5:
+            pointer = self.reg.get(register) - 2
+            self.reg.set(register, pointer)
+            return self.ram.read_word(pointer)
+        x = self.read_extension_word()
+        address = address_offset(self.reg.get(register), x)
+        if addressmode == 7:
+            address = self.ram.read_word(address)
+        return address
 
     # https://retrocomputing.stackexchange.com/questions/9248/pdp-11-jmp-and-jsr-how-was-the-target-specified
     # Mode 0 - illegal
@@ -704,103 +1020,43 @@ class AddressModes:
 
     # Branch instructions
 
-    def addressing_mode_jmp(self, mode_register):
-        """copy the value from the location indicated by byte_register"""
-        # See page A-11 pf pdp11/40.pdf
-
-        addressmode = (mode_register & 0o70) >> 3
-        register = mode_register & 0o07
-        address = 0
-
-        #logging.debug(f'addressing_mode_jmp mode:{oct(addressmode)} reg:{oct(register)}')
-        operand_word = '' #u.oct6(self.ram.read_word(self.reg.get(7)))
-        assembly = ''
-
-        run = True
-        if addressmode == 0:
-            #logging.debug(f'mode j0: JMP direct illegal register address; halt')
-            jump_address = 0o0
-            run = False
-            # *** this should call a trap
-            assembly = f'R{register}'
-        elif addressmode == 1:
-            jump_address = self.reg.get(register)
-            assembly = f'@R{register}'
-            #logging.debug(f'mode j1: JMP register deferred. R{register} contains jump_address {oct(jump_address)}.')
-        elif addressmode == 2:
-            jump_address = self.reg.get(register)
-            #logging.debug(f'mode j2: JMP immediate: R{register} contains jump_address {oct(jump_address)}, then incremented.')
-            self.reg.set(register, self.reg.get(register) + 2)
-            assembly = f'(R{register})+'
-        elif addressmode == 3:
-            # jumps to address contained in a word addressed by the register
-            # and increments the register by two - JMP @(R1)+
-            address = self.reg.get(register)  # self.ram.read_word(self.reg.get(register))
-            jump_address = self.ram.read_word(address)
-            self.reg.set(register, self.reg.get(register) + 2)
-            assembly = f'@(R{register})+'
-            #logging.debug(f'mode j3: JMP absolute: R{register} contains jump_address {oct(jump_address)}, then incremented.')
-        elif addressmode == 4:
-            # The contents of the register specified as (ER) are decremented
-            # before being used as the address of the operand.
-            self.reg.set(register, self.reg.get(register)-2)
-            address = self.reg.get(register)
-            jump_address = self.ram.read_word(address)
-            assembly = f'-(R{register})'
-            #logging.debug(f'mode j4: JMP Autodecrement: R{register} is decremented, then contains the address @{oct(address)} of the jump_address {oct(jump_address)}.')
-        elif addressmode == 5:
-            # The contents of the register specified a s (ER) are decremented
-            # before being used as the pointer to the address of the operand.
-            self.reg.set(register, self.reg.get(register)-2)
-            pointer = self.reg.get(register)
-            address = self.ram.read_word(pointer)
-            jump_address = self.ram.read_word(address)
-            assembly = f'@-(R{register})'
-            #logging.debug(f'mode j5: JMP Autodecrement: R{register} is decremented, then contains a pointer {oct(pointer)} to the address @{oct(address)}of the jump_address {oct(jump_address)}.')
-        elif addressmode == 6:
-            # The expression E, plus the contents of the PC,
-            # yield the effective jump address.
-            x = self.ram.read_word_from_pc()
-            address = self.reg.get(register)
-            jump_address = address_offset(address, x)
-            operand_word = u.oct6(x)
-            assembly = f'{formatted_offset(x)}(R{register})'
-            #logging.debug(f'mode j6: JMP relative. Immediate value {oct(x)} plus value in register @{oct(address)} gets jump_address {oct(jump_address)}.')
-        elif addressmode == 7:
-            # The expression E, plus the contents of the PC
-            # yield a pointer to the effective address of the operand.
-            x = self.ram.read_word_from_pc()
-            #logging.debug(f'mode j7: JMP relative deferred. immediate value {oct(x)} plus PC={oct(self.reg.get_pc())} gets pointer to address.')
-            pointer = address_offset(self.reg.get(register), x)
-            address = self.ram.read_word(pointer)
-            word = self.ram.read_word(address)
-            jump_address = self.reg.get_pc() + word
-            operand_word = u.oct6(x)
-            assembly = f'@{formatted_offset(x)}(R{register})'
-            #logging.debug(f'pointer:{oct(pointer)} address:@{oct(address)} word:{oct(word)} jump_address:{oct(jump_address)}')
-
-        #logging.debug(f'addressmode:{addressmode}  register:{register}')
-        #logging.debug(f'addressing_mode_jmp returns run:{run} jump_address:{oct(jump_address)} ')
-        return run, jump_address, operand_word, assembly
-
-    def addressing_mode_set(self, b, addressmode, result, register, address):
-        """copy the result into the register or address specified
+    def jump_get(self, addressmode, register):
+        """get the address a JMP or JSR goes to
 
-        Parameters:
-            b: 'B' or ''
-            addressmode: address mode of destination
-            result: word or byte
-            register: if address is zero, put it in this register
-            address: otherwise put it here
+        :param addressmode: address mode 0-7
+        :param register: register number 0-7
+        :return: run, jump_address
         """
-        #logging.debug(f'addressing_mode_set "{b}" result:{oct(result)} register:{register} address:{address}')
         if addressmode == 0:
-            self.reg.set(register, result)
-        else:
-            if b == 'B':
-                self.ram.write_byte(address, result)
+            return False, 0o0
+        if addressmode == 1:
+            return True, self.reg.get(register)
+        if addressmode == 2:
+            jump_address = self.reg.get(register)
+            if register == 7 and self.prefetched:
+                self.read_extension_word()
             else:
-                self.ram.write_word(address, result)
+                self.reg.set(register, jump_address + 2)
+            return True, jump_address
+        if addressmode == 3:
+            if register == 7 and self.prefetched:
+                return True, self.read_extension_word()
+            jump_address = self.ram.read_word(self.reg.get(register))
+            self.reg.set(register, self.reg.get(register) + 2)
+            return True, jump_address
+        if addressmode == 4:
+            self.reg.set(register, self.reg.get(register) - 2)
+            return True, self.ram.read_word(self.reg.get(register))
+        if addressmode == 5:
+            self.reg.set(register, self.reg.get(register) - 2)
+            address = self.ram.read_word(self.reg.get(register))
+            return True, self.ram.read_word(address)
+        x = self.read_extension_word()
+        if addressmode == 6:
+            return True, address_offset(self.reg.get(register), x)
+        pointer = address_offset(self.reg.get(register), x)
+        address = self.ram.read_word(pointer)
+        return True, self.reg.get_pc() + self.ram.read_word(address)
 
     def address_mode_report(self):
         """
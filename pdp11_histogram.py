@@ -0,0 +1,95 @@
+"""pdp11_histogram.py - count executed instructions by word, opcode and addressing mode"""
+import csv
+import json
+import logging
+from array import array
+
+import pdp11_util as u
+from pdp11_disassembler import Disassembler
+
+class InstructionHistogram:
+    """Counts executed instructions in an array with a slot for each of the 65536 instruction words.
+    Counting one instruction is a single index operation; nothing is formatted until a report.
+    The operation × source mode × destination mode matrix follows from the counts,
+    because the addressing modes are fields of the instruction word,
+    so it is worked out when it's asked for instead of being counted as well."""
+    def __init__(self, decode):
+        logging.info('initializing InstructionHistogram')
+        self.decode = decode
+        self.counts = array('Q', bytes(8 * 0o200000))
+
+    def clear(self):
+        """set every count to zero"""
+        self.counts = array('Q', bytes(8 * 0o200000))
+
+    def total(self):
+        """number of instructions counted"""
+        return sum(self.counts)
+
+    def instructions(self):
+        """returns [(instruction, count)] for every word that ran, most frequent first"""
+        counted = [(instruction, count) for instruction, count in enumerate(self.counts) if count]
+        return sorted(counted, key=lambda item: item[1], reverse=True)
+
+    def modes(self):
+        """Returns {(opcode, source mode, destination mode): count}.
+        opcode is the instruction word with its operand fields masked off, as in the decode table.
+        Instructions without a source operand have source mode 0."""
+        matrix = {}
+        for instruction, count in enumerate(self.counts):
+            if count:
+                handler, decoded = self.decode.table[instruction]
+                key = (decoded.opcode, decoded.src_mode, decoded.dst_mode)
+                matrix[key] = matrix.get(key, 0) + count
+        return matrix
+
+    def name(self, instruction):
+        """the mnemonic of an instruction word"""
+        image = bytearray(6)
+        image[0] = instruction & 0o377
+        image[1] = instruction >> 8
+        words, text = Disassembler(image).decode(0)
+        return text.split(' ')[0]
+
+    def to_csv(self, file):
+        """write instruction counts and then the mode matrix to a csv file"""
+        with open(file, 'w', newline='') as csvfile:
+            writer = csv.writer(csvfile)
+            writer.writerow(['instruction', 'name', 'kind', 'src_mode', 'dst_mode', 'count'])
+            for instruction, count in self.instructions():
+                handler, decoded = self.decode.table[instruction]
+                writer.writerow([u.oct6(instruction), self.name(instruction), decoded.kind,
+                                 decoded.src_mode, decoded.dst_mode, count])
+            writer.writerow([])
+            writer.writerow(['opcode', 'name', 'src_mode', 'dst_mode', 'count'])
+            for (opcode, src_mode, dst_mode), count in sorted(self.modes().items()):
+                writer.writerow([u.oct6(opcode), self.name(opcode), src_mode, dst_mode, count])
+
+    def to_json(self, file):
+        """write instruction counts and the mode matrix to a json file"""
+        report = {'total': self.total(),
+                  'instructions': [{'instruction': u.oct6(instruction),
+                                    'name': self.name(instruction),
+                                    'count': count}
+                                   for instruction, count in self.instructions()],
+                  'modes': [{'opcode': u.oct6(opcode),
+                             'name': self.name(opcode),
+                             'src_mode': src_mode,
+                             'dst_mode': dst_mode,
+                             'count': count}
+                            for (opcode, src_mode, dst_mode), count in sorted(self.modes().items())]}
+        with open(file, 'w') as jsonfile:
+            json.dump(report, jsonfile, indent=2)
+
+    def report(self, n=20):
+        """log the n most frequent instruction words and operation-mode combinations"""
+        total = max(self.total(), 1)
+        logging.info(f'Instruction Histogram Report: {self.total()} instructions')
+        logging.info('instruction name       count  percent')
+        for instruction, count in self.instructions()[:n]:
+            logging.info(f'{u.oct6(instruction)}      {u.pad(self.name(instruction), 6)} {count:10d} {100 * count / total:7.2f}')
+        logging.info('opcode      name   src dst       count  percent')
+        modes = sorted(self.modes().items(), key=lambda item: item[1], reverse=True)
+        for (opcode, src_mode, dst_mode), count in modes[:n]:
+            logging.info(f'{u.oct6(opcode)}      {u.pad(self.name(opcode), 6)} {src_mode:3d} {dst_mode:3d}  {count:10d} {100 * count / total:7.2f}')
+        logging.info('Instruction Histogram Report end')
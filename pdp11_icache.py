@@ -0,0 +1,87 @@
+"""pdp11_icache.py - predecoded instruction cache"""
+import logging
+from pdp11_hardware import MASK_WORD
+
+class InstructionCache:
+    """Remembers decoded instructions by address.
+    An entry holds the handler, the decoded fields, and the index and immediate words
+    that follow the instruction, so a loop body that runs again doesn't fetch or decode anything.
+    Ram tells the cache when any word of a cached instruction is written."""
+    def __init__(self, ram, decode, max_entries=0o200000):
+        logging.info('initializing InstructionCache')
+        self.ram = ram
+        self.decode = decode
+        self.max_entries = max_entries
+
+        # pc: (handler, decoded, words) or None if the instruction can't be cached
+        self.entries = {}
+        # word address: [pc of every entry that includes that word]
+        self.covering = {}
+
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, pc):
+        """return (handler, decoded, words) for the instruction at pc,
+        or None if it must be fetched the ordinary way"""
+        try:
+            entry = self.entries[pc]
+            self.hits = self.hits + 1
+        except KeyError:
+            entry = self.fill(pc)
+        return entry
+
+    def set_enabled(self, enabled=True):
+        """When the cache is disabled, lookup always says to fetch the ordinary way.
+        lookup is swapped for another method on this instance, so instruction_cycle doesn't check."""
+        if enabled:
+            self.__dict__.pop('lookup', None)
+        else:
+            self.lookup = self.bypass
+
+    def bypass(self, pc):
+        """lookup while the cache is disabled"""
+        return None
+
+    def fill(self, pc):
+        """decode the instruction at pc and remember it"""
+        self.misses = self.misses + 1
+        if len(self.entries) >= self.max_entries:
+            self.clear()
+
+        # Instructions are only cached if all their words are ordinary memory.
+        # Reading an i/o device register can have side effects.
+        if pc + 1 >= MASK_WORD or pc in self.ram.iomap_readers:
+            self.entries[pc] = None
+            return None
+        instruction = self.ram.read_word(pc)
+        handler, decoded = self.decode.table[instruction]
+        addresses = [pc + 2 * i for i in range(decoded.words + 1)]
+        for address in addresses:
+            if address + 1 >= MASK_WORD or address in self.ram.iomap_readers:
+                self.entries[pc] = None
+                return None
+        words = tuple(self.ram.read_word(address) for address in addresses[1:])
+
+        entry = (handler, decoded, words)
+        self.entries[pc] = entry
+        for address in addresses:
+            try:
+                self.covering[address].append(pc)
+            except KeyError:
+                self.covering[address] = [pc]
+                self.ram.watch_code(address, self.invalidate)
+        return entry
+
+    def invalidate(self, address):
+        """Ram calls this when a word this cache has decoded is written"""
+        for pc in self.covering.pop(address, []):
+            self.entries.pop(pc, None)
+
+    def clear(self):
+        """forget every cached instruction"""
+        logging.info(f'InstructionCache clear: {len(self.entries)} entries hits:{self.hits} misses:{self.misses}')
+        for address in self.covering:
+            self.ram.unwatch_code(address, self.invalidate)
+        self.entries = {}
+        self.covering = {}
@@ -0,0 +1,149 @@
+"""pdp11_idle.py - recognize polling loops that only wait for a device"""
+import logging
+from pdp11_hardware import MASK_WORD
+
+# instructions that read their operands and set condition codes but write nothing:
+# TST, TSTB, CMP, CMPB, BIT, BITB
+PROBE_SS = [0o005700, 0o105700]
+PROBE_SSDD = [0o020000, 0o120000, 0o030000, 0o130000]
+
+# longest polling loop recognized, not counting the branch
+MAX_PROBES = 4
+
+class IdleLoops:
+    """Recognizes guest loops like
+        wait:   TSTB (R2)
+                BPL wait
+    where a short backward branch goes round instructions that write nothing
+    and whose only memory reads are i/o device registers.
+    Going round such a loop again can't change anything until a device changes state,
+    so the CPU can stop interpreting it and wait for a device instead.
+    The shape of the loop at each address is remembered;
+    Ram tells this class when a word of a remembered loop is written."""
+    def __init__(self, reg, ram, decode):
+        logging.info('initializing IdleLoops')
+        self.reg = reg
+        self.ram = ram
+        self.decode = decode
+
+        # pc: list of memory operands of the loop starting at pc, or None if it isn't a polling loop
+        # An operand is (register, offset) for an address in a register plus offset,
+        # or (None, address) for an absolute address.
+        self.loops = {}
+        # word address: [pc of every loop that includes that word]
+        self.covering = {}
+
+        self.detected = 0
+
+    def is_idle(self, pc):
+        """True if the code at pc is a polling loop that only reads i/o device registers,
+        given the values in the registers now"""
+        try:
+            operands = self.loops[pc]
+        except KeyError:
+            operands = self.analyze(pc)
+        if not operands:
+            return False
+        registers = self.reg.get_register_file()
+        for register, offset in operands:
+            if register is None:
+                address = offset
+            else:
+                address = (registers[register] + offset) & 0o177777
+            if (address & ~1) not in self.ram.iomap_readers:
+                return False
+        self.detected = self.detected + 1
+        return True
+
+    def analyze(self, pc):
+        """work out whether the code at pc is a polling loop and remember the answer"""
+        operands = []
+        address = pc
+        addresses = []
+        result = None
+        for probe in range(MAX_PROBES + 1):
+            instruction = self.peek(address)
+            if instruction is None:
+                break
+            handler, decoded = self.decode.table[instruction]
+            addresses.append(address)
+            words = []
+            for i in range(decoded.words):
+                word = self.peek(address + 2 + 2 * i)
+                if word is None:
+                    break
+                addresses.append(address + 2 + 2 * i)
+                words.append(word)
+            if len(words) < decoded.words:
+                break
+            first_word = address + 2
+            address = address + 2 + 2 * decoded.words
+
+            if decoded.kind == 'br':
+                offset = decoded.offset
+                if offset & 0o200:
+                    offset = offset - 0o400
+                if (address + 2 * offset) & 0o177777 == pc and operands:
+                    result = operands
+                break
+            if decoded.kind == 'ss' and decoded.opcode in PROBE_SS:
+                modes = [(decoded.dst_mode, decoded.dst_reg)]
+            elif decoded.kind == 'ssdd' and decoded.opcode in PROBE_SSDD:
+                modes = [(decoded.src_mode, decoded.src_reg), (decoded.dst_mode, decoded.dst_reg)]
+            else:
+                break
+            if not self.add_operands(modes, words, first_word, operands):
+                break
+
+        self.loops[pc] = result
+        for word_address in addresses:
+            try:
+                self.covering[word_address].append(pc)
+            except KeyError:
+                self.covering[word_address] = [pc]
+                self.ram.watch_code(word_address, self.invalidate)
+        return result
+
+    def add_operands(self, modes, words, word_address, operands):
+        """Add the memory operands of one probe instruction to operands.
+        words are the index and immediate words, the first of them at word_address.
+        Returns False if an operand could change something or read ordinary memory through a pointer."""
+        words = list(words)
+        for mode, register in modes:
+            if mode == 0 and register != 7:
+                # register
+                continue
+            if mode == 1 and register != 7:
+                # (Rn)
+                operands.append((register, 0))
+                continue
+            if mode not in (2, 3, 6) or (mode != 6 and register != 7):
+                # autoincrement and autodecrement change registers,
+                # and the deferred modes read a pointer from memory
+                return False
+            word = words.pop(0)
+            word_address = word_address + 2
+            if mode == 2:
+                # immediate #n
+                continue
+            if mode == 3:
+                # absolute @#n
+                operands.append((None, word))
+            elif register == 7:
+                # relative: PC has just stepped past the index word
+                operands.append((None, (word_address + word) & 0o177777))
+            else:
+                # X(Rn)
+                operands.append((register, word))
+        return True
+
+    def peek(self, address):
+        """read a word of code, or None if it's not ordinary memory"""
+        if address + 1 >= MASK_WORD or address in self.ram.iomap_readers:
+            return None
+        return self.ram.peek_word(address)
+
+    def invalidate(self, address):
+        """Ram calls this when a word of a remembered loop is written"""
+        for pc in self.covering.pop(address, []):
+            self.loops.pop(pc, None)
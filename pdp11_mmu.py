@@ -0,0 +1,285 @@
+"""pdp11_mmu.py - KT11 memory management"""
+import logging
+
+import pdp11_util as u
+
+MASK_WORD = 0o177777
+
+# processor modes, from PSW bits 15-14 (current) and 13-12 (previous)
+KERNEL = 0
+SUPERVISOR = 1
+USER = 3
+MODE_NAMES = {KERNEL: 'kernel', SUPERVISOR: 'supervisor', 2: 'illegal', USER: 'user'}
+
+# i/o page addresses of the eight page descriptor and page address registers of each mode.
+# Mode 2 has registers too, all zero, so every access in it aborts.
+PDR_ADDRESSES = {KERNEL: 0o172300, SUPERVISOR: 0o172200, USER: 0o177600}
+PAR_ADDRESSES = {KERNEL: 0o172340, SUPERVISOR: 0o172240, USER: 0o177640}
+SR0_ADDRESS = 0o177572
+SR1_ADDRESS = 0o177574
+SR2_ADDRESS = 0o177576
+SR3_ADDRESS = 0o172516
+
+# status register 0
+SR0_ENABLE = 0o000001
+SR0_NONRESIDENT = 0o100000
+SR0_PAGE_LENGTH = 0o040000
+SR0_READ_ONLY = 0o020000
+# status register 3
+SR3_22_BIT = 0o000020
+
+# page descriptor register fields
+PDR_MASK = 0o077417         # page length, expansion direction and access control
+PDR_DOWNWARD = 0o000010     # expansion direction: the page grows down from the top
+ACCESS_READ_ONLY = 2
+ACCESS_READ_WRITE = 6
+
+# Ram methods the MMU replaces while it's enabled
+MAPPED_METHODS = ['read_byte', 'read_word', 'write_byte', 'write_word', 'physical', 'peek_physical',
+                  'read_word_previous', 'write_word_previous']
+
+class MMUAbort(Exception):
+    """An access the page registers don't allow. SR0 says why.
+    The emulator has no traps, so this stops the run instead of trapping to 250."""
+
+class MMU:
+    """KT11 memory management for 18- and 22-bit memory.
+    A 16-bit virtual address is a page number in bits 15-13 and an offset in the page.
+    Each mode has eight page address registers, the physical address of each page in 64-byte blocks,
+    and eight page descriptor registers, the page's length and access.
+    Translation looks the page up in a small cache for the current mode
+    that holds the physical base, the lowest and highest offsets allowed, and whether it can be written.
+    Writing a page register drops that page's entry; nothing else has to be worked out per access.
+    While SR0 enables it, the MMU's read and write methods replace Ram's on the Ram instance,
+    so none of the rest of the emulator has to check whether memory is mapped."""
+    def __init__(self, ram, psw, reg, mapping_changed=None):
+        logging.info('initializing MMU')
+        self.ram = ram
+        self.psw = psw
+        self.reg = reg
+        # called with True or False when SR0 turns mapping on or off
+        self.mapping_changed = mapping_changed
+
+        self.pdr = [[0] * 8 for mode in range(4)]
+        self.par = [[0] * 8 for mode in range(4)]
+        self.sr0 = 0
+        self.sr2 = 0
+        self.sr3 = 0
+        self.enabled = False
+        # methods that were on the Ram instance when mapping turned on, to put back when it turns off
+        self.unmapped = {}
+
+        # mode: [(base, low offset, high offset, writable) or None for each page]
+        self.tlb = [[None] * 8 for mode in range(4)]
+        self.fills = 0
+        self.set_address_size()
+
+        for mode in PDR_ADDRESSES:
+            for page in range(8):
+                ram.register_io_reader(PDR_ADDRESSES[mode] + 2 * page, self.page_register_reader(self.pdr[mode], page))
+                ram.register_io_writer(PDR_ADDRESSES[mode] + 2 * page, self.pdr_writer(mode, page))
+                ram.register_io_reader(PAR_ADDRESSES[mode] + 2 * page, self.page_register_reader(self.par[mode], page))
+                ram.register_io_writer(PAR_ADDRESSES[mode] + 2 * page, self.par_writer(mode, page))
+        ram.register_io_reader(SR0_ADDRESS, self.read_sr0)
+        ram.register_io_writer(SR0_ADDRESS, self.write_sr0)
+        ram.register_io_reader(SR1_ADDRESS, self.read_sr1)
+        ram.register_io_reader(SR2_ADDRESS, self.read_sr2)
+        ram.register_io_reader(SR3_ADDRESS, self.read_sr3)
+        ram.register_io_writer(SR3_ADDRESS, self.write_sr3)
+
+    # ****************************************************
+    # registers
+    # ****************************************************
+
+    def page_register_reader(self, registers, page):
+        """an io reader for one page register"""
+        def read_page_register():
+            return registers[page]
+        return read_page_register
+
+    def pdr_writer(self, mode, page):
+        """an io writer for one page descriptor register"""
+        def write_pdr(data):
+            self.pdr[mode][page] = data & PDR_MASK
+            self.tlb[mode][page] = None
+        return write_pdr
+
+    def par_writer(self, mode, page):
+        """an io writer for one page address register"""
+        def write_par(data):
+            self.par[mode][page] = data & MASK_WORD
+            self.tlb[mode][page] = None
+        return write_par
+
+    def read_sr0(self):
+        return self.sr0
+
+    def write_sr0(self, data):
+        """SR0 holds the abort flags and turns memory management on and off"""
+        self.sr0 = data & MASK_WORD
+        enable = bool(self.sr0 & SR0_ENABLE)
+        if enable != self.enabled:
+            self.enable(enable)
+
+    def read_sr1(self):
+        # registers autoincremented by an aborted instruction aren't recorded
+        return 0
+
+    def read_sr2(self):
+        return self.sr2
+
+    def read_sr3(self):
+        return self.sr3
+
+    def write_sr3(self, data):
+        """SR3 bit 4 turns on 22-bit mapping"""
+        self.sr3 = data & SR3_22_BIT
+        self.set_address_size()
+
+    def set_address_size(self):
+        """work out how page addresses become physical ones, and forget every translation"""
+        if self.sr3 & SR3_22_BIT and self.ram.top_of_memory > 0o777777:
+            self.par_mask = 0o177777
+            self.address_mask = 0o17777777
+            self.io_start = 0o17760000
+        else:
+            # 18-bit addresses; the top 8kB of them are the io page
+            self.par_mask = 0o007777
+            self.address_mask = 0o777777
+            self.io_start = 0o760000
+        self.io_shift = self.ram.io_space - self.io_start
+        self.flush()
+
+    def flush(self):
+        """forget every cached translation"""
+        self.tlb = [[None] * 8 for mode in range(4)]
+
+    def enable(self, enable=True):
+        """Start or stop translating addresses by putting the MMU's methods on the Ram instance
+        or taking them off again.
+        Anything else on the instance, like a TraceChecker's hooks, is put back when mapping stops."""
+        logging.info(f'MMU enable({enable})')
+        self.enabled = enable
+        ram = self.ram
+        if enable:
+            self.unmapped = {name: ram.__dict__[name] for name in MAPPED_METHODS if name in ram.__dict__}
+            for name in MAPPED_METHODS:
+                setattr(ram, name, getattr(self, name))
+        else:
+            for name in MAPPED_METHODS:
+                ram.__dict__.pop(name, None)
+            for name, method in self.unmapped.items():
+                setattr(ram, name, method)
+            self.unmapped = {}
+        if self.mapping_changed is not None:
+            self.mapping_changed(enable)
+
+    # ****************************************************
+    # translation
+    # ****************************************************
+
+    def fill(self, mode, page):
+        """work out the cache entry for a page from its registers"""
+        self.fills = self.fills + 1
+        pdr = self.pdr[mode][page]
+        access = pdr & 0o7
+        length = (pdr >> 8) & 0o177
+        if access != ACCESS_READ_ONLY and access != ACCESS_READ_WRITE:
+            # nothing is allowed
+            low, high = 1, 0
+        elif pdr & PDR_DOWNWARD:
+            low, high = length << 6, 0o17777
+        else:
+            low, high = 0, (length << 6) | 0o77
+        entry = ((self.par[mode][page] & self.par_mask) << 6, low, high, access == ACCESS_READ_WRITE)
+        self.tlb[mode][page] = entry
+        return entry
+
+    def translate(self, address, write, mode):
+        """the physical address of a virtual address in mode, or MMUAbort"""
+        entry = self.tlb[mode][address >> 13]
+        if entry is None:
+            entry = self.fill(mode, address >> 13)
+        base, low, high, writable = entry
+        offset = address & 0o17777
+        if offset < low or offset > high or (write and not writable):
+            self.abort(address, write, mode)
+        physical = (base + offset) & self.address_mask
+        if physical >= self.io_start:
+            physical = physical + self.io_shift
+        return physical
+
+    def abort(self, address, write, mode):
+        """set SR0 to say why an access isn't allowed and raise MMUAbort"""
+        page = address >> 13
+        low, high = self.tlb[mode][page][1:3]
+        offset = address & 0o17777
+        access = self.pdr[mode][page] & 0o7
+        sr0 = (self.sr0 & SR0_ENABLE) | (mode << 5) | (page << 1)
+        if access != ACCESS_READ_ONLY and access != ACCESS_READ_WRITE:
+            sr0 = sr0 | SR0_NONRESIDENT
+        else:
+            if offset < low or offset > high:
+                sr0 = sr0 | SR0_PAGE_LENGTH
+            if write and access != ACCESS_READ_WRITE:
+                sr0 = sr0 | SR0_READ_ONLY
+        self.sr0 = sr0
+        self.sr2 = self.reg.get_pc()
+        action = 'write' if write else 'read'
+        raise MMUAbort(f'MMU abort: {MODE_NAMES[mode]} {action} {u.oct6(address)} SR0:{u.oct6(sr0)}')
+
+    # ****************************************************
+    # Ram methods while mapping is on.
+    # The mode bits of the PSW are never pending, so _psw can be read directly.
+    # ****************************************************
+
+    def physical(self, address):
+        """the physical address of a virtual address in the current mode"""
+        return self.translate(address, False, self.psw._psw >> 14)
+
+    def peek_physical(self, address):
+        """The physical address of a virtual address in the current mode, for disassembly and dumps.
+        An address the current mode can't read gives None instead of an abort, so SR0 and SR2 are left alone."""
+        mode = self.psw._psw >> 14
+        entry = self.tlb[mode][address >> 13]
+        if entry is None:
+            entry = self.fill(mode, address >> 13)
+        base, low, high, writable = entry
+        offset = address & 0o17777
+        if offset < low or offset > high:
+            return None
+        physical = (base + offset) & self.address_mask
+        if physical >= self.io_start:
+            physical = physical + self.io_shift
+        return physical
+
+    def read_byte(self, address):
+        """read a byte from the current mode's address space"""
+        return self.ram.read_byte_physical(self.translate(address, False, self.psw._psw >> 14))
+
+    def write_byte(self, address, data):
+        """write a byte to the current mode's address space"""
+        self.ram.write_byte_physical(self.translate(address, True, self.psw._psw >> 14), data)
+
+    def read_word(self, address):
+        """read a word from the current mode's address space"""
+        return self.ram.read_word_physical(self.translate(address, False, self.psw._psw >> 14))
+
+    def write_word(self, address, data):
+        """write a word to the current mode's address space"""
+        self.ram.write_word_physical(self.translate(address, True, self.psw._psw >> 14), data)
+
+    def read_word_previous(self, address):
+        """read a word from the previous mode's address space"""
+        return self.ram.read_word_physical(self.translate(address, False, (self.psw._psw >> 12) & 0o3))
+
+    def write_word_previous(self, address, data):
+        """write a word to the previous mode's address space"""
+        self.ram.write_word_physical(self.translate(address, True, (self.psw._psw >> 12) & 0o3), data)
+
+    def report(self):
+        """log the page registers of each mode"""
+        logging.info(f'MMU Report: enabled:{self.enabled} SR0:{u.oct6(self.sr0)} SR3:{u.oct6(self.sr3)} fills:{self.fills}')
+        for mode in PDR_ADDRESSES:
+            pages = ' '.join(f'{u.oct6(self.par[mode][page])}/{u.oct6(self.pdr[mode][page])}' for page in range(8))
+            logging.info(f'{u.pad(MODE_NAMES[mode], 10)} {pages}')
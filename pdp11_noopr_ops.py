@@ -1,15 +1,23 @@
 """pdp11_noopr_ops.py - no-operand instructions 00 00 00 through 00 00 06"""
 import logging
+from pdp11_decode import decode_word
+from pdp11_decode import is_noopr_op
+from pdp11_disassembler import NO_OPERAND_NAMES
 
 class noopr_ops:
     """Implements PDP11 no-operand instructions"""
-    def __init__(self, reg, ram, psw, stack, sw):
+    def __init__(self, reg, ram, psw, stack, sw, disassembler=None):
         logging.info('initializing NoOperandOps')
         self.reg = reg
         self.ram = ram
         self.psw = psw
         self.stack = stack
         self.sw = sw
+        # the PDP11's Disassembler, for do_noopr_op
+        self.disassembler = disassembler
+
+        # WAIT sets this; the CPU loop sleeps until a device signals, then clears it.
+        self.waiting = False
 
         self.no_operand_instructions = {}
         self.no_operand_instructions[0o000000] = self.HALT
@@ -20,24 +28,19 @@ class noopr_ops:
         self.no_operand_instructions[0o000005] = self.RESET
         self.no_operand_instructions[0o000006] = self.RTT
 
-        self.no_operand_instruction_names = {}
-        self.no_operand_instruction_names[0o000000]= "HALT"
-        self.no_operand_instruction_names[0o000001]= "WAIT"
-        self.no_operand_instruction_names[0o000002]= "RTI"
-        self.no_operand_instruction_names[0o000003]= "BPT"
-        self.no_operand_instruction_names[0o000004]= "IOT"
-        self.no_operand_instruction_names[0o000005]= "RESET"
-        self.no_operand_instruction_names[0o000006]= "RTT"
+        self.no_operand_instruction_names = NO_OPERAND_NAMES
 
     def HALT(self):
         """00 00 00 Halt"""
         return False, ''
 
     def WAIT(self):
-        """00 00 01 Wait 4-75"""
-        # *** unimplemented
-        self.reg.inc_pc('WAIT')
-        return False, 'WAIT unimplemented'
+        """00 00 01 Wait 4-75
+        Wait for an interrupt. PC already points at the next instruction."""
+        # only a device that signals from now on ends the wait
+        self.ram.io_event.clear()
+        self.waiting = True
+        return True, ''
 
     def RTI(self):
         """00 00 02 RTI return from interrupt 4-69
@@ -64,7 +67,7 @@ class noopr_ops:
         # Used to call the 1/0 Executive routine lOX in the paper tape software system,
         # and for error reporting in the Disk Oper- ating System.
 
-        self.stack.push(self.psw.PSW)
+        self.stack.push(self.psw.get_psw())
         self.stack.push(self.reg.get_pc())
         self.reg.set_pc(0o20, "IOT")
         self.reg.set_sp(0o22, "IOT")
@@ -83,18 +86,21 @@ class noopr_ops:
 
     def is_noopr_op(self, instruction):
         """Using instruction bit pattern, determine whether it's a no-operand instruction"""
-        return instruction in self.no_operand_instructions
+        return is_noopr_op(instruction)
 
     def do_noopr_op(self, instruction):
-        """dispatch a no-operand opcode"""
-        # parameter: opcode of form * 000 0** *** *** ***
+        """execute a no-operand instruction and disassemble it.
+        The CPU runs exec_noopr_op straight from the decode table; this is for tests.
+        returns: run, operand1, operand2, assembly, report"""
+        assembly = self.disassembler.decode_fetched(instruction, self.reg.get_pc())[1]
+        run = self.exec_noopr_op(decode_word(instruction))
+        return run, '', '', assembly, ''
+
+    def exec_noopr_op(self, decoded):
+        """execute a no-operand instruction without disassembling it.
+        parameter: Decoded fields from the decode table
+        returns: run"""
         self.sw.start("noopr")
-        try:
-            assembly = f'{self.no_operand_instruction_names[instruction]}'
-            result, report = self.no_operand_instructions[instruction]()
-        except KeyError:
-            assembly = ''
-            report = 'Error: no-operand opcode not found'
-            result = False
+        result, report = self.no_operand_instructions[decoded.instruction]()
         self.sw.stop("noopr")
-        return result, '', '', assembly, report
+        return result
@@ -1,5 +1,7 @@
 """pdp11other - other instructions"""
 import logging
+from pdp11_decode import decode_word
+from pdp11_decode import is_other_op
 from pdp11_hardware import Stack
 
 # masks for accessing words and bytes
@@ -10,7 +12,7 @@ MASK_BYTE_MSB = 0o000200
 
 class other_ops:
     """Implements the remainder of PDP11 instructions"""
-    def __init__(self, reg, ram, psw, am, sw):
+    def __init__(self, reg, ram, psw, am, sw, disassembler=None):
         logging.info('initializing OtherOps')
         self.reg = reg
         self.ram = ram
@@ -18,81 +20,66 @@ class other_ops:
         self.am = am
         self.stack = Stack(reg, ram, psw)
         self.sw = sw
+        # the PDP11's Disassembler, for do_other_op
+        self.disassembler = disassembler
 
         self.other_instructions = {}
         self.other_instructions[0o000200] = self.RTS
         self.other_instructions[0o004000] = self.JSR
         self.other_instructions[0o006400] = self.MARK
-        self.other_instructions[0o006500] = self.MFPI
-        self.other_instructions[0o006600] = self.MTPI
 
     # ****************************************************
     # Other instructions
     # ****************************************************
-    def RTS(self, instruction):
+    def RTS(self, decoded):
         """00 20 0R: RTS return from subroutine 4-60
 
         | PC <- reg
         | reg <- (SP)^
         """
-        R = instruction & 0o000007
+        R = decoded.src_reg
         self.reg.set_pc(self.reg.get(R), "RTS")
         self.reg.set(R, self.stack.pop())
-        return 'RTS', f'    {oct(self.reg.get_pc())} {oct(instruction)} RTS R{R}'
 
-    def JSR(self, instruction):
+    def JSR(self, decoded):
         """00 4R DD: JSR jump to subroutine 4-58
 
         |  pushstack(reg)
         |  reg <- PC+2
         |  PC <- (dst)
         """
-        R = (instruction & 0o000700) >> 6
-        DD = instruction & 0o000077
-        run, jump_address, operand_word, assembly = self.am.addressing_mode_jmp(DD)
+        R = decoded.src_reg
+        run, jump_address = self.am.jump_get(decoded.dst_mode, decoded.dst_reg)
         self.stack.push(self.reg.get(R))
         self.reg.set(R, self.reg.get_pc())
         self.reg.set_pc(jump_address, "JSR")
-        return 'JSR', f'    {oct(self.reg.get_pc())} {oct(instruction)} JSR R{R} DD:{oct(DD)} address:{oct(jump_address)}'
 
-    def MARK(self, instruction):
+    def MARK(self, decoded):
         """00 64 NN mark 46-1"""
         # *** unimplemented
-        return 'MARK', f'{oct(instruction)} unimplemented'
-
-    def MFPI(self, instruction):
-        """00 65 SS move from previous instruction space 4-77"""
-        # *** unimplemented
-        return 'MFPI', f'{oct(instruction)} unimplemented'
-
-    def MTPI(self, instruction):
-        """00 66 DD move to previous instruction space 4-78"""
-        # *** unimplemented
-        return 'MTPI', f'{oct(instruction)} unimplemented'
 
     def is_other_op(self, instruction):
-        """Using instruction bit pattern, determine whether it's a no-operand instruction"""
-        masked1 = instruction & 0o777700
-        masked2 = instruction & 0o777000
-        return masked1 in [0o000200, 0o002000, 0o004000, 0o006400, 0o006500, 0o006600] or masked2 in [0o004000]
+        """Using instruction bit pattern, determine whether it's one of the leftover instructions"""
+        return is_other_op(instruction)
 
     def do_other_op(self, instruction):
-        """dispatch a leftover opcode"""
-        # parameter: opcode of form that doesn't fit the rest
-        result = False
+        """execute a leftover instruction and disassemble it.
+        The CPU runs exec_other_op straight from the decode table; this is for tests.
+        returns: run, operand1, operand2, assembly, report"""
+        assembly = self.disassembler.decode_fetched(instruction, self.reg.get_pc())[1]
+        run = self.exec_other_op(decode_word(instruction))
+        return run, '', '', assembly, ''
+
+    def exec_other_op(self, decoded):
+        """execute a leftover instruction without disassembling it.
+        parameter: Decoded fields from the decode table
+        returns: run"""
         self.sw.start("other")
-        try:
-            masked1 = instruction & 0o777700
-            masked2 = instruction & 0o777000
-            if masked2 in [0o004000]:
-                opcode = masked2
-            else:
-                opcode = masked1
-            assembly, report = self.other_instructions[opcode](instruction)
-            result = True
-        except KeyError:
-            assembly = f'{oct(instruction)}'
-            report = 'Error: other opcode not found'
-            result =  False
+        result = True
+        opcode = decoded.opcode
+        if opcode in self.other_instructions:
+            self.other_instructions[opcode](decoded)
+        else:
+            result = False
         self.sw.stop("other")
-        return result, '', '', assembly, report
+        return result
@@ -0,0 +1,138 @@
+"""pdp11_profiler.py - sample the guest PC and report where guest programs spend their time"""
+import re
+import bisect
+import logging
+from array import array
+
+import pdp11_util as u
+
+# A label is the first thing on a line after the line number, address and code words.
+LABEL = re.compile(r"^([A-Za-z_.$][A-Za-z0-9_.$]*|[0-9]+\$?):")
+# line numbers, addresses and code words; relocatable words in listings end in '
+NUMBER = re.compile(r"^[0-9]+'?$")
+ADDRESS = re.compile(r"^[0-7]{6}$")
+
+class Symbols:
+    """Labels read from the assembler listings in source/:
+    the .lst files from MACRO-11 and the .txt dumps like helloworld.txt and M9301-YA.txt.
+    Local labels like 1$ are left out so their code counts toward the label before them."""
+    def __init__(self):
+        logging.info('initializing Symbols')
+        # address: label
+        self.labels = {}
+        self.addresses = []
+
+    def read_listing(self, file):
+        """add the labels in a listing file"""
+        pending = []
+        with open(file, 'r', encoding="utf-8") as text:
+            for line in text:
+                tokens = line.split(';')[0].split()
+                address = None
+                label = None
+                for token in tokens:
+                    if NUMBER.match(token):
+                        if address is None and ADDRESS.match(token):
+                            address = int(token, 8)
+                        continue
+                    match = LABEL.match(token)
+                    if match:
+                        label = match.group(1)
+                    break
+                if label is not None and not label.rstrip('$').isdigit():
+                    pending.append(label)
+                # A label on a line by itself belongs to the next address.
+                if address is not None and pending:
+                    for label in pending:
+                        self.add(address, label)
+                    pending = []
+        logging.info(f'read_listing {file}: {len(self.labels)} labels')
+
+    def add(self, address, label):
+        """add one label. If an address has several, the first one is kept."""
+        if address not in self.labels:
+            self.labels[address] = label
+            bisect.insort(self.addresses, address)
+
+    def lookup(self, address):
+        """name an address as label+offset, or in octal if there's no label before it"""
+        i = bisect.bisect_right(self.addresses, address)
+        if i == 0:
+            return u.oct6(address)
+        label_address = self.addresses[i - 1]
+        label = self.labels[label_address]
+        if label_address == address:
+            return label
+        return f'{label}+{address - label_address:o}'
+
+    def routine(self, address):
+        """the label at or before address, or None"""
+        i = bisect.bisect_right(self.addresses, address)
+        if i == 0:
+            return None
+        return self.labels[self.addresses[i - 1]]
+
+class Profiler:
+    """Records the guest PC every interval instructions in an array with a slot for each word address.
+    PDP11.instruction_cycle calls count with the PC of every instruction."""
+    def __init__(self, interval=100, symbols=None):
+        logging.info(f'initializing Profiler({interval})')
+        self.interval = interval
+        self.countdown = interval
+        if symbols is None:
+            symbols = Symbols()
+        self.symbols = symbols
+        self.samples = array('Q', bytes(8 * 0o100000))
+
+    def count(self, pc):
+        """count one instruction; take a sample every interval instructions"""
+        self.countdown = self.countdown - 1
+        if self.countdown == 0:
+            self.samples[pc >> 1] += 1
+            self.countdown = self.interval
+
+    def clear(self):
+        """forget every sample"""
+        self.samples = array('Q', bytes(8 * 0o100000))
+        self.countdown = self.interval
+
+    def total(self):
+        """number of samples taken"""
+        return sum(self.samples)
+
+    def hot_spots(self):
+        """returns [(address, samples)] for every address that was sampled, most samples first"""
+        sampled = [(slot << 1, count) for slot, count in enumerate(self.samples) if count]
+        return sorted(sampled, key=lambda item: item[1], reverse=True)
+
+    def flat_profile(self):
+        """Returns [(routine, samples, percent, cumulative percent)], most samples first.
+        A routine is a label from the listings; addresses before any label count as '?'."""
+        routines = {}
+        for address, count in self.hot_spots():
+            routine = self.symbols.routine(address)
+            if routine is None:
+                routine = '?'
+            routines[routine] = routines.get(routine, 0) + count
+        total = max(self.total(), 1)
+        profile = []
+        cumulative = 0
+        for routine, count in sorted(routines.items(), key=lambda item: item[1], reverse=True):
+            cumulative = cumulative + count
+            profile.append((routine, count, 100 * count / total, 100 * cumulative / total))
+        return profile
+
+    def report(self, n=20, disassembler=None):
+        """log the n hottest addresses and the flat profile"""
+        total = max(self.total(), 1)
+        logging.info(f'Profiler Report: {self.total()} samples, one every {self.interval} instructions')
+        logging.info('address location              samples  percent')
+        for address, count in self.hot_spots()[:n]:
+            line = f'{u.oct6(address)}  {u.pad(self.symbols.lookup(address), 20)} {count:8d} {100 * count / total:7.2f}'
+            if disassembler is not None:
+                line = f'{line}  {disassembler.disassemble(address)[1]}'
+            logging.info(line)
+        logging.info('routine               samples  percent cumulative')
+        for routine, count, percent, cumulative in self.flat_profile()[:n]:
+            logging.info(f'{u.pad(routine, 20)} {count:8d} {percent:7.2f} {cumulative:7.2f}')
+        logging.info('Profiler Report end')
@@ -1,5 +1,9 @@
 """pdp11_rss_ops.py double operand instructions"""
 import logging
+from pdp11_decode import decode_word
+from pdp11_decode import is_rss_op
+from pdp11_decode import SOB
+from pdp11_disassembler import RSS_NAMES
 import pdp11_util as u
 MASK_WORD = 0o177777
 MASK_WORD_MSB = 0o100000
@@ -9,13 +13,15 @@ MASK_HIGH_BYTE = 0o177400
 
 class rss_ops:
     """Implements PDP11 double-operand RSS instructions"""
-    def __init__(self, reg, ram, psw, am, sw):
+    def __init__(self, reg, ram, psw, am, sw, disassembler=None):
         logging.info('initializing doubleOperandOps')
         self.reg = reg
         self.ram = ram
         self.psw = psw
         self.am = am
         self.sw = sw
+        # the PDP11's Disassembler, for do_rss_op
+        self.disassembler = disassembler
 
         self.double_operand_RSS_instructions = {}
         self.double_operand_RSS_instructions[0o070000] = self.MUL
@@ -25,13 +31,7 @@ class rss_ops:
         self.double_operand_RSS_instructions[0o074000] = self.XOR
         self.double_operand_RSS_instructions[0o077000] = self.SOB
 
-        self.double_operand_RSS_instruction_names = {}
-        self.double_operand_RSS_instruction_names[0o070000] = "MUL"
-        self.double_operand_RSS_instruction_names[0o071000] = "DIV"
-        self.double_operand_RSS_instruction_names[0o072000] = "ASH"
-        self.double_operand_RSS_instruction_names[0o073000] = "ASHC"
-        self.double_operand_RSS_instruction_names[0o074000] = "XOR"
-        self.double_operand_RSS_instruction_names[0o077000] = "SOB"
+        self.double_operand_RSS_instruction_names = RSS_NAMES
 
     # ****************************************************
     # Double-Operand RSS instructions - 07 0R SS through 07 7R SS
@@ -214,8 +214,7 @@ class rss_ops:
         # get_v: cleared
         # get_c: unaffected
         result = self.reg.get(rDest) ^ source
-        self.psw.set_n('', result)
-        self.psw.set_z('', result)
+        self.psw.set_result('', result, 0)
         return result, ''
 
     def SOB(self, rDest, source):
@@ -227,33 +226,26 @@ class rss_ops:
 
     def is_rss_op(self, instruction):
         """Using instruction bit pattern, determine whether it's an RSS RDD RNN instruction"""
-        # 077R00 0 111 111 *** 000 000 SOB (jump & subroutine)
-        # bit 15 = 0
-        # bits 14-12 = 7
-        # bits 9 10 11 in [0,1,2,3,4,7]
-        bit15 = instruction & 0o100000 == 0o000000
-        bits14_12 = instruction & 0o070000 == 0o070000
-        bits11_9 = instruction & 0o077000 in [0o070000, 0o071000, 0o072000, 0o073000, 0o074000, 0o077000]
-        return bit15 and bits14_12 and bits11_9
+        return is_rss_op(instruction)
 
     def do_rss_op(self, instruction):
-        """dispatch an RSS opcode"""
-        # parameter: opcode of form 0 111 *** *** *** ***
-        # register source
-        # 15-9 opcode
-        # 8-6 reg
-        # 5-0 src
+        """execute an RSS instruction and disassemble it.
+        The CPU runs exec_rss_op straight from the decode table; this is for tests.
+        returns: run, operand1, operand2, assembly, report"""
+        assembly = self.disassembler.decode_fetched(instruction, self.reg.get_pc())[1]
+        run = self.exec_rss_op(decode_word(instruction))
+        return run, '', '', assembly, ''
+
+    def exec_rss_op(self, decoded):
+        """execute an RSS instruction without disassembling it.
+        parameter: Decoded fields from the decode table
+        returns: run"""
         self.sw.start("rss")
-        opcode = instruction & 0o077000
-        register = (instruction & 0o000700) >> 6
-        source = instruction & 0o000077
-
-        run = True
-        assembly = f'{self.double_operand_RSS_instruction_names[opcode]}'
-        destination_value, destination_register, destination_address, operand1, assembly1, destination_addressmode = self.am.addressing_mode_get(
-            'B', source)
-        result, report = self.double_operand_RSS_instructions[opcode](register, destination_value)
-        logging.info(f'    result:{oct(result)}')
-        self.reg.set(register, result)
+        if decoded.opcode == SOB:
+            operand = decoded.offset
+        else:
+            operand, address = self.am.operand_get('B', decoded.dst_mode, decoded.dst_reg)
+        result, report = self.double_operand_RSS_instructions[decoded.opcode](decoded.src_reg, operand)
+        self.reg.set(decoded.src_reg, result)
         self.sw.stop("rss")
-        return run, "", "", assembly, report
+        return True
@@ -0,0 +1,24 @@
+"""pdp11_serial.py - a console for headless runs that feeds and reads the DL11 from a device poll"""
+
+class Serial:
+    """A device poll that types script into the DL11 one character at a time
+    and collects whatever the guest transmits."""
+    def __init__(self, dl11, script=''):
+        self.dl11 = dl11
+        self.script = script
+        self.typed = 0
+        self.output = []
+
+    def poll(self):
+        """collect what has been transmitted, then type the next character once the guest has read the last one"""
+        byte = self.dl11.transmitted_character()
+        while byte is not None:
+            self.output.append(chr(byte))
+            byte = self.dl11.transmitted_character()
+        if self.typed < len(self.script) and not self.dl11.input_pending():
+            self.dl11.type_character(ord(self.script[self.typed]))
+            self.typed = self.typed + 1
+
+    def text(self):
+        """everything transmitted so far"""
+        return ''.join(self.output)
@@ -0,0 +1,131 @@
+"""pdp11_snapshot.py - save the whole machine to a file and start it again from there
+
+A snapshot is a header, sections of processor and device state, then an image of physical memory:
+    header      MAGIC, format version, memory bits, number of sections, offset of the memory image
+    sections    a 4-byte tag and the length of what follows, then the state
+    memory      every byte of memory, starting at an offset that mmap can map
+Pages of memory that are all zero aren't written, so they're holes in the file that read as zero.
+Loading maps the image copy-on-write as the new memory, so nothing is read until the guest touches it.
+Sections this version doesn't know are skipped, and state whose section is missing is left alone.
+"""
+import os
+import mmap
+import struct
+import logging
+
+
+MAGIC = b'PDP11SNP'
+VERSION = 1
+HEADER = struct.Struct('<8sHHIQ')
+SECTION = struct.Struct('<4sI')
+# the memory image starts on a boundary both mmap and Ram pages can use
+ALIGNMENT = max(mmap.ALLOCATIONGRANULARITY, 0o20000)
+
+# R0-R7, PSW, instructions run, instructions idled through, waiting for an interrupt.
+# Registers are signed because an instruction that doesn't mask its result can leave a negative value.
+CPU = struct.Struct('<8iHQQ?')
+# RCSR, RBUF, XCSR, XBUF
+DL11 = struct.Struct('<4H')
+# lengths of the DL11 receive and transmit FIFOs; their bytes follow
+DL11_FIFOS = struct.Struct('<HH')
+# switch settings
+M9301 = struct.Struct('<H')
+# RKCS, RKWC, RKBA, RKDA, RKMR, RKDB
+RK11 = struct.Struct('<6H')
+# PDRs and PARs of every mode, SR0, SR2, SR3
+MMU = struct.Struct('<32H32H3H')
+
+def save_sections(pdp11):
+    """[(tag, bytes)] of the processor and device state"""
+    sections = [(b'CPU ', CPU.pack(*pdp11.reg.get_register_file(), pdp11.psw.psw,
+                                   pdp11.CPU_cycles, pdp11.idle_cycles, pdp11.noopr_ops.waiting))]
+    dl11 = pdp11.dl11
+    sections.append((b'DL11', DL11.pack(dl11.RCSR, dl11.RBUF, dl11.XCSR, dl11.XBUF)))
+    received = dl11.receive_fifo.contents()
+    transmitted = dl11.transmit_fifo.contents()
+    sections.append((b'DLQ ', DL11_FIFOS.pack(len(received), len(transmitted)) + bytes(received + transmitted)))
+    sections.append((b'M930', M9301.pack(pdp11.m9301.switch_settings)))
+    rk11 = getattr(pdp11, 'rk11', None)
+    if rk11 is not None:
+        sections.append((b'RK11', RK11.pack(rk11.RKCS, rk11.RKWC, rk11.RKBA, rk11.RKDA, rk11.RKMR, rk11.RKDB)))
+    mmu = pdp11.mmu
+    if mmu is not None:
+        sections.append((b'MMU ', MMU.pack(*[word for mode in mmu.pdr for word in mode],
+                                           *[word for mode in mmu.par for word in mode],
+                                           mmu.sr0, mmu.sr2, mmu.sr3)))
+    return sections
+
+def load_section(pdp11, tag, data):
+    """put back the state in one section"""
+    if tag == b'CPU ':
+        *registers, psw, pdp11.CPU_cycles, pdp11.idle_cycles, pdp11.noopr_ops.waiting = CPU.unpack(data)
+        for register, value in enumerate(registers):
+            pdp11.reg.set(register, value)
+        pdp11.psw.psw = psw
+    elif tag == b'DL11':
+        dl11 = pdp11.dl11
+        dl11.RCSR, dl11.RBUF, dl11.XCSR, dl11.XBUF = DL11.unpack(data)
+    elif tag == b'DLQ ':
+        dl11 = pdp11.dl11
+        received, transmitted = DL11_FIFOS.unpack_from(data)
+        characters = data[DL11_FIFOS.size:]
+        dl11.receive_fifo.refill(characters[:received])
+        dl11.transmit_fifo.refill(characters[received:received + transmitted])
+    elif tag == b'M930':
+        pdp11.m9301.switch_settings, = M9301.unpack(data)
+    elif tag == b'RK11' and getattr(pdp11, 'rk11', None) is not None:
+        rk11 = pdp11.rk11
+        rk11.RKCS, rk11.RKWC, rk11.RKBA, rk11.RKDA, rk11.RKMR, rk11.RKDB = RK11.unpack(data)
+    elif tag == b'MMU ' and pdp11.mmu is not None:
+        mmu = pdp11.mmu
+        words = MMU.unpack(data)
+        for mode in range(4):
+            mmu.pdr[mode][:] = words[8 * mode:8 * mode + 8]
+            mmu.par[mode][:] = words[32 + 8 * mode:32 + 8 * mode + 8]
+        mmu.sr0, mmu.sr2, mmu.sr3 = words[64:]
+        mmu.set_address_size()
+        if bool(mmu.sr0 & 1) != mmu.enabled:
+            mmu.enable(bool(mmu.sr0 & 1))
+    else:
+        logging.info(f'load_snapshot: skipping section {tag}')
+
+def save_snapshot(pdp11, file):
+    """Write a snapshot of pdp11 to file.
+    It's written to a temporary file that then replaces file,
+    so an emulator that loaded the old snapshot keeps its mapping of it."""
+    ram = pdp11.ram
+    sections = save_sections(pdp11)
+    body = b''.join(SECTION.pack(tag, len(data)) + data for tag, data in sections)
+    offset = -(-(HEADER.size + len(body)) // ALIGNMENT) * ALIGNMENT
+    bits = (ram.top_of_memory + 1).bit_length() - 1
+    temporary = f'{file}.tmp'
+    pages = ram.resident_pages()
+    with open(temporary, 'wb') as snapshot:
+        snapshot.write(HEADER.pack(MAGIC, VERSION, bits, len(sections), offset))
+        snapshot.write(body)
+        for address, page in pages:
+            snapshot.seek(offset + address)
+            snapshot.write(page)
+        snapshot.truncate(offset + ram.top_of_memory + 1)
+    os.replace(temporary, file)
+    logging.info(f'save_snapshot {file}: {len(sections)} sections, {len(pages)} pages of memory')
+
+def load_snapshot(pdp11, file):
+    """Put pdp11 back the way it was when the snapshot in file was saved.
+    Its code caches have to be cleared first."""
+    with open(file, 'rb') as snapshot:
+        magic, version, bits, count, offset = HEADER.unpack(snapshot.read(HEADER.size))
+        if magic != MAGIC:
+            raise ValueError(f'load_snapshot: {file} is not a snapshot')
+        if version > VERSION:
+            raise ValueError(f'load_snapshot: {file} is version {version}; this emulator reads up to {VERSION}')
+        if 2 ** bits - 1 != pdp11.ram.top_of_memory:
+            raise ValueError(f'load_snapshot: {file} has {bits}-bit memory')
+        sections = []
+        for i in range(count):
+            tag, length = SECTION.unpack(snapshot.read(SECTION.size))
+            sections.append((tag, snapshot.read(length)))
+    pdp11.ram.load_image(file, offset)
+    for tag, data in sections:
+        load_section(pdp11, tag, data)
+    logging.info(f'load_snapshot {file}: {count} sections')
@@ -1,20 +1,33 @@
 """pdp11_ss_ops.py single oprand instructions"""
 import logging
+from pdp11_decode import decode_word
+from pdp11_decode import is_ss_op
+from pdp11_decode import MARK
+from pdp11_disassembler import SINGLE_OPERAND_NAMES
 MASK_WORD = 0o177777
 MASK_WORD_MSB = 0o100000
 MASK_BYTE_MSB = 0o000200
 MASK_LOW_BYTE = 0o000377
 MASK_HIGH_BYTE = 0o177400
+PSW_V = 0o000002
+PSW_C = 0o000001
+
+# MFPI, MTPI, MFPD and MTPD take the address mode and register instead of the operand,
+# because the operand is in the previous mode's address space.
+# There's no separate data space, so MFPD and MTPD are the same as MFPI and MTPI.
+PREVIOUS_SPACE = [0o006500, 0o006600, 0o106500, 0o106600]
 
 class ss_ops:
     """Implements PDP11 single-operand ss instructions"""
-    def __init__(self, reg, ram, psw, am, sw):
+    def __init__(self, reg, ram, psw, am, sw, disassembler=None):
         logging.info('initializing SingleOperandOps')
         self.reg = reg
         self.ram = ram
         self.psw = psw
         self.am = am
         self.sw = sw
+        # the PDP11's Disassembler, for do_ss_op
+        self.disassembler = disassembler
 
         # ****************************************************
         # Single-Operand instructions -
@@ -59,43 +72,7 @@ class ss_ops:
         self.single_operand_instructions[0o106600] = self.MTPD
         self.single_operand_instructions[0o106700] = self.MFPS
 
-        self.single_operand_instruction_names = {}
-        self.single_operand_instruction_names[0o000100] = "JMP"
-        self.single_operand_instruction_names[0o000300] = "SWAB"
-
-        self.single_operand_instruction_names[0o005000] = "CLR"
-        self.single_operand_instruction_names[0o005100] = "COM"
-        self.single_operand_instruction_names[0o005200] = "INC"
-        self.single_operand_instruction_names[0o005300] = "DEC"
-        self.single_operand_instruction_names[0o005400] = "NEG"
-        self.single_operand_instruction_names[0o005500] = "ADC"
-        self.single_operand_instruction_names[0o005600] = "SBC"
-        self.single_operand_instruction_names[0o005700] = "TST"
-        self.single_operand_instruction_names[0o006000] = "ROR"
-        self.single_operand_instruction_names[0o006100] = "ROL"
-        self.single_operand_instruction_names[0o006200] = "ASR"
-        self.single_operand_instruction_names[0o006300] = "ASL"
-        self.single_operand_instruction_names[0o006400] = "MARK"
-        self.single_operand_instruction_names[0o006500] = "MFPI"
-        self.single_operand_instruction_names[0o006600] = "MTPI"
-        self.single_operand_instruction_names[0o006700] = "SXT"
-
-        self.single_operand_instruction_names[0o105000] = "CLRB"
-        self.single_operand_instruction_names[0o105100] = "COMB"
-        self.single_operand_instruction_names[0o105200] = "INCB"
-        self.single_operand_instruction_names[0o105300] = "DECB"
-        self.single_operand_instruction_names[0o105400] = "NEGB"
-        self.single_operand_instruction_names[0o105500] = "ADCB"
-        self.single_operand_instruction_names[0o105600] = "SBCB"
-        self.single_operand_instruction_names[0o105700] = "TSTB"
-        self.single_operand_instruction_names[0o106000] = "RORB"
-        self.single_operand_instruction_names[0o106100] = "ROLB"
-        self.single_operand_instruction_names[0o106200] = "ASRB"
-        self.single_operand_instruction_names[0o106300] = "ASLB"
-        self.single_operand_instruction_names[0o106400] = "MTPS"
-        self.single_operand_instruction_names[0o106500] = "MFPD"
-        self.single_operand_instruction_names[0o106600] = "MTPD"
-        self.single_operand_instruction_names[0o106700] = "MFPS"
+        self.single_operand_instruction_names = SINGLE_OPERAND_NAMES
 
         self.single_operand_instruction_texts = {}
         self.single_operand_instruction_texts[0o000100] = "jump"
@@ -174,9 +151,7 @@ class ss_ops:
         # v: cleared
         # c: cleared
         result = ((operand & 0xFF00) >> 8) + ((operand & 0x00FF) << 8)
-        self.psw.set_n("B", result & 0x00FF)
-        self.psw.set_z("B", result & 0x00FF)
-        self.psw.set_psw(v=0, c=0)
+        self.psw.set_result("B", result, PSW_V | PSW_C)
         return result, ''
 
     def CLR(self, operand, B):
@@ -193,9 +168,7 @@ class ss_ops:
         woperand = operand | 0o400000
         result = ~woperand & MASK_WORD
         result = self.byte_mask(B, result, operand)
-        self.psw.set_n(B, result)
-        self.psw.set_z(B, result)
-        self.psw.set_psw(v=0, c=1)
+        self.psw.set_result(B, result, PSW_V | PSW_C, PSW_C)
         return result, '' #f'COM({bin(operand)})={bin(result)}'
 
     def INC(self, operand, B):
@@ -240,9 +213,7 @@ class ss_ops:
 
     def TST(self, operand, B):
         """00 57 DD Test Destination"""
-        self.psw.set_n(B, operand)
-        self.psw.set_z(B, operand)
-        self.psw.set_psw(v=0, c=0)
+        self.psw.set_result(B, operand, PSW_V | PSW_C)
         return operand, ''
 
     def ROR(self, operand, B):
@@ -390,83 +361,87 @@ class ss_ops:
         # stack operation LSI11-03
         return operand, 'MTPS **** not implemented'
 
-    def MFPI (self, operand, B):
-        # Move from Previous Instruction Space
-        # MMU instruction not in LSI11-03
-        return operand, 'MFPI NOT IMPLEMENTED'
+    def MFPI(self, addressmode, register):
+        """00 65 SS Move from previous instruction space 4-77"""
+        # Pushes a word from the previous mode's address space onto the current stack.
+        # A register operand is the current register: there's only one set, and one SP.
+        # n: set if the word < 0; z: set if the word = 0; v: cleared; c: unaffected
+        if addressmode == 0:
+            result = self.reg.get(register)
+        else:
+            result = self.ram.read_word_previous(self.am.operand_address(addressmode, register))
+        stack = self.reg.get_sp() - 2
+        self.reg.set_sp(stack)
+        self.ram.write_word(stack, result)
+        self.psw.set_result('', result)
+        return result, ''
 
-    def MTPI (self, operand, B):
-        # move to previous instruction space
-        # MMU instruction not in LSI11-03
-        return operand, 'MTPI NOT IMPLEMENTED'
+    def MTPI(self, addressmode, register):
+        """00 66 DD Move to previous instruction space 4-78"""
+        # Pops a word off the current stack into the previous mode's address space.
+        # n: set if the word < 0; z: set if the word = 0; v: cleared; c: unaffected
+        stack = self.reg.get_sp()
+        result = self.ram.read_word(stack)
+        self.reg.set_sp(stack + 2)
+        if addressmode == 0:
+            self.reg.set(register, result)
+        else:
+            self.ram.write_word_previous(self.am.operand_address(addressmode, register), result)
+        self.psw.set_result('', result)
+        return result, ''
 
     def MFPS (self, operand, B):
+        """10 67 DD Move byte from PSW"""
         # Not PDP11-40
-        # MMU instruction not in LSI11-03
-        return operand, 'MFPS NOT IMPLEMENTED'
+        # (dst) < PSW low byte
+        # n: set if PSW bit 7 is set; z: set if PSW low byte is 0; v: cleared; c: unaffected
+        # In register mode bit 7 is sign-extended through the high byte, like MOVB.
+        # Byte writes to memory keep only the low byte.
+        result = self.psw.get_psw() & MASK_LOW_BYTE
+        if result & MASK_BYTE_MSB:
+            result = result | MASK_HIGH_BYTE
+        self.psw.set_result('B', result)
+        return result, ''
 
-    def MFPD(self, operand, B):
+    def MFPD(self, addressmode, register):
         """10 65 SS Move from previous data space"""
-        # MMU instruction not in LSI11-03
-        return operand, 'MFPD NOT IMPLEMENTED'
+        return self.MFPI(addressmode, register)
 
-    def MTPD(self, operand, B):
+    def MTPD(self, addressmode, register):
         """10 66 SS Move to previous data space"""
-        # MMU instruction not in LSI11-03
-        return operand, 'MTPD NOT IMPLEMENTED'
+        return self.MTPI(addressmode, register)
 
     def is_ss_op(self, instruction):
         """Using instruction bit pattern, determine whether it's a single-operand instruction"""
-        # 15  12 10  876 543 210
-        #  * 000 101 *** *** ***
-        #  * 000 110 *** *** ***
-        # bit 15 can be 1 or 0
-        # bits 14,13,12 must be 0
-        # bits 11,10,9 must be 5 or 6
-        # bits 8,7,6 can be anything
-        # bits 5-0 can be anything
-        # 0o000301 is one of these
-        # 0 000 000 101 *** ***
-        bits_14_13_12 = instruction & 0o070000 == 0o000000
-        bits_11_10_9 = instruction & 0o007000 in [0o006000, 0o005000]
-        is_jmp = instruction & 0o177700 == 0o000100
-        is_swab = instruction & 0o177700 == 0o000300
-        return (bits_14_13_12 and bits_11_10_9) or is_swab or is_jmp
+        return is_ss_op(instruction)
 
     def do_ss_op(self, instruction):
-        """dispatch a single-operand opcode"""
-        # parameter: opcode of form * 000 1** *** *** ***
-        # single operands
-        # 15-6 opcode
-        # 15 is 1 to indicate a byte instruction
-        # 15 is 0 to indicate a word instruction
-        # 5-0 dst
-
+        """execute a single-operand instruction and disassemble it.
+        The CPU runs exec_ss_op straight from the decode table; this is for tests.
+        returns: run, operand1, operand2, assembly, report"""
+        assembly = self.disassembler.decode_fetched(instruction, self.reg.get_pc())[1]
+        run = self.exec_ss_op(decode_word(instruction))
+        return run, '', '', assembly, ''
+
+    def exec_ss_op(self, decoded):
+        """execute a single-operand instruction without disassembling it.
+        parameter: Decoded fields from the decode table
+        returns: run"""
         self.sw.start("ss")
-
-        # is it a Byte or Word instruction?
-        if (instruction & 0o100000) == 0o100000:
-            BW = 'B'
-        else:
-            BW = ''
-        source = instruction & 0o000077
-        opcode = instruction & 0o107700
         run = True
-        if opcode == 0o000100:
+        if decoded.opcode == 0o000100:
             # special handling for JMP with R7.
-            run, source_value, operand, assembly = self.am.addressing_mode_jmp(source)
-            assembly = f'{self.single_operand_instruction_names[opcode]} {assembly}'
-            result, report = self.single_operand_instructions[opcode](source_value, BW)
+            run, jump_address = self.am.jump_get(decoded.dst_mode, decoded.dst_reg)
+            self.JMP(jump_address, '')
+        elif decoded.opcode in PREVIOUS_SPACE:
+            self.single_operand_instructions[decoded.opcode](decoded.dst_mode, decoded.dst_reg)
+        elif decoded.opcode == MARK:
+            # MARK's NN is a count, not an address mode
+            self.MARK(decoded.offset, '')
         else:
-            source_value, out_register, out_address, operand, assembly, addressmode = self.am.addressing_mode_get(BW, source)
-            assembly = f'{self.single_operand_instruction_names[opcode]} {assembly}'
-            try:
-                result, report = self.single_operand_instructions[opcode](source_value, BW)
-                self.am.addressing_mode_set(BW, addressmode, result, out_register, out_address)
-            except KeyError:
-                assembly = ''
-                report = 'Error: single-operand opcode not found'
-                result = False
-
+            bw = decoded.bw
+            operand, address = self.am.operand_get(bw, decoded.dst_mode, decoded.dst_reg)
+            result, report = self.single_operand_instructions[decoded.opcode](operand, bw)
+            self.am.addressing_mode_set(bw, decoded.dst_mode, result, decoded.dst_reg, address)
         self.sw.stop("ss")
-        return run, operand, '', assembly, report
+        return run
@@ -1,21 +1,28 @@
 """pdp11_rss_ops.py double operand instructions"""
 import logging
+from pdp11_decode import decode_word
+from pdp11_decode import is_ssdd_op
+from pdp11_disassembler import SSDD_NAMES
 import pdp11_util as u
 MASK_WORD = 0o177777
 MASK_WORD_MSB = 0o100000
 MASK_BYTE_MSB = 0o000200
 MASK_LOW_BYTE = 0o000377
 MASK_HIGH_BYTE = 0o177400
+PSW_V = 0o000002
+PSW_C = 0o000001
 
 class ssdd_ops:
     """Implements PDP11 double-operand ssdd instructions"""
-    def __init__(self, reg, ram, psw, am, sw):
+    def __init__(self, reg, ram, psw, am, sw, disassembler=None):
         logging.debug('initializing DoubleOperandOps')
         self.reg = reg
         self.ram = ram
         self.psw = psw
         self.am = am
         self.sw = sw
+        # the PDP11's Disassembler, for do_ssdd_op
+        self.disassembler = disassembler
 
         self.double_operand_SSDD_instructions = {}
         # SSDD instructions with B variants the usual way
@@ -28,19 +35,7 @@ class ssdd_ops:
         # SSDD instructions that break the rule
         self.double_operand_SSDD_instructions[0o060000] = self.ADDSUB
 
-        self.double_operand_SSDD_instruction_names = {}
-        self.double_operand_SSDD_instruction_names[0o010000] = "MOV"
-        self.double_operand_SSDD_instruction_names[0o020000] = "CMP"
-        self.double_operand_SSDD_instruction_names[0o030000] = "BIT"
-        self.double_operand_SSDD_instruction_names[0o040000] = "BIC"
-        self.double_operand_SSDD_instruction_names[0o050000] = "BIS"
-        self.double_operand_SSDD_instruction_names[0o060000] = "ADD"
-        self.double_operand_SSDD_instruction_names[0o110000] = "MOVB"
-        self.double_operand_SSDD_instruction_names[0o120000] = "CMPB"
-        self.double_operand_SSDD_instruction_names[0o130000] = "BITB"
-        self.double_operand_SSDD_instruction_names[0o140000] = "BICB"
-        self.double_operand_SSDD_instruction_names[0o150000] = "BISB"
-        self.double_operand_SSDD_instruction_names[0o160000] = "SUB"
+        self.double_operand_SSDD_instruction_names = SSDD_NAMES
 
     # ****************************************************
     # Double-Operand SSDD instructions
@@ -77,9 +72,7 @@ class ssdd_ops:
         #result = source
         #logging.debug(f'                                  ; MOV {bin(source)},{bin(dest)}')
         result = self.byte_mask(BW, source, dest)
-        self.psw.set_n(BW, source)
-        self.psw.set_z(BW, source)
-        self.psw.set_psw(v=0)
+        self.psw.set_result(BW, source)
         return result, ''
 
     def CMP(self, BW, source, dest):
@@ -107,9 +100,7 @@ class ssdd_ops:
         result = self.byte_mask(BW, source, source & dest)
 
         #logging.debug(f'    BIT source:{source} dest:{dest} result:{result}')
-        self.psw.set_n(BW, result)
-        self.psw.set_z(BW, result)
-        self.psw.set_psw(v=0)
+        self.psw.set_result(BW, result)
         return result, ''
 
     def BIC(self, BW, source, dest):
@@ -121,9 +112,7 @@ class ssdd_ops:
         # for byte operations,
         # low-order byte is affected
         # high-order byte is unchanged
-        self.psw.set_n(BW, result)
-        self.psw.set_z(BW, result)
-        self.psw.set_psw(v=0)
+        self.psw.set_result(BW, result)
         return result, '' #f'    ; BIC{BW}({bin(source)},{bin(dest)}) result: {bin(result)}'
 
     def BIS(self, BW, source, dest):
@@ -131,9 +120,7 @@ class ssdd_ops:
         (dst) < (src) get_v (dst)"""
         result = self.byte_mask(BW, source | dest, dest)
         #logging.debug(f'    BIS {oct(source)} {oct(dest)} -> {oct(result)}')
-        self.psw.set_n(BW, result)
-        self.psw.set_z(BW, result)
-        self.psw.set_psw(v=0)
+        self.psw.set_result(BW, result)
         return result, ''
 
     def ADDSUB(self, BW, source, dest):
@@ -188,64 +175,31 @@ class ssdd_ops:
                     v = 1
                     c = 1
 
-        self.psw.set_n('W', pdp11_result)
-        self.psw.set_z('W', pdp11_result)
-        self.psw.set_psw(v=v, c=c)
+        self.psw.set_result('W', pdp11_result, PSW_V | PSW_C, (v << 1) | c)
 
         return pdp11_result, ''
 
     def is_ssdd_op(self, instruction):
-        """Using instruction bit pattern, determine whether it's a souble operand instruction"""
-        # bits 14 - 12 in [1, 2, 3, 4, 5, 6]
-        #logging.debug(f'is_ssdd_op {oct(instruction)}&0o070000={instruction & 0o070000}')
-        bits14_12 = instruction & 0o070000 in [0o010000, 0o020000, 0o030000, 0o040000, 0o050000, 0o060000]
-        return bits14_12
+        """Using instruction bit pattern, determine whether it's a double operand instruction"""
+        return is_ssdd_op(instruction)
 
     def do_ssdd_op(self, instruction):
-        """dispatch a double-operand opcode.
-        parameter: opcode of form * +++ *** *** *** ***
-        where +++ = not 000 and not 111 and not 110 """
-        # double operands
-        # 15-12 opcode
-        # 11-6 src
-        # 5-0 dst
-
-        #        * +++ *** *** *** *** double operands
-        # •1SSDD * 001 *** *** *** *** MOV move source to destination (double)
-        # •2SSDD * 010 *** *** *** *** CMP compare src to dst (double)
-        # •3SSDD * 011 *** *** *** *** BIT bit test (double)
-        # •4SSDD * 100 *** *** *** *** BIC bit clear (double)
-        # •5SSDD * 101 *** *** *** *** BIS bit set (double)
-
+        """execute a double-operand instruction and disassemble it.
+        The CPU runs exec_ssdd_op straight from the decode table; this is for tests.
+        returns: run, operand1, operand2, assembly, report"""
+        assembly = self.disassembler.decode_fetched(instruction, self.reg.get_pc())[1]
+        run = self.exec_ssdd_op(decode_word(instruction))
+        return run, '', '', assembly, ''
+
+    def exec_ssdd_op(self, decoded):
+        """execute a double-operand instruction without disassembling it.
+        parameter: Decoded fields from the decode table
+        returns: run"""
         self.sw.start("ssdd")
-        self.reg.PC_increment = 0
-        if (instruction & 0o100000) >> 15 == 1:
-            bw = 'B'
-        else:
-            bw = 'W'
-        opcode = instruction & 0o070000
-        name_opcode = instruction & 0o170000
-
-        source = (instruction & 0o007700) >> 6
-        dest = instruction & 0o000077
-        #logging.debug(f'    source_value  = addressing_mode_get')
-        source_value, source_register, source_address, operand1, assembly1, source_addressmode = self.am.addressing_mode_get(bw, source)
-        #logging.debug(f'    dest_value = addressing_mode_get')
-        dest_value, dest_register, dest_address, operand2, assembly2, dest_addressmode = self.am.addressing_mode_get(bw, dest)
-        #logging.debug(f'    S:{oct(source_value)} R:{oct(source_register)} @:{oct(source_address)}  D:{oct(dest_value)} R:{oct(dest_register)} @:{oct(dest_address)}')
-
-        run = True
-        #logging.debug(f'    result = double_operand_SSDD_instructions')
-        try:
-            result, report = self.double_operand_SSDD_instructions[opcode](bw, source_value, dest_value)
-            assembly = f'{self.double_operand_SSDD_instruction_names[name_opcode]} {assembly1},{assembly2}'
-            #logging.debug(f'    result:{oct(result)}   NVZC:{self.psw.get_nzvc()}  PC:{oct(self.reg.get_pc())}')
-        except KeyError:
-            assembly = 'Error: double operand opcode not found'
-            result = False
-
-        #logging.debug(f'    addressing_mode_set')
-        self.am.addressing_mode_set(bw, dest_addressmode, result, dest_register, dest_address)
+        bw = decoded.bw
+        source_value, source_address = self.am.operand_get(bw, decoded.src_mode, decoded.src_reg)
+        dest_value, dest_address = self.am.operand_get(bw, decoded.dst_mode, decoded.dst_reg)
+        result, report = self.double_operand_SSDD_instructions[decoded.opcode & 0o070000](bw, source_value, dest_value)
+        self.am.addressing_mode_set(bw, decoded.dst_mode, result, decoded.dst_reg, dest_address)
         self.sw.stop("ssdd")
-
-        return run, operand1, operand2, assembly, report
+        return True
@@ -1,12 +1,11 @@
 """PDP11 TEK4010 Emulator"""
-import time
 import logging
 import PySimpleGUI as sg
 
 # This shows me that I need to rework the architecture here
 # Somehow the code for the terminals has to be separated out
 # from the code for the DL11.
-# wait_for_rcsr_done_get_lock must be in the DL11
+# The terminal side of the DL11 is now its FIFOs: type_character and transmitted_character.
 
 # TEK4010 switches and buttons:
 # Local/Line - local loop or connect to computer. Works like echo
@@ -37,8 +36,6 @@ class TEK4010_Console:
         self.pdp11 = pdp11
         self.dl11 = pdp11.dl11
         logging.info(f'tek4010 dl11:{self.dl11}')
-        self.lock = pdp11.lock
-        logging.info(f'tek4010 lock:{self.lock}')
         self.window_cycles = 0
         self.buffer = 0  # for holding LF after CR was sent
         self.window = 0
@@ -95,20 +92,6 @@ class TEK4010_Console:
 
         # autoscroll=True,
 
-    def wait_for_rcsr_done_get_lock(self):
-        """get lock, read RCSR. If it's done, keep the lock"""
-        #logging.debug('wait_for_rcsr_done_get_lock')
-        self.lock.acquire()
-        rcsr = self.dl11.read_RCSR()
-        while (rcsr & self.dl11.RCSR_RCVR_DONE) != 0:
-            #logging.debug('wait_for_rcsr_done_get_lock loop')
-            self.lock.release()
-            time.sleep(0.1)
-            self.lock.acquire()
-            rcsr = self.dl11.read_RCSR()
-        #logging.debug('got RCSR_DONE and lock')
-        # RCSR_RCVR_DONE == 0 and we have the python event lock
-
     def window_cycle(self):
         '''One PySimpleGUI window_cycle'''
         # parameters from PDP11
@@ -128,20 +111,10 @@ class TEK4010_Console:
         pc_display = self.window['pc_display']
         pc_display.update(oct(self.pdp11.reg.get_pc()))
 
-        # If there's a character in the dl11 transmit buffer,
-        # then send it to the display
-        self.lock.acquire()
-        #logging.debug(f'tek4010 got lock {self.window_cycles}')
-        if (self.dl11.read_XCSR() & self.dl11.XCSR_XMIT_RDY) == 0:
-            XBUF = self.dl11.read_XBUF() # read_XBUF is supposed to set XCSR to XCSR_XMIT_RDY
-            logging.info(
-                f'cycle {self.window_cycles} {self.pdp11.CPU_cycles} dl11 XBUF sent us ' +
-                f'{oct(XBUF)} {XBUF} {self.safe_character(XBUF)}')
-
-            XCSR = self.dl11.read_XCSR()
-            if (XCSR & self.dl11.XCSR_XMIT_RDY) != self.dl11.XCSR_XMIT_RDY:
-                logging.error(f'XCSR {oct(XCSR)} was not set with {oct(self.dl11.XCSR_XMIT_RDY)}')
-
+        # Send whatever the dl11 has transmitted to the display.
+        # The dl11 keeps it in a FIFO, so this takes no lock and never holds up the CPU.
+        XBUF = self.dl11.transmitted_character()
+        while XBUF is not None:
             # Sure, DL11 can send us nulls; I just won't show them.
             if XBUF != 0:
                 # deal specially with <o15><o12> <13><11> CR LF
@@ -149,8 +122,7 @@ class TEK4010_Console:
                 # call update or cprint with key
                 if XBUF != 13:
                     sg.cprint(chr(XBUF), end='', sep='', autoscroll=True)
-        self.lock.release()
-        #logging.debug(f'tek4010 release lock {self.window_cycles}')
+            XBUF = self.dl11.transmitted_character()
 
         event, values = self.window.read(timeout=0)
         # values:values:{'runhalt1': False, 'runhalt0': True, 'linelocal1': True, 'linelocal0': False, 'keyboard': ''}
@@ -167,10 +139,7 @@ class TEK4010_Console:
         if event == 'keyboard_Enter':
             self.window['keyboard'].Update('')
             #logging.debug(f'{self.window_cycles} sending DL11 0o12 "CR"')
-            self.wait_for_rcsr_done_get_lock()
-            self.dl11.write_RBUF(0o15)
-            #logging.debug(f'tek4010 released lock {self.window_cycles}')
-            self.lock.release()
+            self.dl11.type_character(0o15)
 
         # If there's a keyboard event
         # then send the character to the serial interface
@@ -179,10 +148,7 @@ class TEK4010_Console:
             self.window['keyboard'].Update('')
             o = ord(kbd[0:1])
             #logging.debug(f'{self.window_cycles} sending DL11 {o} {self.safe_character(o)}')
-            self.wait_for_rcsr_done_get_lock()
-            self.dl11.write_RBUF(o)
-            #logging.debug(f'tek4010 released lock {self.window_cycles}')
-            self.lock.release()
+            self.dl11.type_character(o)
 
         if event in (sg.WIN_CLOSED, 'Quit'):  # if user closes window or clicks cancel
             logging.info('Quit')
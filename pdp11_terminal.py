@@ -1,6 +1,5 @@
 """Terminal Emulator doesnt work yet."""
 import logging
-import PySimpleGUI as sg
 
 class Terminal:
     """Terminal emulator"""
@@ -20,24 +19,21 @@ class Terminal:
         # This is an attenpt to make the terminal automatcaly send LF after CR.
         # If there's a character in our buffer, send it to the DL11
         if self.buffer != 0:
-            if self.dl11.RCSR & self.dl11.RCSR_RCVR_DONE == 0:
-                self.dl11.write_RBUF(self.buffer)
+            if self.dl11.type_character(self.buffer):
                 self.buffer = 0
 
-        # if there's a character in the dl11 transmit buffer,
-        # then eat it
-        if self.dl11.XCSR & self.dl11.XCSR_XMIT_RDY == 0:
-            logging.info(f'dl11 read_XBUF:{chr(newchar)}')
+        # print whatever the dl11 has transmitted
+        newchar = self.dl11.transmitted_character()
+        while newchar is not None:
             # Sure, DL11 can send me nulls; I just won't show them.
             if newchar != 0:
-                logging.info(f'dl11 read_XBUF:{chr(newchar)}')
-                print (newchar, end ="")
+                print (chr(newchar), end ="")
+            newchar = self.dl11.transmitted_character()
 
         # there's no way yet to read a character from the keybaord in a non blocking maner.
         # and this can't run from inside the PyCharm console, which is stupid
         #key = " " # bogus
         #if user_key():
-        #    if self.dl11.RCSR & self.dl11.RCSR_RCVR_DONE == 0:
-        #        self.dl11.write_RBUF(ord(kbd[0:1]))
+        #    self.dl11.type_character(ord(kbd[0:1]))
 
         return
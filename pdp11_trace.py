@@ -0,0 +1,91 @@
+"""pdp11_trace.py - keep the last instructions executed in a binary ring buffer
+
+python3 pdp11_trace.py pdp11.trace    prints a dumped trace in the format tracing used to log
+"""
+import sys
+import struct
+import logging
+
+import pdp11_util as u
+from pdp11_disassembler import Disassembler
+
+# One record for each instruction: the cycle number, the PC it ran at,
+# the instruction word and the two words after it, then R0-R7 and the PSW after it ran.
+# Registers are signed: NEG and autodecrement can leave them below 0.
+RECORD = struct.Struct('<QH6s8iH')
+# A dump starts with the magic string, the record size and the number of records that follow, oldest first.
+HEADER = struct.Struct('<8sIQ')
+MAGIC = b'PDP11TRC'
+
+class InstructionTrace:
+    """A fixed-size ring of RECORD-sized slots in a bytearray.
+    Appending packs one record over the oldest one; nothing is formatted until a dump is decoded."""
+    def __init__(self, size=100000):
+        logging.info(f'initializing InstructionTrace({size})')
+        self.size = size
+        self.buffer = bytearray(size * RECORD.size)
+        # slot the next record goes in
+        self.next = 0
+        # records appended since the trace was made or cleared
+        self.count = 0
+        self.pack_into = RECORD.pack_into
+
+    def append(self, cycle, pc, code, registers, psw):
+        """Record one instruction.
+        code is the bytes at pc; only the first six are kept. registers is R0-R7."""
+        self.pack_into(self.buffer, self.next * RECORD.size, cycle, pc, code, *registers, psw)
+        self.next = self.next + 1
+        if self.next == self.size:
+            self.next = 0
+        self.count = self.count + 1
+
+    def clear(self):
+        """forget every record"""
+        self.next = 0
+        self.count = 0
+
+    def records(self):
+        """the bytes of the records in the ring, oldest first"""
+        if self.count < self.size:
+            return bytes(self.buffer[:self.next * RECORD.size])
+        split = self.next * RECORD.size
+        return bytes(self.buffer[split:] + self.buffer[:split])
+
+    def dump(self, file):
+        """write the records in the ring, oldest first, to a binary file"""
+        records = self.records()
+        with open(file, 'wb') as tracefile:
+            tracefile.write(HEADER.pack(MAGIC, RECORD.size, len(records) // RECORD.size))
+            tracefile.write(records)
+        logging.info(f'InstructionTrace dump: {len(records) // RECORD.size} of {self.count} instructions to {file}')
+
+def read_trace(file):
+    """returns [(cycle, pc, code, R0, ... R7, psw)] from a dumped trace, oldest first"""
+    with open(file, 'rb') as tracefile:
+        data = tracefile.read()
+    magic, record_size, count = HEADER.unpack_from(data)
+    if magic != MAGIC or record_size != RECORD.size:
+        raise ValueError(f'read_trace: {file} is not an instruction trace')
+    return list(RECORD.iter_unpack(data[HEADER.size:HEADER.size + count * record_size]))
+
+def format_record(record, disassembler):
+    """One record as the line tracing used to log:
+    cycle, pc, instruction, assembly; registers NZVC.
+    disassembler is a Disassembler for a 64K image, which is overwritten at the record's pc."""
+    cycle, pc, code, *registers, psw = record
+    image = disassembler.memory
+    image[pc:pc + len(code)] = code[:len(image) - pc]
+    assembly = disassembler.disassemble(pc)[1]
+    instruction = code[0] + (code[1] << 8)
+    report = ''.join(f' {u.oct6(register & 0o177777)}' for register in registers)
+    nzvc = f'{(psw >> 3) & 1}{(psw >> 2) & 1}{(psw >> 1) & 1}{psw & 1}'
+    return f'{cycle} {u.oct6(pc)} {u.oct6(instruction)} {u.pad(assembly, 20)};{report} NZVC:{nzvc}'
+
+def decode_trace(file):
+    """the records in a dumped trace as text lines, oldest first"""
+    disassembler = Disassembler(bytearray(0o200000))
+    return [format_record(record, disassembler) for record in read_trace(file)]
+
+if __name__ == '__main__':
+    for line in decode_trace(sys.argv[1]):
+        print(line)
@@ -0,0 +1,264 @@
+"""pdp11_tracecheck.py - check that the emulator still runs a workload exactly as it used to
+
+python3 pdp11_tracecheck.py record hello_world golden.trace     record a golden trace with the interpreter
+python3 pdp11_tracecheck.py verify hello_world golden.trace     run it again and stop at the first difference
+python3 pdp11_tracecheck.py verify --blocks echo golden.trace   the same with compiled blocks
+
+Record a golden trace before changing AddressModes, the PSW or the instruction classes,
+then verify against it afterwards. The workloads are the ones in benchmark.py that run guest code.
+"""
+import sys
+import gzip
+import struct
+import logging
+import argparse
+from functools import partial
+
+import pdp11_util as u
+from pdp11 import PDP11
+from pdp11_hardware import Ram
+from pdp11_disassembler import Disassembler
+import benchmark
+
+MAGIC = b'PDP11GLD'
+# For each instruction: PC, instruction word, R0-R7 and PSW after it ran, and how many memory writes it made.
+# Registers are signed 32-bit so that a value an instruction failed to mask shows up as it is.
+STEP = struct.Struct('<HH8iHB')
+# For each memory write: address, value, and 1 for a byte or 2 for a word
+WRITE = struct.Struct('<IHB')
+
+WORKLOADS = ['hello_world', 'echo', 'm9301_ya']
+LIMIT = 1000000
+
+class Step:
+    """what one instruction did"""
+    def __init__(self, pc, instruction, registers, psw, writes):
+        self.pc = pc
+        self.instruction = instruction
+        self.registers = registers
+        self.psw = psw
+        # [(address, value, size)]
+        self.writes = writes
+
+    def to_string(self, disassembler=None):
+        """the instruction, registers and NZVC in the trace format, then the writes"""
+        assembly = ''
+        if disassembler is not None:
+            assembly = disassembler.disassemble(self.pc)[1]
+        registers = ''.join(f' {u.oct6(register)}' for register in self.registers)
+        nzvc = f'{(self.psw >> 3) & 1}{(self.psw >> 2) & 1}{(self.psw >> 1) & 1}{self.psw & 1}'
+        writes = ' '.join(f'{u.oct6(address)}{"b" if size == 1 else ""}={u.oct6(value)}'
+                          for address, value, size in self.writes)
+        return f'{u.oct6(self.pc)} {u.oct6(self.instruction)} {u.pad(assembly, 20)};{registers} NZVC:{nzvc} {writes}'
+
+class TraceChecker:
+    """Runs a PDP11 one run_block at a time, polling its devices after each,
+    and notes its registers, PSW and memory writes after each instruction or compiled block.
+    The golden trace is recorded with the interpreter, one instruction at a time.
+    Verifying with compiled blocks compares the state at the end of each block
+    with the golden trace that many instructions on, and the block's writes with theirs."""
+    def __init__(self, pdp11):
+        logging.info('initializing TraceChecker')
+        self.pdp11 = pdp11
+        self.writes = []
+        self.disassembler = Disassembler(pdp11.ram)
+
+    def write_byte(self, address, data):
+        """Ram.write_byte that also notes writes to ordinary memory.
+        I/o page writes go through write_byte_physical, which notes them."""
+        if address < self.pdp11.ram.io_base:
+            self.writes.append((address, data & 0o377, 1))
+        self.ram_write_byte(address, data)
+
+    def write_word(self, address, data):
+        """Ram.write_word that also notes writes to ordinary memory"""
+        if address < self.pdp11.ram.io_base:
+            self.writes.append((address, data, 2))
+        self.ram_write_word(address, data)
+
+    def write_byte_physical(self, address, data):
+        """Ram.write_byte_physical that also notes the write"""
+        self.writes.append((address, data & 0o377, 1))
+        self.ram_write_byte_physical(address, data)
+
+    def write_word_physical(self, address, data):
+        """Ram.write_word_physical that also notes the write"""
+        self.writes.append((address, data, 2))
+        self.ram_write_word_physical(address, data)
+
+    def unmapped_methods(self):
+        """The dictionary the CPU write methods are in while memory isn't mapped:
+        the Ram instance's, or while memory management is on, the one it puts back when it turns off."""
+        mmu = self.pdp11.mmu
+        if mmu is not None and mmu.enabled:
+            return mmu.unmapped
+        return self.pdp11.ram.__dict__
+
+    def hook_writes(self):
+        """Have the PDP11's Ram tell us about every write.
+        Unmapped writes to ordinary memory don't reach the physical methods, so the CPU ones are hooked too.
+        While memory management is on, its methods take the place of the CPU ones
+        and write through the physical ones; it puts the hooks back when it turns off.
+        Either way every write is noted once, at its physical address."""
+        ram = self.pdp11.ram
+        unmapped = self.unmapped_methods()
+        # whatever was there before, or None for Ram's own method
+        self.hooked = {'write_byte': unmapped.get('write_byte'),
+                       'write_word': unmapped.get('write_word'),
+                       'write_byte_physical': ram.__dict__.get('write_byte_physical'),
+                       'write_word_physical': ram.__dict__.get('write_word_physical')}
+        self.ram_write_byte = unmapped.get('write_byte', partial(Ram.write_byte, ram))
+        self.ram_write_word = unmapped.get('write_word', partial(Ram.write_word, ram))
+        self.ram_write_byte_physical = ram.write_byte_physical
+        self.ram_write_word_physical = ram.write_word_physical
+        unmapped['write_byte'] = self.write_byte
+        unmapped['write_word'] = self.write_word
+        ram.write_byte_physical = self.write_byte_physical
+        ram.write_word_physical = self.write_word_physical
+
+    def unhook_writes(self):
+        """put Ram back the way it was"""
+        ram = self.pdp11.ram
+        unmapped = self.unmapped_methods()
+        for name, method in self.hooked.items():
+            methods = unmapped if name in ('write_byte', 'write_word') else ram.__dict__
+            if method is None:
+                methods.pop(name, None)
+            else:
+                methods[name] = method
+
+    def step(self):
+        """Run one instruction or compiled block and poll the devices.
+        Returns (Step, number of instructions run, False if the machine halted)."""
+        pdp11 = self.pdp11
+        self.writes = []
+        pc = pdp11.reg.get_pc()
+        instruction = pdp11.ram.peek_word(pc)
+        cycles = pdp11.CPU_cycles
+        run = pdp11.run_block()
+        step = Step(pc, instruction, list(pdp11.reg.get_register_file()), pdp11.psw.psw, self.writes)
+        # what the devices write isn't part of the step
+        self.writes = []
+        pdp11.poll_devices()
+        return step, pdp11.CPU_cycles - cycles, run
+
+    def record(self, file, limit=LIMIT):
+        """Run the interpreter until the machine halts or limit instructions have run,
+        writing a golden trace to file. Returns the number of instructions recorded."""
+        use_blocks = self.pdp11.use_blocks
+        self.pdp11.use_blocks = False
+        self.hook_writes()
+        count = 0
+        try:
+            with gzip.open(file, 'wb') as golden:
+                golden.write(MAGIC)
+                run = True
+                while run and count < limit:
+                    step, ran, run = self.step()
+                    golden.write(STEP.pack(step.pc, step.instruction, *step.registers, step.psw, len(step.writes)))
+                    for write in step.writes:
+                        golden.write(WRITE.pack(*write))
+                    count = count + 1
+        finally:
+            self.unhook_writes()
+            self.pdp11.use_blocks = use_blocks
+        logging.info(f'TraceChecker record: {count} instructions to {file}')
+        return count
+
+    def verify(self, file):
+        """Run the PDP11 the way it's set up, compiled blocks or not, against the golden trace in file.
+        Returns None if it did everything the golden trace did,
+        or a description of the first difference."""
+        self.hook_writes()
+        count = 0
+        try:
+            with gzip.open(file, 'rb') as golden:
+                if golden.read(len(MAGIC)) != MAGIC:
+                    raise ValueError(f'verify: {file} is not a golden trace')
+                while True:
+                    expected = read_step(golden)
+                    if expected is None:
+                        logging.info(f'TraceChecker verify: {count} instructions match {file}')
+                        return None
+                    if self.pdp11.reg.get_pc() != expected.pc:
+                        return self.difference(count, expected, None, 1)
+                    step, ran, run = self.step()
+                    # a compiled block does the work of several golden steps
+                    writes = list(expected.writes)
+                    for i in range(ran - 1):
+                        expected = read_step(golden)
+                        if expected is None:
+                            # nothing to compare the end of the block with
+                            logging.info(f'TraceChecker verify: {count} instructions match {file}')
+                            return None
+                        writes.extend(expected.writes)
+                    expected.writes = writes
+                    if step.registers != expected.registers or step.psw != expected.psw or \
+                            step.writes != expected.writes:
+                        return self.difference(count, expected, step, ran)
+                    count = count + ran
+                    if not run:
+                        if read_step(golden) is not None:
+                            return f'after {count} instructions: halted, but the golden trace goes on'
+                        logging.info(f'TraceChecker verify: {count} instructions match {file}')
+                        return None
+        finally:
+            self.unhook_writes()
+
+    def difference(self, count, expected, step, ran):
+        """describe where the run and the golden trace part"""
+        lines = [f'after {count} instructions:']
+        if step is None:
+            lines.append(f'golden  PC {u.oct6(expected.pc)}')
+            lines.append(f'actual  PC {u.oct6(self.pdp11.reg.get_pc())}')
+            return '\n'.join(lines)
+        if ran > 1:
+            lines.append(f'in a compiled block of {ran} instructions')
+        lines.append(f'golden  {expected.to_string(self.disassembler)}')
+        lines.append(f'actual  {step.to_string(self.disassembler)}')
+        for register in range(8):
+            if step.registers[register] != expected.registers[register]:
+                lines.append(f'R{register}: golden {u.oct6(expected.registers[register])} '
+                             f'actual {u.oct6(step.registers[register])}')
+        if step.psw != expected.psw:
+            lines.append(f'PSW: golden {u.oct6(expected.psw)} actual {u.oct6(step.psw)}')
+        if step.writes != expected.writes:
+            lines.append('writes differ')
+        return '\n'.join(lines)
+
+def read_step(golden):
+    """the next Step in a golden trace file, or None at the end"""
+    data = golden.read(STEP.size)
+    if len(data) < STEP.size:
+        return None
+    pc, instruction, *registers, psw, count = STEP.unpack(data)
+    writes = [WRITE.unpack(golden.read(WRITE.size)) for i in range(count)]
+    return Step(pc, instruction, registers, psw, writes)
+
+def main(arguments):
+    """record or verify a golden trace; returns the exit status"""
+    parser = argparse.ArgumentParser(description='record or verify a golden PDP11 instruction trace')
+    parser.add_argument('mode', choices=['record', 'verify'])
+    parser.add_argument('workload', choices=WORKLOADS)
+    parser.add_argument('file', help='golden trace file')
+    parser.add_argument('--limit', type=int, default=LIMIT, help='instructions to record')
+    parser.add_argument('--blocks', action='store_true', help='verify with compiled blocks')
+    options = parser.parse_args(arguments)
+
+    pdp11 = PDP11()
+    benchmark.WORKLOADS[options.workload](pdp11)
+    checker = TraceChecker(pdp11)
+    if options.mode == 'record':
+        count = checker.record(options.file, options.limit)
+        print(f'recorded {count} instructions')
+        return 0
+    pdp11.use_blocks = options.blocks
+    difference = checker.verify(options.file)
+    if difference is None:
+        print('no differences')
+        return 0
+    print(difference)
+    return 1
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
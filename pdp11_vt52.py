@@ -1,5 +1,4 @@
 """PDP11 VT52 Emulator"""
-import time
 import logging
 import PySimpleGUI as sg
 
@@ -53,20 +52,6 @@ class VT52:
 
         # autoscroll=True,
 
-    def wait_for_rcsr_done_get_lock(self):
-        """get lock, read RCSR. If it's done, keep the lock"""
-        logging.info('wait_for_rcsr_done_get_lock')
-        self.dl11.ram.get_lock('VT52 RCSR')
-        rcsr = self.dl11.read_RCSR()
-        while (rcsr & self.dl11.RCSR_RCVR_DONE) != 0:
-            logging.info('wait_for_rcsr_done_get_lock loop')
-            self.dl11.ram.release_lock()
-            time.sleep(0.1)
-            self.dl11.ram.get_lock('VT52 RCSR')
-            rcsr = self.dl11.read_RCSR()
-        logging.info('got RCSR_DONE and lock')
-        # RCSR_RCVR_DONE == 0 and we have the python event lock
-
     def window_cycle(self):
         '''One PySimpleGUI window_cycle'''
         # parameters from PDP11
@@ -82,26 +67,18 @@ class VT52:
 
         self.sw.start('VT52 window_cycle')
 
-        # if there's a character in the dl11 transmit buffer,
-        # then send it to the display
-        self.dl11.ram.get_lock('VT52 XCSR')
-        if (self.dl11.read_XCSR() & self.dl11.XCSR_XMIT_RDY) == 0:
-            newchar = self.dl11.read_XBUF()
-            logging.info(
-                f'{self.cycles_since_window} dl11 XBUF sent us ' +
-                f'{oct(newchar)} {newchar} {self.safe_character(newchar)}')
-
-            if (self.pdp11.dl11.read_XCSR() & self.pdp11.dl11.XCSR_XMIT_RDY) == 0:
-                logging.error('XCSR was not set')
-
+        # Send whatever the dl11 has transmitted to the display.
+        # The dl11 keeps it in a FIFO, so this takes no lock and never holds up the CPU.
+        XBUF = self.dl11.transmitted_character()
+        while XBUF is not None:
             # Sure, DL11 can send us nulls; I just won't show them.
-            if newchar != 0:
+            if XBUF != 0:
                 # deal specially with <o15><o12> <13><11> CR LF
                 # multiline rstrip=True therefore whitespace is stripped
                 # call update or cprint with key
-                if newchar != 13:
-                    sg.cprint(chr(newchar), end='', sep='', autoscroll=True)
-        self.dl11.ram.release_lock()
+                if XBUF != 13:
+                    sg.cprint(chr(XBUF), end='', sep='', autoscroll=True)
+            XBUF = self.dl11.transmitted_character()
 
         event, values = self.window.read(timeout=0)
 
@@ -110,9 +87,7 @@ class VT52:
         if event == 'keyboard_Enter':
             self.window['keyboard'].Update('')
             logging.debug(f'{self.cycles_since_window} sending DL11 0o12 "CR"')
-            self.wait_for_rcsr_done_get_lock()
-            self.dl11.write_RBUF(0o15)
-            self.dl11.ram.release_lock()
+            self.dl11.type_character(0o15)
 
         # If there's a keyboard event
         # then send the character to the serial interface
@@ -121,9 +96,7 @@ class VT52:
             self.window['keyboard'].Update('')
             o = ord(kbd[0:1])
             logging.debug(f'{self.cycles_since_window} sending DL11 {o} {self.safe_character(o)}')
-            self.wait_for_rcsr_done_get_lock()
-            self.dl11.write_RBUF(o)
-            self.dl11.ram.release_lock()
+            self.dl11.type_character(o)
 
         self.cycles_since_window = self.cycles_since_window + 1
         self.sw.stop('VT52 window_cycle')
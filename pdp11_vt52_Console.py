@@ -1,5 +1,4 @@
 """PDP11 VT52 Emulator"""
-import time
 import logging
 import PySimpleGUI as sg
 
@@ -16,8 +15,6 @@ class VT52_Console:
         self.pdp11 = pdp11
         self.dl11 = pdp11.dl11
         logging.info(f'vt52 dl11:{self.dl11}')
-        self.lock = pdp11.lock
-        logging.info(f'vt52 lock:{self.lock}')
         self.window_cycles = 0
         self.buffer = 0  # for holding LF after CR was sent
         self.window = 0
@@ -78,20 +75,6 @@ class VT52_Console:
 
         # autoscroll=True,
 
-    def wait_for_rcsr_done_get_lock(self):
-        """get lock, read RCSR. If it's done, keep the lock"""
-        logging.info('wait_for_rcsr_done_get_lock')
-        self.dl11.ram.get_lock('VT52 RCSR')
-        rcsr = self.dl11.read_RCSR()
-        while (rcsr & self.dl11.RCSR_RCVR_DONE) != 0:
-            logging.info('wait_for_rcsr_done_get_lock loop')
-            self.dl11.ram.release_lock()
-            time.sleep(0.1)
-            self.dl11.ram.get_lock('VT52 RCSR')
-            rcsr = self.dl11.read_RCSR()
-        logging.info('got RCSR_DONE and lock')
-        # RCSR_RCVR_DONE == 0 and we have the python event lock
-
     def window_cycle(self):
         '''One PySimpleGUI window_cycle'''
         # parameters from PDP11
@@ -113,20 +96,10 @@ class VT52_Console:
         #pc_lights = self.window['pc_lights']
         #pc_lights.update(self.pc_to_blinky_lights())
 
-        # If there's a character in the dl11 transmit buffer,
-        # then send it to the display
-        self.lock.acquire()
-        #logging.debug(f'vt52 got lock {self.window_cycles}')
-        if (self.dl11.read_XCSR() & self.dl11.XCSR_XMIT_RDY) == 0:
-            XBUF = self.dl11.read_XBUF() # read_XBUF is supposed to set XCSR to XCSR_XMIT_RDY
-            logging.info(
-                f'cycle {self.window_cycles} {self.pdp11.CPU_cycles} dl11 XBUF sent us ' +
-                f'{oct(XBUF)} {XBUF} {self.safe_character(XBUF)}')
-
-            XCSR = self.dl11.read_XCSR()
-            if (XCSR & self.dl11.XCSR_XMIT_RDY) != self.dl11.XCSR_XMIT_RDY:
-                logging.error(f'XCSR {oct(XCSR)} was not set with {oct(self.dl11.XCSR_XMIT_RDY)}')
-
+        # Send whatever the dl11 has transmitted to the display.
+        # The dl11 keeps it in a FIFO, so this takes no lock and never holds up the CPU.
+        XBUF = self.dl11.transmitted_character()
+        while XBUF is not None:
             # Sure, DL11 can send us nulls; I just won't show them.
             if XBUF != 0:
                 # deal specially with <o15><o12> <13><11> CR LF
@@ -134,8 +107,7 @@ class VT52_Console:
                 # call update or cprint with key
                 if XBUF != 13:
                     sg.cprint(chr(XBUF), end='', sep='', autoscroll=True)
-        self.lock.release()
-        #logging.debug(f'vt52 release lock {self.window_cycles}')
+            XBUF = self.dl11.transmitted_character()
 
         event, values = self.window.read(timeout=0)
         # If the Enter key was hit
@@ -143,12 +115,7 @@ class VT52_Console:
         if event == 'keyboard_Enter':
             self.window['keyboard'].Update('')
             logging.info(f'{self.window_cycles} sending DL11 0o12 "CR"')
-            logging.info(f'vt52 wait_for_rcsr_done_get_lock')
-            self.wait_for_rcsr_done_get_lock()
-            logging.info(f'vt52 got lock; dl11.write_RBUF')
-            self.dl11.write_RBUF(0o15)
-            logging.info(f'vt52 release lock {self.window_cycles}')
-            self.lock.release()
+            self.dl11.type_character(0o15)
 
         # If there's a keyboard event
         # then send the character to the serial interface
@@ -157,12 +124,7 @@ class VT52_Console:
             self.window['keyboard'].Update('')
             o = ord(kbd[0:1])
             logging.info(f'{self.window_cycles} sending DL11 {o} {self.safe_character(o)}')
-            logging.info(f'vt52 wait_for_rcsr_done_get_lock')
-            self.wait_for_rcsr_done_get_lock()
-            logging.info(f'vt52 got lock; dl11.write_RBUF')
-            self.dl11.write_RBUF(o)
-            logging.info(f'vt52 release lock')
-            self.lock.release()
+            self.dl11.type_character(o)
 
         if event in (sg.WIN_CLOSED, 'Quit'):  # if user closes window or clicks cancel
             #logging.debug('Quit')
@@ -1,12 +1,40 @@
 """python package for timing stuff"""
 import sys
+import json
 import time
 import logging
+import threading
+from array import array
+
+# Durations are also counted in a log-bucketed histogram, like HdrHistogram:
+# each power of two is split into SUB_BUCKETS buckets, so a bucket is within 1/16 of its value.
+# Below 2 * SUB_BUCKETS nanoseconds every value has its own bucket.
+SUB_BUCKET_BITS = 4
+SUB_BUCKETS = 1 << SUB_BUCKET_BITS
+BUCKETS = 64 * SUB_BUCKETS
+PERCENTILES = [50, 90, 99, 99.9]
+
+def bucket_index(value):
+    """the histogram bucket for a duration in nanoseconds"""
+    if value < 2 * SUB_BUCKETS:
+        return max(value, 0)
+    shift = value.bit_length() - SUB_BUCKET_BITS - 1
+    return min(shift * SUB_BUCKETS + (value >> shift), BUCKETS - 1)
+
+def bucket_range(index):
+    """the lowest and highest durations that go in a bucket"""
+    if index < 2 * SUB_BUCKETS:
+        return index, index
+    shift = index // SUB_BUCKETS - 1
+    low = (index - shift * SUB_BUCKETS) << shift
+    return low, low + (1 << shift) - 1
 
 class StopWatch():
     """One StopWatch object that tracks one method's duration."""
-    def __init__(self, instance_id):
+    def __init__(self, instance_id, parent=None):
         self.instance_id = instance_id
+        # the StopWatch that was running when this one first started
+        self.parent = parent
         self.count = 0
         self.min = 1000000000000  # "uninitialized"
         self.max = -1  # "uninitialized"
@@ -14,6 +42,12 @@ class StopWatch():
         self.mean = -1  # "uninitialized"
         self.start_time = time.clock_gettime_ns(time.CLOCK_MONOTONIC)
         self.duration = 0
+        # When sampling, calls counts every start, timed or not, and timing is whether this one is.
+        self.calls = 0
+        self.timing = False
+        # the StopWatch that was running when this one last started, to go back to when it stops
+        self.outer = None
+        self.buckets = array('Q', bytes(8 * BUCKETS))
 
     def get_id(self):
         """retrun this StopWatch's instance ID"""
@@ -32,12 +66,16 @@ class StopWatch():
         return self.max
 
     def get_sum(self):
-        """return the sum of all times recorded so far"""
+        """return the sum of all times recorded so far.
+        When sampling, this is extrapolated from the mean to every call."""
+        if self.calls > self.count:
+            return self.mean * self.calls
         return self.sum
 
     def get_count(self):
-        """return the number of times this interval has been timed so far"""
-        return self.count
+        """return the number of times this interval has been timed so far.
+        When sampling, this includes the calls that weren't timed."""
+        return max(self.count, self.calls)
 
     def get_duration(self):
         """return the duration of the last start-stop pair"""
@@ -56,11 +94,44 @@ class StopWatch():
         self.count = self.count + 1
         self.mean = self.sum / self.count
 
-    def to_string(self):
-        """pretty-print instance_id"""
+    def stop_watch_histogram(self, time_stop):
+        """stop_watch, and count the duration in the histogram too"""
+        self.stop_watch(time_stop)
+        self.buckets[bucket_index(self.duration)] += 1
+
+    def get_percentile(self, percentile):
+        """Return the duration that percentile percent of the timed intervals were no longer than,
+        to within the width of a histogram bucket.
+        Returns -1 if nothing has been counted in the histogram."""
+        counted = sum(self.buckets)
+        if counted == 0:
+            return -1
+        wanted = counted * percentile / 100
+        seen = 0
+        for index, count in enumerate(self.buckets):
+            seen = seen + count
+            if count and seen >= wanted:
+                return min(bucket_range(index)[1], self.max)
+        return self.max
+
+    def to_dictionary(self):
+        """everything this StopWatch knows, in nanoseconds, for exporting"""
+        return {'id': self.instance_id,
+                'parent': self.parent,
+                'count': self.get_count(),
+                'min': self.min if self.count else -1,
+                'mean': self.mean,
+                'max': self.max,
+                'sum': self.get_sum(),
+                'percentiles': {str(percentile): self.get_percentile(percentile) for percentile in PERCENTILES},
+                'buckets': [[*bucket_range(index), count] for index, count in enumerate(self.buckets) if count]}
+
+    def to_string(self, depth=0):
+        """pretty-print instance_id, indented by depth"""
+        name = '  ' * depth + self.instance_id
         pad = ""
         i = 0
-        while i < 20-len(self.instance_id):
+        while i < 20-len(name):
             pad = pad + " "
             i = i + 1
         reportmin = self.min
@@ -70,33 +141,117 @@ class StopWatch():
         format_min = '{:12.0f}'.format(reportmin/1000)
         format_mean = '{:12.0f}'.format(self.mean/1000)
         format_max = '{:12.0f}'.format(self.max/1000)
-        format_sum = '{:12.0f}'.format(self.sum/1000)
-        format_count = '{:12.0f}'.format(self.count)
+        format_sum = '{:12.0f}'.format(self.get_sum()/1000)
+        format_count = '{:12.0f}'.format(self.get_count())
+        format_percentiles = ''.join('{:12.0f}'.format(self.get_percentile(percentile)/1000)
+                                     for percentile in PERCENTILES)
 
-        return f'{self.instance_id}{pad}{format_min}{format_mean}' \
-               f'{format_max}{format_sum}{format_count}'
+        return f'{name}{pad}{format_min}{format_mean}' \
+               f'{format_max}{format_sum}{format_count}{format_percentiles}'
+
+class RunningWatches(threading.local):
+    """the id of the innermost StopWatch started and not yet stopped in a thread"""
+    def __init__(self):
+        self.current = None
 
 class StopWatches():
     """Manages a dictionary of StopWatch objects.
-    Lets you obtain timing information for methods in your project."""
-    def __init__(self):
+    Lets you obtain timing information for methods in your project.
+    Timing can be turned off, so that start and stop do nothing,
+    or sampled, so that only one start in every sample is timed.
+    When sampling, or with histograms on, durations also go in each StopWatch's histogram.
+    A StopWatch first started while another is running in the same thread is reported as its child."""
+    def __init__(self, enabled=True, sample=1, histograms=False):
         self.stop_watch_dict = {}
+        self.running = RunningWatches()
+        self.set_mode(enabled, sample, histograms)
+
+    def set_mode(self, enabled=True, sample=1, histograms=False):
+        """If enabled is False, start and stop do nothing at all.
+        If sample is more than 1, only the first of every sample starts of each StopWatch is timed,
+        and the report extrapolates the sum to every call.
+        If histograms is True, every start and stop is timed with percentiles, which costs more.
+        Otherwise start and stop only keep min, mean, max, sum and count.
+        record always records."""
+        self.enabled = enabled
+        self.sample = sample
+        self.histograms = histograms
+        # start and stop are swapped for other methods on this instance,
+        # so the call sites don't have to check the mode.
+        if not enabled:
+            self.start = self.ignore
+            self.stop = self.ignore
+        elif sample > 1:
+            self.start = self.start_sampled
+            self.stop = self.stop_sampled
+        elif histograms:
+            # the plain start; stop_histogram counts the duration in the histogram
+            self.__dict__.pop('start', None)
+            self.stop = self.stop_histogram
+        else:
+            self.__dict__.pop('start', None)
+            self.__dict__.pop('stop', None)
+
+    def ignore(self, instance_id):
+        """start and stop when timing is turned off"""
 
     def reset(self):
         """Reset StopWatch list, clear all StopWatches."""
         self.stop_watch_dict = {}
 
+    def get_or_make(self, instance_id):
+        """the StopWatch for instance_id, made a child of the innermost running one if it's new"""
+        try:
+            return self.stop_watch_dict[instance_id]
+        except KeyError:
+            this_stop_watch = StopWatch(instance_id, self.running.current)
+            self.stop_watch_dict[instance_id] = this_stop_watch
+            return this_stop_watch
+
     def start(self, instance_id):
         """Initialize one stop watch for a method.
         Call this before the part whose duration you want to measure.
-        After the section, call stop()."""
+        After the section, call stop().
+        Until then this is the running StopWatch,
+        so a StopWatch first started inside it is reported as its child."""
         try:
             this_stop_watch = self.stop_watch_dict[instance_id]
         except KeyError:
-            this_stop_watch = StopWatch(instance_id)
-            self.stop_watch_dict[instance_id] = this_stop_watch
+            this_stop_watch = self.get_or_make(instance_id)
+        running = self.running
+        this_stop_watch.outer = running.current
+        running.current = instance_id
         this_stop_watch.restart_watch()
 
+    def start_sampled(self, instance_id):
+        """start when sampling: count the call, and time it if it's the first of sample calls.
+        Every call is the running StopWatch until it stops, timed or not."""
+        try:
+            this_stop_watch = self.stop_watch_dict[instance_id]
+        except KeyError:
+            this_stop_watch = self.get_or_make(instance_id)
+        running = self.running
+        this_stop_watch.outer = running.current
+        running.current = instance_id
+        calls = this_stop_watch.calls
+        this_stop_watch.calls = calls + 1
+        if calls % self.sample == 0:
+            this_stop_watch.timing = True
+            this_stop_watch.restart_watch()
+
+    def stop_sampled(self, instance_id):
+        """stop when sampling: record the time only if this call was timed"""
+        stop_time = time.clock_gettime_ns(time.CLOCK_MONOTONIC)
+        try:
+            this_stop_watch = self.stop_watch_dict[instance_id]
+        except KeyError:
+            logging.info(f'WARN: StopWatches stop could not find id {instance_id}')
+            return
+        self.running.current = this_stop_watch.outer
+        if this_stop_watch.timing:
+            this_stop_watch.stop_watch_histogram(stop_time)
+            this_stop_watch.timing = False
+
     def remove(self, instance_id):
         """remove this StopWatch from the list"""
         del self.stop_watch_dict[instance_id]
@@ -117,9 +272,29 @@ class StopWatches():
         try:
             this_stop_watch = self.stop_watch_dict[instance_id]
             this_stop_watch.stop_watch(stop_time)
+            self.running.current = this_stop_watch.outer
         except KeyError:
             logging.info(f'WARN: StopWatches stop could not find id {instance_id}')
 
+    def stop_histogram(self, instance_id):
+        """stop with histograms on: count the duration in the histogram too"""
+        stop_time = time.clock_gettime_ns(time.CLOCK_MONOTONIC)
+        try:
+            this_stop_watch = self.stop_watch_dict[instance_id]
+            this_stop_watch.stop_watch_histogram(stop_time)
+            self.running.current = this_stop_watch.outer
+        except KeyError:
+            logging.info(f'WARN: StopWatches stop could not find id {instance_id}')
+
+    def record(self, instance_id, start_time):
+        """Record an interval that started at start_time, a CLOCK_MONOTONIC time in nanoseconds,
+        and ends now. Use this when something else noted the start, like another thread.
+        This records whether or not timing is turned off or sampled."""
+        stop_time = time.clock_gettime_ns(time.CLOCK_MONOTONIC)
+        this_stop_watch = self.get_or_make(instance_id)
+        this_stop_watch.start_time = start_time
+        this_stop_watch.stop_watch_histogram(stop_time)
+
     def get_mean(self, instance_id):
         """Returns the mean value of the accumulated StopWatch.<br>
         If id cannot be found, returns -1.
@@ -141,15 +316,37 @@ class StopWatches():
         except KeyError:
             return f'WARN: StopWatches to_string could not find id {instance_id}'
 
+    def tree(self):
+        """returns [(depth, StopWatch)] with each StopWatch's children right after it"""
+        children = {}
+        for this_stop_watch in self.stop_watch_dict.values():
+            parent = this_stop_watch.parent
+            if parent not in self.stop_watch_dict:
+                parent = None
+            children.setdefault(parent, []).append(this_stop_watch)
+        result = []
+        def add(parent, depth):
+            for child in children.get(parent, []):
+                result.append((depth, child))
+                add(child.instance_id, depth + 1)
+        add(None, 0)
+        return result
+
     def report(self):
-        """log text for every StopWatch in the dictionary"""
+        """log text for every StopWatch in the dictionary, children indented under their parents"""
         logging.info("StopWatches Report (times in microseconds)")
-        logging.info('id                      min        mean         max         sum       count')
-        for instance_id in self.stop_watch_dict:
-            this_stop_watch = self.stop_watch_dict[instance_id]
-            logging.info(this_stop_watch.to_string())
+        logging.info('id                      min        mean         max         sum       count'
+                     '         p50         p90         p99       p99.9')
+        for depth, this_stop_watch in self.tree():
+            logging.info(this_stop_watch.to_string(depth))
         logging.info("StopWatches Report end")
 
+    def to_json(self, file):
+        """write every StopWatch, with its percentiles and histogram buckets in nanoseconds, to a json file"""
+        with open(file, 'w') as jsonfile:
+            json.dump([this_stop_watch.to_dictionary() for depth, this_stop_watch in self.tree()],
+                      jsonfile, indent=2)
+
     def get_watch(self, instance_id):
         '''get the specified watch options'''
         return self.stop_watch_dict[instance_id]
@@ -1,8 +1,10 @@
 # test_DL11.py
 # test the pdp11_dl11.py module using pytest
 
+import time
 import random
 import logging
+import threading
 from pdp11 import PDP11
 from pdp11 import pdp11Run
 from pdp11_dl11 import DL11
@@ -54,19 +56,90 @@ class TestClass():
         # simulate transmitting a byte
         pdp11.ram.write_word(pdp11.dl11.XBUF_address, self.make_test_character())
 
-        # verify that transmit buffer is not ready for another byte
-        XCSR = pdp11.ram.read_word(pdp11.dl11.XCSR_address)
-        assert XCSR & pdp11.dl11.XCSR_XMIT_RDY == 0
-
-        # read the bugger and verify it's what we sset
-        XBUF = pdp11.ram.read_word(pdp11.dl11.XBUF_address)
-        assert XBUF == self.test_character
-
-        # verify  that  the transmit buffer is ready for another byte
+        # verify that the transmit FIFO has room for another byte
         XCSR = pdp11.ram.read_word(pdp11.dl11.XCSR_address)
         assert XCSR & pdp11.dl11.XCSR_XMIT_RDY == pdp11.dl11.XCSR_XMIT_RDY
+
+        # the terminal gets what we sent, once
+        assert pdp11.dl11.transmitted_character() == self.test_character
+        assert pdp11.dl11.transmitted_character() is None
         logging.info('test_transmit done')
 
+    def test_transmit_fifo_full(self):
+        """the transmitter isn't ready while the terminal is a whole FIFO behind"""
+        pdp11 = PDP11()
+        logging.info('test_transmit_fifo_full')
+        dl11 = pdp11.dl11
+        for i in range(dl11.transmit_fifo.size):
+            assert pdp11.ram.read_word(dl11.XCSR_address) & dl11.XCSR_XMIT_RDY == dl11.XCSR_XMIT_RDY
+            pdp11.ram.write_word(dl11.XBUF_address, i & 0o377)
+        assert pdp11.ram.read_word(dl11.XCSR_address) & dl11.XCSR_XMIT_RDY == 0
+
+        # taking one out makes room and wakes a waiting CPU
+        pdp11.ram.io_event.clear()
+        assert dl11.transmitted_character() == 0
+        assert pdp11.ram.io_event.is_set()
+        assert pdp11.ram.read_word(dl11.XCSR_address) & dl11.XCSR_XMIT_RDY == dl11.XCSR_XMIT_RDY
+        assert [dl11.transmitted_character() for i in range(3)] == [1, 2, 3]
+
+    def test_ready_depth(self):
+        """with a ready_depth of 1 the transmitter isn't ready until the terminal takes each character, like a real DL11"""
+        pdp11 = PDP11()
+        logging.info('test_ready_depth')
+        dl11 = DL11(pdp11.ram, 0o177560, 1)
+        assert pdp11.ram.read_word(dl11.XCSR_address) & dl11.XCSR_XMIT_RDY == dl11.XCSR_XMIT_RDY
+        pdp11.ram.write_word(dl11.XBUF_address, 0o101)
+        assert pdp11.ram.read_word(dl11.XCSR_address) & dl11.XCSR_XMIT_RDY == 0
+        assert dl11.transmitted_character() == 0o101
+        assert pdp11.ram.read_word(dl11.XCSR_address) & dl11.XCSR_XMIT_RDY == dl11.XCSR_XMIT_RDY
+
+    def test_type_ahead(self):
+        """characters typed before the guest reads them wait in the receive FIFO, in order"""
+        pdp11 = PDP11()
+        logging.info('test_type_ahead')
+        dl11 = pdp11.dl11
+        for character in 'ABC':
+            assert dl11.type_character(ord(character))
+        assert dl11.input_pending()
+        received = ''
+        while pdp11.ram.read_word(dl11.RCSR_address) & dl11.RCSR_RCVR_DONE:
+            received = received + chr(pdp11.ram.read_word(dl11.RBUF_address))
+        assert received == 'ABC'
+        assert not dl11.input_pending()
+
+        # a full FIFO refuses more
+        for i in range(dl11.receive_fifo.size):
+            assert dl11.type_character(0o101)
+        assert not dl11.type_character(0o102)
+
+    def test_threads(self):
+        """a terminal thread and the CPU thread pass characters both ways through the FIFOs"""
+        pdp11 = PDP11()
+        logging.info('test_threads')
+        dl11 = pdp11.dl11
+        message = [i & 0o377 for i in range(3 * dl11.receive_fifo.size)]
+
+        def terminal():
+            for byte in message:
+                while not dl11.type_character(byte):
+                    time.sleep(0)
+
+        thread = threading.Thread(target=terminal)
+        thread.start()
+        received = []
+        transmitted = []
+        while len(received) < len(message):
+            if pdp11.ram.read_word(dl11.RCSR_address) & dl11.RCSR_RCVR_DONE:
+                received.append(pdp11.ram.read_word(dl11.RBUF_address))
+                pdp11.ram.write_word(dl11.XBUF_address, received[-1])
+            byte = dl11.transmitted_character()
+            if byte is not None:
+                transmitted.append(byte)
+        thread.join()
+        transmitted.extend(iter(dl11.transmitted_character, None))
+        assert received == message
+        assert transmitted == message
+
     def test_maintenance(self):
         """set maintenance bit and verify that bytes go in and bytes go out"""
         pdp11 = PDP11()
@@ -100,22 +173,17 @@ class TestClass():
             # transmit a byte
             pdp11.ram.write_word(pdp11.dl11.XBUF_address, self.make_test_character())
 
-            # verify that we've transmitted it
-            XCSR = pdp11.ram.read_word(pdp11.dl11.XCSR_address)
-            assert XCSR & pdp11.dl11.XCSR_XMIT_RDY == 0
-
             # verify that a byte is ready to read
             RCSR = pdp11.ram.read_word(pdp11.dl11.RCSR_address)
             logging.info(f'RCSR:{oct(RCSR)}')  # maintenance mode should be set; ready should be set
             assert RCSR & pdp11.dl11.RCSR_RCVR_DONE == pdp11.dl11.RCSR_RCVR_DONE
 
             # receive the byte
-            XBUF = pdp11.ram.read_word(pdp11.dl11.XBUF_address)
-            assert XBUF == self.test_character
+            RBUF = pdp11.ram.read_word(pdp11.dl11.RBUF_address)
+            assert RBUF == self.test_character
 
-            # verify that the transmitted is ready again
-            XCSR = pdp11.ram.read_word(pdp11.dl11.XCSR_address)
-            assert XCSR & pdp11.dl11.XCSR_XMIT_RDY == pdp11.dl11.XCSR_XMIT_RDY
+            # it went to the receiver, not the terminal
+            assert pdp11.dl11.transmitted_character() is None
 
             i = i + 1
 
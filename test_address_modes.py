@@ -9,6 +9,7 @@ from pdp11_hardware import AddressModes as am
 
 from pdp11_ss_ops import ss_ops
 from pdp11_ssdd_ops import ssdd_ops
+from pdp11_disassembler import Disassembler
 
 from stopwatches import StopWatches as sw
 
@@ -25,9 +26,10 @@ class TestClass():
     stack = Stack(reg, ram, psw)
     am = am(reg, ram, psw)
     sw = sw()
+    disassembler = Disassembler(ram)
 
-    ss_ops = ss_ops(reg, ram, psw, am, sw)
-    ssdd_ops = ssdd_ops(reg, ram, psw, am, sw)
+    ss_ops = ss_ops(reg, ram, psw, am, sw, disassembler)
+    ssdd_ops = ssdd_ops(reg, ram, psw, am, sw, disassembler)
 
     R0 = 0
     R1 = 1
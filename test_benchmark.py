@@ -0,0 +1,66 @@
+"""test_benchmark"""
+import logging
+
+from pdp11 import PDP11
+from pdp11_boot import pdp11Boot
+import benchmark
+
+class TestClass():
+    pdp11 = PDP11()
+    boot = pdp11Boot(pdp11.reg, pdp11.ram)
+
+    def test_load_absolute_tape(self):
+        logging.info('test_load_absolute_tape')
+        tape = self.boot.read_tape('source/pdp11basic.json')
+        assert self.boot.load_absolute_tape(tape) == 0o16104
+        # BASIC starts with MOV 1234(PC),SP
+        assert self.pdp11.ram.read_word(0o16104) == 0o016706
+
+    def test_load_absolute_tape_checksum(self):
+        logging.info('test_load_absolute_tape_checksum')
+        # one data block of two bytes at 1000 and an end block starting at 1000
+        tape = bytearray([0, 0, 1, 0, 8, 0, 0o000, 0o002, 0o252, 0o125, 0,
+                          1, 0, 6, 0, 0o000, 0o002, 0])
+        tape[10] = -sum(tape[2:10]) & 0o377
+        tape[17] = -sum(tape[11:17]) & 0o377
+        assert self.boot.load_absolute_tape(bytes(tape)) == 0o1000
+        assert self.pdp11.ram.read_word(0o1000) == 0o052652
+        tape[8] = 0
+        try:
+            self.boot.load_absolute_tape(bytes(tape))
+            assert False
+        except ValueError:
+            pass
+
+    def test_run_workload(self):
+        logging.info('test_run_workload')
+        result = benchmark.run_workload('echo')
+        assert result['right']
+        assert result['unit'] == 'instructions'
+        assert result['work'] > 0
+        assert result['rate'] > 0
+        assert result['peak_rss_kb'] > 0
+
+    def test_compare(self):
+        logging.info('test_compare')
+        baseline = {'echo': {'rate': 1000, 'right': True},
+                    'hello_world': {'rate': 1000, 'right': True}}
+        results = {'echo': {'rate': 950, 'right': True},
+                   'hello_world': {'rate': 800, 'right': True},
+                   'm9301_ya': {'rate': 500, 'right': True}}
+        changes, regressions = benchmark.compare(results, baseline, 10)
+        assert changes == [('echo', -5.0), ('hello_world', -20.0)]
+        assert regressions == ['hello_world']
+        # basic_load times a Python helper, not guest code, so only its output counts
+        baseline['basic_load'] = {'rate': 1000, 'right': True}
+        results['basic_load'] = {'rate': 100, 'right': True}
+        changes, regressions = benchmark.compare(results, baseline, 10)
+        assert 'basic_load' not in [name for name, change in changes]
+        assert regressions == ['hello_world']
+        results['basic_load']['right'] = False
+        changes, regressions = benchmark.compare(results, baseline, 10)
+        assert regressions == ['hello_world', 'basic_load']
+        del results['basic_load']
+        results['echo']['right'] = False
+        changes, regressions = benchmark.compare(results, baseline, 30)
+        assert regressions == ['echo']
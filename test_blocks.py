@@ -0,0 +1,294 @@
+"""test_blocks"""
+import logging
+import threading
+
+from pdp11_hardware import Registers as reg
+from pdp11_hardware import Ram
+from pdp11_hardware import PSW
+from pdp11_hardware import Stack
+from pdp11_hardware import AddressModes as am
+
+from pdp11_br_ops import br_ops
+from pdp11_cc_ops import cc_ops
+from pdp11_noopr_ops import noopr_ops
+from pdp11_other_ops import other_ops
+from pdp11_rss_ops import rss_ops
+from pdp11_ss_ops import ss_ops
+from pdp11_ssdd_ops import ssdd_ops
+from pdp11_decode import DecodeTable
+from pdp11_blocks import BlockCompiler
+from pdp11_mmu import MMU
+
+from stopwatches import StopWatches as sw
+
+class TestClass():
+    reg = reg()
+    ram = Ram(threading.Lock(), reg, 16)
+    psw = PSW(ram)
+    stack = Stack(reg, ram, psw)
+    am = am(reg, ram, psw)
+    sw = sw()
+
+    br_ops = br_ops(reg, ram, psw, sw)
+    cc_ops = cc_ops(psw, sw)
+    noopr_ops = noopr_ops(reg, ram, psw, stack, sw)
+    other_ops = other_ops(reg, ram, psw, am, sw)
+    rss_ops = rss_ops(reg, ram, psw, am, sw)
+    ss_ops = ss_ops(reg, ram, psw, am, sw)
+    ssdd_ops = ssdd_ops(reg, ram, psw, am, sw)
+
+    decode = DecodeTable(cc_ops, br_ops, noopr_ops, ss_ops, rss_ops, ssdd_ops, other_ops)
+    blocks = BlockCompiler(reg, ram, psw, decode, ss_ops, ssdd_ops, rss_ops, other_ops, threshold=1)
+
+    def load(self, code, address):
+        for word in code:
+            self.ram.write_word(address, word)
+            address = address + 2
+
+    def interpret(self, count):
+        """run count instructions the way PDP11.instruction_cycle does without caches"""
+        for i in range(count):
+            instruction = self.ram.read_word_from_pc()
+            handler, decoded = self.decode.table[instruction]
+            handler(decoded)
+
+    def run_block(self):
+        """run one block the way PDP11.run_block does"""
+        next_pc, count = self.blocks.execute(self.reg.get_pc())
+        self.reg.set_pc(next_pc, 'test')
+        return count
+
+    def machine_state(self):
+        return [self.reg.get(r) for r in range(8)], self.psw.get_psw()
+
+    def set_state(self, registers, psw):
+        for r in range(8):
+            self.reg.set(r, registers[r])
+        self.psw.set_psw(psw=psw)
+
+    def test_straight_line(self):
+        logging.info('test_straight_line')
+        # MOV #10,R0; MOV R0,(R1)+; INC R0; MOVB R0,(R1)+; ADD 2(R2),R0; TST R0; BR .+2
+        code = [0o012700, 0o000010, 0o010021, 0o005200, 0o110021,
+                0o066200, 0o000002, 0o005700, 0o000400]
+        self.load(code, 0o1000)
+        self.ram.write_word(0o3002, 0o177770)
+        start = [0, 0o2000, 0o3000, 0, 0, 0, 0o7000, 0o1000]
+
+        self.set_state(start, 0)
+        self.interpret(7)
+        interpreted = self.machine_state()
+        memory = [self.ram.read_word(0o2000), self.ram.read_word(0o2002)]
+
+        self.ram.write_word(0o2000, 0)
+        self.ram.write_word(0o2002, 0)
+        self.set_state(start, 0)
+        count = self.run_block()
+        assert count == 7
+        assert self.machine_state() == interpreted
+        assert [self.ram.read_word(0o2000), self.ram.read_word(0o2002)] == memory
+        assert self.reg.get_pc() == 0o1022
+
+    def test_branch_loop(self):
+        logging.info('test_branch_loop')
+        # 1100: DEC R0; BNE 1100; CLR R1
+        self.load([0o005300, 0o001376, 0o005001], 0o1100)
+        self.reg.set(0, 3)
+        self.reg.set(1, 0o777)
+        self.reg.set_pc(0o1100)
+        assert self.run_block() == 2
+        assert self.reg.get_pc() == 0o1100
+        assert self.reg.get(0) == 2
+        self.run_block()
+        self.run_block()
+        assert self.reg.get(0) == 0
+        assert self.reg.get_pc() == 0o1104
+        assert self.psw.get_z() == 1
+
+    def test_jsr_rts(self):
+        logging.info('test_jsr_rts')
+        # 1200: JSR PC,1300  1300: MOV #5,R3; RTS PC
+        self.load([0o004767, 0o000074], 0o1200)
+        self.load([0o012703, 0o000005, 0o000207], 0o1300)
+        self.reg.set_sp(0o7000)
+        self.reg.set_pc(0o1200)
+        self.run_block()
+        assert self.reg.get_pc() == 0o1300
+        assert self.reg.get_sp() == 0o6776
+        assert self.ram.read_word(0o6776) == 0o1204
+        assert self.run_block() == 2
+        assert self.reg.get(3) == 0o5
+        assert self.reg.get_pc() == 0o1204
+        assert self.reg.get_sp() == 0o7000
+
+    def test_write_invalidates(self):
+        logging.info('test_write_invalidates')
+        # MOV #5,R0; HALT
+        self.load([0o012700, 0o000005, 0o000000], 0o1400)
+        self.reg.set_pc(0o1400)
+        self.run_block()
+        assert self.reg.get(0) == 0o5
+        block = self.blocks.blocks[0o1400]
+
+        self.ram.write_word(0o1402, 0o7)
+        assert block.valid[0] is False
+        assert 0o1400 not in self.blocks.blocks
+        self.reg.set_pc(0o1400)
+        self.run_block()
+        assert self.reg.get(0) == 0o7
+
+    def test_heat(self):
+        logging.info('test_heat')
+        blocks = BlockCompiler(self.reg, self.ram, self.psw, self.decode,
+                               self.ss_ops, self.ssdd_ops, self.rss_ops, self.other_ops, threshold=3)
+        # MOV #5,R0; HALT
+        self.load([0o012700, 0o000005, 0o000000], 0o4000)
+        assert blocks.execute(0o4000) is None
+        assert blocks.execute(0o4000) is None
+        assert blocks.heat[0o4000 >> 1] == 2
+        assert blocks.execute(0o4000) == (0o4004, 1)
+        assert blocks.heat[0o4000 >> 1] == 0
+        # new code there has to get hot again
+        self.ram.write_word(0o4002, 0o7)
+        assert blocks.execute(0o4000) is None
+        assert blocks.heat[0o4000 >> 1] == 1
+        # one counter for each word, however much code comes and goes
+        assert len(blocks.heat) == 0o100000
+        blocks.clear()
+
+    def test_self_modifying_block_stops(self):
+        logging.info('test_self_modifying_block_stops')
+        # 1500: MOV #5271,@#1506; CLR R2 (becomes INC R2); HALT
+        self.load([0o012737, 0o005202, 0o001506, 0o005002, 0o000000], 0o1500)
+        self.reg.set(2, 0o10)
+        self.reg.set_pc(0o1500)
+        count = self.run_block()
+        assert count == 1
+        assert self.reg.get_pc() == 0o1506
+        assert self.run_block() == 1
+        assert self.reg.get(2) == 0o11
+
+    def interpret_to_fault(self):
+        """interpret until an instruction raises; returns the state and the instructions finished"""
+        finished = 0
+        try:
+            while True:
+                self.interpret(1)
+                finished = finished + 1
+        except (AssertionError, ZeroDivisionError):
+            return self.machine_state(), finished
+
+    def run_blocks_to_fault(self):
+        """run blocks until an instruction raises; returns the state and the instructions finished"""
+        finished = 0
+        try:
+            while True:
+                finished = finished + self.run_block()
+        except (AssertionError, ZeroDivisionError):
+            return self.machine_state(), finished + self.blocks.finished
+
+    def test_fault_mid_block(self):
+        logging.info('test_fault_mid_block')
+        cases = [
+            # MOV #10,R0; INC R0; ADD 2(R1),R0 with R1 odd
+            ([0o012700, 0o000010, 0o005200, 0o066100, 0o000002], 1, 0o2001),
+            # INC R0; MOV R0,(R1)+ with R1 odd
+            ([0o005200, 0o010021], 1, 0o2001),
+            # CLR R0; JSR PC,@2(R1) with R1 odd
+            ([0o005000, 0o004771, 0o000002], 1, 0o2001),
+            # MOV #1,R2; RTS R5 with SP odd
+            ([0o012702, 0o000001, 0o000205], 6, 0o7001),
+            # INC R2; DIV R3,R0; BR .-4 with R3 zero
+            ([0o005202, 0o071003, 0o000775], 3, 0)]
+        for code, register, value in cases:
+            self.load(code + [0o000000], 0o1700)
+            start = [0, 0o2000, 0, 0, 0, 0o3000, 0o7000, 0o1700]
+            start[register] = value
+
+            self.set_state(start, 0)
+            interpreted = self.interpret_to_fault()
+
+            self.set_state(start, 0)
+            self.blocks.clear()
+            assert self.run_blocks_to_fault() == interpreted
+
+    def test_register_overflow(self):
+        logging.info('test_register_overflow')
+        cases = [
+            # INC R2; ASH #1,R0 with R0 0o100000
+            ([0o005202, 0o072027, 0o000001], 0, 0o100000),
+            # INC R2; TST (R1)+ with R1 0o177776
+            ([0o005202, 0o005721], 1, 0o177776)]
+        for code, register, value in cases:
+            self.load(code + [0o000000], 0o1700)
+            start = [0, 0o2000, 0, 0, 0, 0o3000, 0o7000, 0o1700]
+            start[register] = value
+
+            self.set_state(start, 0)
+            interpreted = self.interpret_to_fault()
+
+            self.set_state(start, 0)
+            self.blocks.clear()
+            assert self.run_blocks_to_fault() == interpreted
+            assert self.reg.get(register) == value
+
+    def test_unsupported_instruction(self):
+        logging.info('test_unsupported_instruction')
+        # HALT can't be compiled
+        self.load([0o000000], 0o1600)
+        assert self.blocks.execute(0o1600) is None
+        assert self.blocks.blocks[0o1600] is None
+
+    def test_mmu_enabled_mid_block(self):
+        logging.info('test_mmu_enabled_mid_block')
+        # 1000: MOV R1,@#177572; MOV #123,@#2000; BR 1000
+        code = [0o010137, 0o177572, 0o012737, 0o000123, 0o002000, 0o000772]
+        results = []
+        for use_blocks in [True, False]:
+            registers = reg()
+            ram = Ram(threading.Lock(), registers, 18)
+            psw = PSW(ram)
+            stack = Stack(registers, ram, psw)
+            modes = am(registers, ram, psw)
+            watches = sw()
+            ss = ss_ops(registers, ram, psw, modes, watches)
+            ssdd = ssdd_ops(registers, ram, psw, modes, watches)
+            rss = rss_ops(registers, ram, psw, modes, watches)
+            other = other_ops(registers, ram, psw, modes, watches)
+            decode = DecodeTable(cc_ops(psw, watches), br_ops(registers, ram, psw, watches),
+                                 noopr_ops(registers, ram, psw, stack, watches), ss, rss, ssdd, other)
+            blocks = BlockCompiler(registers, ram, psw, decode, ss, ssdd, rss, other, threshold=1)
+            mmu = MMU(ram, psw, registers, blocks.set_mapped)
+            # kernel page 0 is at physical 20000; pages 1-6 map straight through, page 7 is the io page
+            for page in range(8):
+                ram.write_word(0o172340 + 2 * page, [0o200, 0o200, 0o400, 0o600, 0o1000, 0o1200, 0o1400, 0o7600][page])
+                ram.write_word(0o172300 + 2 * page, 0o077406)
+            for address in [0o1000, 0o21000]:
+                for i, word in enumerate(code):
+                    ram.write_word_physical(address + 2 * i, word)
+
+            def step():
+                if use_blocks and not mmu.enabled:
+                    result = blocks.execute(registers.get_pc())
+                    if result is not None:
+                        registers.set_pc(result[0], 'test')
+                        return
+                instruction = ram.read_word_from_pc()
+                handler, decoded = decode.table[instruction]
+                handler(decoded)
+
+            # round the loop once unmapped so the block is compiled, then turn memory management on
+            registers.set_pc(0o1000, 'test')
+            registers.set(1, 0)
+            for i in range(6):
+                step()
+            ram.write_word_physical(0o2000, 0)
+            registers.set(1, 1)
+            for i in range(3):
+                step()
+            assert mmu.enabled
+            results.append((registers.get_pc(), ram.read_word_physical(0o2000), ram.read_word_physical(0o22000)))
+            mmu.enable(False)
+        # the store after SR0 goes through the new mapping, to physical 22000
+        assert results[0] == results[1]
+        assert results[0][1:] == (0, 0o123)
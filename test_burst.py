@@ -0,0 +1,147 @@
+"""test_burst"""
+import logging
+import threading
+
+from pdp11 import PDP11
+from pdp11_boot import pdp11Boot
+from pdp11_dl11 import Fifo
+
+hello_world = [0o012702,  # 2000 start:  MOV #177564,R2  ; r2 points to DL11 XCSR
+               0o177564,  # 2002
+               0o012701,  # 2004         MOV #2032,R1    ; r1 points to current char
+               0o002032,  # 2006
+               0o112100,  # 2010 nxtchr: MOVB (R1)+,R0   ; load xmt char
+               0o001405,  # 2012         BEQ done        ; string is terminated with 0
+               0o110062,  # 2014         MOVB R0,2(R2)   ; write char to transmit buffer
+               0o000002,  # 2016
+               0o105712,  # 2020 wait:   TSTB (R2)       ; character transmitted?
+               0o100376,  # 2022         BPL wait        ; no, loop
+               0o000771,  # 2024         BR nxtchr       ; transmit next character
+               0o000000,  # 2026 done:   HALT
+               0o000763]  # 2030         BR start
+                          # 2032         "Hello, World!"
+
+class TestClass():
+    pdp11 = PDP11()
+    boot = pdp11Boot(pdp11.reg, pdp11.ram)
+
+    def load_hello_world(self):
+        self.boot.load_machine_code(hello_world, 0o2000)
+        address = 0o2032
+        for character in "Hello, World!\n" + chr(0):
+            self.pdp11.ram.write_byte(address, ord(character))
+            address = address + 1
+        self.pdp11.reg.set_pc(0o2000, "test_burst")
+        # a one-character transmit FIFO, so the guest waits for the terminal after every character
+        self.pdp11.dl11.transmit_fifo = Fifo(1)
+
+    def test_run_burst(self):
+        logging.info('test_run_burst')
+        self.load_hello_world()
+        self.pdp11.detect_idle = False
+        start = self.pdp11.CPU_cycles
+        # without a device poll the transmitter is never ready again,
+        # so the program spins in its wait loop for the whole burst
+        assert self.pdp11.run_burst(500)
+        assert self.pdp11.CPU_cycles - start >= 500
+        assert self.pdp11.reg.get_pc() in [0o2020, 0o2022]
+        self.pdp11.detect_idle = True
+
+    def test_run_burst_idle(self):
+        logging.info('test_run_burst_idle')
+        self.load_hello_world()
+        # once the wait loop is compiled, the burst ends as soon as it goes round
+        assert self.pdp11.run_burst(100000)
+        assert self.pdp11.idle_pc == 0o2020
+        assert self.pdp11.reg.get_pc() == 0o2020
+        assert self.pdp11.CPU_cycles < 100000
+
+    def test_run_until_idle(self):
+        logging.info('test_run_until_idle')
+        self.load_hello_world()
+        # Nothing ever reads the transmitter, so the guest waits forever.
+        # Going round the wait loop counts toward the limit without being interpreted.
+        waits = self.pdp11.idle_waits
+        start = self.pdp11.CPU_cycles
+        assert self.pdp11.run_until(lambda pdp11: False, 20000)
+        assert self.pdp11.idle_waits > waits
+        assert self.pdp11.CPU_cycles - start < 20000
+
+    def test_run_until_halt(self, capsys):
+        logging.info('test_run_until_halt')
+        self.load_hello_world()
+        self.pdp11.device_polls.append(self.pdp11.terminal.cycle)
+        assert not self.pdp11.run_until(lambda pdp11: False, 1000000)
+        self.pdp11.device_polls.remove(self.pdp11.terminal.cycle)
+        assert self.pdp11.reg.get_pc() == 0o2030
+        assert capsys.readouterr().out == "Hello, World!\n"
+
+    def test_run_until_predicate(self):
+        logging.info('test_run_until_predicate')
+        self.load_hello_world()
+        polls = []
+        self.pdp11.device_polls.append(lambda: polls.append(self.pdp11.CPU_cycles))
+        assert self.pdp11.run_until(lambda pdp11: len(polls) == 3, 1000000)
+        self.pdp11.device_polls.clear()
+        assert len(polls) == 3
+
+    def test_run_until_limit(self):
+        logging.info('test_run_until_limit')
+        self.load_hello_world()
+        start = self.pdp11.CPU_cycles + self.pdp11.idle_cycles
+        assert self.pdp11.run_until(lambda pdp11: False, 2500)
+        assert self.pdp11.CPU_cycles + self.pdp11.idle_cycles - start >= 2500
+
+    def test_adapt_burst_size(self):
+        logging.info('test_adapt_burst_size')
+        burst_size = self.pdp11.burst_size
+        # a burst that took far too long shrinks the next one
+        self.pdp11.adapt_burst_size(self.pdp11.burst_size, 1.0)
+        assert self.pdp11.burst_size < burst_size
+        self.pdp11.burst_size = burst_size
+
+    def test_wait(self):
+        logging.info('test_wait')
+        self.boot.load_machine_code([0o000001,              # 3000 WAIT
+                                     0o012700, 0o000001,    # 3002 MOV #1,R0
+                                     0o000000], 0o3000)     # 3006 HALT
+        self.pdp11.reg.set(0, 0)
+        self.pdp11.reg.set_pc(0o3000, "test_wait")
+
+        # nothing signals, so the CPU stays parked after the WAIT
+        assert self.pdp11.run_until(lambda pdp11: False, 5000)
+        assert self.pdp11.noopr_ops.waiting
+        assert self.pdp11.reg.get_pc() == 0o3002
+        assert self.pdp11.reg.get(0) == 0
+
+        # a character arriving from another thread wakes it up
+        timer = threading.Timer(0.05, self.pdp11.dl11.type_character, [0o101])
+        timer.start()
+        assert not self.pdp11.run_until(lambda pdp11: False)
+        timer.join()
+        assert not self.pdp11.noopr_ops.waiting
+        assert self.pdp11.reg.get(0) == 1
+        assert self.pdp11.sw.get_watch("WAIT wakeup").get_count() == 1
+
+    def test_wait_in_run_burst(self):
+        logging.info('test_wait_in_run_burst')
+        self.boot.load_machine_code([0o000001,              # 3000 WAIT
+                                     0o012700, 0o000001,    # 3002 MOV #1,R0
+                                     0o000000], 0o3000)     # 3006 HALT
+        self.pdp11.reg.set(0, 0)
+        self.pdp11.reg.set_pc(0o3000, "test_wait_in_run_burst")
+
+        # without run_until, bursts still don't run past the WAIT until a device signals
+        assert self.pdp11.run_burst(100)
+        assert self.pdp11.noopr_ops.waiting
+        assert self.pdp11.run_burst(100)
+        assert self.pdp11.reg.get_pc() == 0o3002
+        assert self.pdp11.reg.get(0) == 0
+
+        timer = threading.Timer(0.05, self.pdp11.dl11.type_character, [0o101])
+        timer.start()
+        while self.pdp11.run_burst(100):
+            pass
+        timer.join()
+        assert not self.pdp11.noopr_ops.waiting
+        assert self.pdp11.reg.get(0) == 1
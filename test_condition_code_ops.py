@@ -8,6 +8,7 @@ from pdp11_hardware import Registers as reg
 from pdp11_hardware import Ram
 from pdp11_hardware import PSW
 from pdp11_cc_ops import cc_ops
+from pdp11_disassembler import Disassembler
 
 from stopwatches import StopWatches as sw
 
@@ -16,7 +17,8 @@ class TestClass():
     ram = Ram(threading.Lock(), reg, 16)
     psw = PSW(ram)
     sw = sw()
-    cc_ops = cc_ops(psw, sw)
+    disassembler = Disassembler(ram)
+    cc_ops = cc_ops(psw, sw, disassembler)
 
     set_opcode = 0o000260
     clear_opcode = 0o000240
@@ -0,0 +1,146 @@
+"""test_decode"""
+import logging
+import threading
+
+from pdp11_hardware import Registers as reg
+from pdp11_hardware import Ram
+from pdp11_hardware import PSW
+from pdp11_hardware import Stack
+from pdp11_hardware import AddressModes as am
+
+from pdp11_br_ops import br_ops
+from pdp11_cc_ops import cc_ops
+from pdp11_noopr_ops import noopr_ops
+from pdp11_other_ops import other_ops
+from pdp11_rss_ops import rss_ops
+from pdp11_ss_ops import ss_ops
+from pdp11_ssdd_ops import ssdd_ops
+from pdp11_decode import DecodeTable
+from pdp11_decode import classify
+
+from stopwatches import StopWatches as sw
+
+class TestClass():
+    reg = reg()
+    ram = Ram(threading.Lock(), reg, 16)
+    psw = PSW(ram)
+    stack = Stack(reg, ram, psw)
+    am = am(reg, ram, psw)
+    sw = sw()
+
+    br_ops = br_ops(reg, ram, psw, sw)
+    cc_ops = cc_ops(psw, sw)
+    noopr_ops = noopr_ops(reg, ram, psw, stack, sw)
+    other_ops = other_ops(reg, ram, psw, am, sw)
+    rss_ops = rss_ops(reg, ram, psw, am, sw)
+    ss_ops = ss_ops(reg, ram, psw, am, sw)
+    ssdd_ops = ssdd_ops(reg, ram, psw, am, sw)
+
+    decode = DecodeTable(cc_ops, br_ops, noopr_ops, ss_ops, rss_ops, ssdd_ops, other_ops)
+
+    def old_dispatch(self, instruction):
+        """the handler the old if/elif chain would have picked"""
+        if self.cc_ops.is_cc_op(instruction):
+            return self.cc_ops.exec_cc_op
+        if self.br_ops.is_br_op(instruction):
+            return self.br_ops.exec_br_op
+        if self.noopr_ops.is_noopr_op(instruction):
+            return self.noopr_ops.exec_noopr_op
+        if self.ss_ops.is_ss_op(instruction):
+            return self.ss_ops.exec_ss_op
+        if self.rss_ops.is_rss_op(instruction):
+            return self.rss_ops.exec_rss_op
+        if self.ssdd_ops.is_ssdd_op(instruction):
+            return self.ssdd_ops.exec_ssdd_op
+        return self.other_ops.exec_other_op
+
+    def test_table_size(self):
+        logging.info('test_table_size')
+        assert len(self.decode.table) == 0o200000
+
+    def test_same_handlers(self):
+        logging.info('test_same_handlers')
+        for instruction in range(0o200000):
+            handler, decoded = self.decode.table[instruction]
+            assert handler == self.old_dispatch(instruction)
+            assert decoded.instruction == instruction
+
+    def test_classes(self):
+        logging.info('test_classes')
+        # every word is in the one class whose is_ method says so, whatever order they're tried in
+        predicates = {'cc': self.cc_ops.is_cc_op, 'br': self.br_ops.is_br_op,
+                      'noopr': self.noopr_ops.is_noopr_op, 'ss': self.ss_ops.is_ss_op,
+                      'rss': self.rss_ops.is_rss_op, 'ssdd': self.ssdd_ops.is_ssdd_op}
+        for instruction in range(0o200000):
+            kinds = [kind for kind, predicate in predicates.items() if predicate(instruction)]
+            assert len(kinds) <= 1
+            assert classify(instruction) == (kinds[0] if kinds else 'other')
+
+    def test_ssdd_fields(self):
+        logging.info('test_ssdd_fields')
+        # MOVB 2(R0),6(R0)
+        handler, decoded = self.decode.lookup(0o116060)
+        assert handler == self.ssdd_ops.exec_ssdd_op
+        assert decoded.bw == 'B'
+        assert decoded.opcode == 0o110000
+        assert (decoded.src_mode, decoded.src_reg) == (6, 0)
+        assert (decoded.dst_mode, decoded.dst_reg) == (6, 0)
+
+    def test_ss_fields(self):
+        logging.info('test_ss_fields')
+        # TSTB (R0)
+        handler, decoded = self.decode.lookup(0o105710)
+        assert handler == self.ss_ops.exec_ss_op
+        assert decoded.bw == 'B'
+        assert decoded.opcode == 0o105700
+        assert (decoded.dst_mode, decoded.dst_reg) == (1, 0)
+
+    def test_br_fields(self):
+        logging.info('test_br_fields')
+        # BPL .-2
+        handler, decoded = self.decode.lookup(0o100376)
+        assert handler == self.br_ops.exec_br_op
+        assert decoded.opcode == 0o100000
+        assert decoded.offset == 0o376
+
+    def test_other_fields(self):
+        logging.info('test_other_fields')
+        # JSR R5,@R3
+        handler, decoded = self.decode.lookup(0o004513)
+        assert handler == self.other_ops.exec_other_op
+        assert decoded.opcode == 0o004000
+        assert decoded.src_reg == 5
+        assert (decoded.dst_mode, decoded.dst_reg) == (1, 3)
+
+    def test_sob_fields(self):
+        logging.info('test_sob_fields')
+        # SOB R0,NN: NN is an offset, so there are no operand words
+        for instruction in [0o077027, 0o077067, 0o077277]:
+            handler, decoded = self.decode.lookup(instruction)
+            assert decoded.opcode == 0o077000
+            assert decoded.src_reg == (instruction & 0o000700) >> 6
+            assert (decoded.dst_mode, decoded.dst_reg) == (0, 0)
+            assert decoded.offset == instruction & 0o000077
+            assert decoded.words == 0
+
+    def test_mark_fields(self):
+        logging.info('test_mark_fields')
+        # MARK NN: NN is a count, so there are no operand words
+        for instruction in [0o006427, 0o006467, 0o006477]:
+            handler, decoded = self.decode.lookup(instruction)
+            assert decoded.opcode == 0o006400
+            assert (decoded.dst_mode, decoded.dst_reg) == (0, 0)
+            assert decoded.offset == instruction & 0o000077
+            assert decoded.words == 0
+
+    def test_dispatch(self):
+        logging.info('test_dispatch')
+        self.psw.set_psw(psw=0)
+        self.reg.set(1, 0o1234)
+        self.reg.set(2, 0)
+        # MOV R1,R2
+        instruction = 0o010102
+        handler, decoded = self.decode.table[instruction]
+        run = handler(decoded)
+        assert run
+        assert self.reg.get(2) == 0o1234
@@ -0,0 +1,121 @@
+"""test_disassembler"""
+import logging
+import threading
+
+from pdp11_hardware import Registers as reg
+from pdp11_hardware import Ram
+from pdp11_hardware import PSW
+from pdp11_hardware import Stack
+from pdp11_hardware import AddressModes as am
+
+from pdp11_br_ops import br_ops
+from pdp11_cc_ops import cc_ops
+from pdp11_noopr_ops import noopr_ops
+from pdp11_other_ops import other_ops
+from pdp11_rss_ops import rss_ops
+from pdp11_ss_ops import ss_ops
+from pdp11_ssdd_ops import ssdd_ops
+from pdp11_decode import DecodeTable
+from pdp11_disassembler import Disassembler
+from pdp11_decode import decode_word
+
+from stopwatches import StopWatches as sw
+
+class TestClass():
+    reg = reg()
+    ram = Ram(threading.Lock(), reg, 16)
+    psw = PSW(ram)
+    stack = Stack(reg, ram, psw)
+    am = am(reg, ram, psw)
+    sw = sw()
+
+    br_ops = br_ops(reg, ram, psw, sw)
+    cc_ops = cc_ops(psw, sw)
+    noopr_ops = noopr_ops(reg, ram, psw, stack, sw)
+    other_ops = other_ops(reg, ram, psw, am, sw)
+    rss_ops = rss_ops(reg, ram, psw, am, sw)
+    ss_ops = ss_ops(reg, ram, psw, am, sw)
+    ssdd_ops = ssdd_ops(reg, ram, psw, am, sw)
+
+    decode = DecodeTable(cc_ops, br_ops, noopr_ops, ss_ops, rss_ops, ssdd_ops, other_ops)
+    disassembler = Disassembler(ram)
+
+    def load(self, code, address):
+        for word in code:
+            self.ram.write_word(address, word)
+            address = address + 2
+
+    def test_classify(self):
+        logging.info('test_classify')
+        # the disassembler uses the decode table's fields for every word
+        for instruction in range(0o200000):
+            handler, decoded = self.decode.table[instruction]
+            assert decode_word(instruction) is decoded
+
+    def test_instructions(self):
+        logging.info('test_instructions')
+        code = [0o012700, 0o000005,     # 1000 MOV #5,R0
+                0o016162, 0o000004, 0o177776,   # 1004 MOV 4(R1),-2(R2)
+                0o105737, 0o177564,     # 1012 TSTB @#177564
+                0o001375,               # 1016 BNE 1012
+                0o004767, 0o000010,     # 1020 JSR PC,1034
+                0o000207,               # 1024 RTS PC
+                0o000261,               # 1026 SEC
+                0o077103,               # 1030 SOB R1,1024
+                0o000000]               # 1032 HALT
+        self.load(code, 0o1000)
+        lines = self.disassembler.disassemble_range(0o1000, 0o1034)
+        texts = [line[28:] for line in lines]
+        assert texts == ['MOV #5,R0', 'MOV 4(R1),-2(R2)', 'TSTB @#177564', 'BNE 001012',
+                         'JSR PC,001034', 'RTS PC', 'SEC', 'SOB R1,001024', 'HALT']
+        assert lines[0].startswith('001000 012700 000005')
+
+    def test_no_side_effects(self):
+        logging.info('test_no_side_effects')
+        # MOV (R0)+,@#177776 reads and changes nothing
+        self.load([0o012037, 0o177776], 0o1100)
+        self.reg.set(0, 0o2000)
+        self.reg.set_pc(0o1100)
+        reads = []
+        self.ram.register_io_reader(0o177570, lambda: reads.append(1) or 0)
+        self.load([0o005037, 0o177570], 0o1104)   # CLR @#177570
+        words, text = self.disassembler.disassemble(0o1100)
+        self.disassembler.disassemble_range(0o177560, 0o177600)
+        assert text == 'MOV (R0)+,@#177776'
+        assert self.reg.get(0) == 0o2000
+        assert self.reg.get_pc() == 0o1100
+        assert reads == []
+
+    def test_cache(self):
+        logging.info('test_cache')
+        self.load([0o012700, 0o000005], 0o1200)
+        self.disassembler.disassemble(0o1200)
+        hits = self.disassembler.hits
+        assert self.disassembler.disassemble(0o1200)[1] == 'MOV #5,R0'
+        assert self.disassembler.hits == hits + 1
+
+        self.ram.write_word(0o1202, 0o7)
+        assert 0o1200 not in self.disassembler.cache
+        assert self.disassembler.disassemble(0o1200)[1] == 'MOV #7,R0'
+
+    def test_clear(self):
+        logging.info('test_clear')
+        # clear forgets the cache and leaves no watcher behind in Ram
+        self.load([0o012700, 0o000005], 0o1300)
+        self.disassembler.disassemble(0o1300)
+        watchers = [watcher for watchers in self.ram.code_watchers.values() for watcher in watchers]
+        assert (self.disassembler.invalidate, 0o1302) in watchers
+        self.disassembler.clear()
+        assert self.disassembler.cache == {}
+        watchers = [watcher for watchers in self.ram.code_watchers.values() for watcher in watchers]
+        assert all(watcher[0] != self.disassembler.invalidate for watcher in watchers)
+        assert self.disassembler.disassemble(0o1300)[1] == 'MOV #5,R0'
+
+    def test_image(self):
+        logging.info('test_image')
+        image = bytearray(0o2000)
+        image[0o1000:0o1004] = bytes([0o300, 0o025, 0o005, 0o000])  # MOV #5,R0
+        disassembler = Disassembler(image)
+        assert disassembler.disassemble(0o1000) == ((0o012700, 0o5), 'MOV #5,R0')
+        image[0o1002] = 0o7
+        assert disassembler.disassemble(0o1000)[1] == 'MOV #7,R0'
@@ -0,0 +1,126 @@
+"""test_exec"""
+import logging
+import threading
+
+from pdp11_hardware import Registers as reg
+from pdp11_hardware import Ram
+from pdp11_hardware import PSW
+from pdp11_hardware import Stack
+from pdp11_hardware import AddressModes as am
+
+from pdp11_br_ops import br_ops
+from pdp11_cc_ops import cc_ops
+from pdp11_noopr_ops import noopr_ops
+from pdp11_other_ops import other_ops
+from pdp11_rss_ops import rss_ops
+from pdp11_ss_ops import ss_ops
+from pdp11_ssdd_ops import ssdd_ops
+from pdp11_decode import DecodeTable
+
+from stopwatches import StopWatches as sw
+
+class TestClass():
+    reg = reg()
+    ram = Ram(threading.Lock(), reg, 16)
+    psw = PSW(ram)
+    stack = Stack(reg, ram, psw)
+    am = am(reg, ram, psw)
+    sw = sw()
+
+    br_ops = br_ops(reg, ram, psw, sw)
+    cc_ops = cc_ops(psw, sw)
+    noopr_ops = noopr_ops(reg, ram, psw, stack, sw)
+    other_ops = other_ops(reg, ram, psw, am, sw)
+    rss_ops = rss_ops(reg, ram, psw, am, sw)
+    ss_ops = ss_ops(reg, ram, psw, am, sw)
+    ssdd_ops = ssdd_ops(reg, ram, psw, am, sw)
+
+    decode = DecodeTable(cc_ops, br_ops, noopr_ops, ss_ops, rss_ops, ssdd_ops, other_ops)
+
+    start_registers = [0o2000, 0o2010, 0o2020, 0o177770, 0o5, 0o2040, 0o7000, 0o1000]
+
+    def setup(self, code):
+        """load code at 1000, data at 2000, and set the registers"""
+        address = 0o1000
+        for word in code:
+            self.ram.write_word(address, word)
+            address = address + 2
+        for address in range(0o2000, 0o2100, 2):
+            self.ram.write_word(address, address + 0o100)
+        for address in range(0o6700, 0o7000, 2):
+            self.ram.write_word(address, 0o1234)
+        for r in range(8):
+            self.reg.set(r, self.start_registers[r])
+        self.psw.set_psw(psw=0o000005)
+
+    def state(self):
+        memory = [self.ram.read_word(address) for address in range(0o2000, 0o2100, 2)]
+        stack = [self.ram.read_word(address) for address in range(0o6700, 0o7000, 2)]
+        return [self.reg.get(r) for r in range(8)], self.psw.get_psw(), memory, stack
+
+    def compare(self, code, count=1):
+        """run code reading the operand words from memory,
+        and then with them prefetched the way the instruction cache hands them over"""
+        self.setup(code)
+        read_runs = []
+        for i in range(count):
+            instruction = self.ram.read_word_from_pc()
+            handler, decoded = self.decode.table[instruction]
+            read_runs.append(handler(decoded))
+        expected = self.state()
+
+        self.setup(code)
+        prefetched_runs = []
+        for i in range(count):
+            pc = self.reg.get_pc()
+            handler, decoded = self.decode.table[self.ram.read_word(pc)]
+            self.reg.inc_pc('test')
+            self.am.prefetched = tuple(self.ram.read_word(pc + 2 + 2 * j) for j in range(decoded.words))
+            prefetched_runs.append(handler(decoded))
+            self.am.prefetched = ()
+        assert prefetched_runs == read_runs
+        assert self.state() == expected
+
+    def test_ssdd(self):
+        logging.info('test_ssdd')
+        self.compare([0o010001])            # MOV R0,R1
+        self.compare([0o012021])            # MOV (R0)+,(R1)+
+        self.compare([0o112021])            # MOVB (R0)+,(R1)+
+        self.compare([0o014041])            # MOV -(R0),-(R1)
+        self.compare([0o013031])            # MOV @(R0)+,@(R1)+
+        self.compare([0o016061, 0o4, 0o6])  # MOV 4(R0),6(R1)
+        self.compare([0o017071, 0o4, 0o6])  # MOV @4(R0),@6(R1)
+        self.compare([0o012700, 0o123])     # MOV #123,R0
+        self.compare([0o013700, 0o2004])    # MOV @#2004,R0
+        self.compare([0o066300, 0o2])       # ADD 2(R3),R0
+        self.compare([0o166300, 0o2])       # SUB 2(R3),R0
+        self.compare([0o020102])            # CMP R1,R2
+        self.compare([0o030102, 0o040102, 0o050102, 0o150102], 4)   # BIT, BIC, BIS, BISB
+
+    def test_ss(self):
+        logging.info('test_ss')
+        self.compare([0o005010, 0o005111, 0o005212, 0o005310], 4)  # CLR (R0); COM (R1); INC (R2); DEC (R0)
+        self.compare([0o105720, 0o005721, 0o000322], 3)  # TSTB (R0)+; TST (R1)+; SWAB (R2)+
+        self.compare([0o006003, 0o006103, 0o006203, 0o006303], 4)  # ROR ROL ASR ASL R3
+        self.compare([0o000110])            # JMP (R0)
+        self.compare([0o000167, 0o100])     # JMP 100(PC)
+
+    def test_rss(self):
+        logging.info('test_rss')
+        self.compare([0o070204])            # MUL R4,R2
+        self.compare([0o074110])            # XOR R1,(R0)
+
+    def test_branch_and_cc(self):
+        logging.info('test_branch_and_cc')
+        self.compare([0o000261, 0o103401], 2)   # SEC; BCS .+4
+        self.compare([0o000241, 0o103401], 2)   # CLC; BCS .+4
+        self.compare([0o000257, 0o003001], 2)   # SCC; BGT .+4
+
+    def test_other(self):
+        logging.info('test_other')
+        self.compare([0o004767, 0o100])     # JSR PC,100(PC)
+        self.compare([0o004510])            # JSR R5,(R0)
+        self.compare([0o000205])            # RTS R5
+        self.compare([0o000207])            # RTS PC
+        self.compare([0o000000])            # HALT
+        self.compare([0o007000])            # not an instruction
@@ -0,0 +1,42 @@
+"""test_farm"""
+import os
+import logging
+
+from pdp11 import PDP11
+from pdp11_boot import pdp11Boot
+from pdp11_farm import RunFarm, Job, summary
+
+count_down = [0o012700, 0o000005,  # 3000 start: MOV #5,R0
+              0o005300,            # 3004 loop:  DEC R0
+              0o001376,            # 3006        BNE loop
+              0o000000]            # 3010        HALT
+
+class TestClass():
+    pdp11 = PDP11()
+    boot = pdp11Boot(pdp11.reg, pdp11.ram)
+
+    def test_run_farm(self):
+        logging.info('test_run_farm')
+        self.boot.load_machine_code(self.boot.echo, self.boot.echo_address)
+        cycles = self.pdp11.CPU_cycles
+        jobs = [Job(f'echo {i}', f'LINE {i}\r', until='\r') for i in range(3)]
+        jobs.append(Job('count down', program=count_down, address=0o3000))
+        results = RunFarm(self.pdp11, 2).run(jobs)
+
+        assert [result['job'] for result in results] == ['echo 0', 'echo 1', 'echo 2', 'count down']
+        for i in range(3):
+            assert results[i]['output'] == f'LINE {i}\r'
+            assert results[i]['finished']
+            assert not results[i]['halted']
+        assert results[3]['halted']
+        assert results[3]['finished']
+        assert results[3]['instructions'] == 12
+        assert all(result['pid'] != os.getpid() for result in results)
+        # the jobs ran in their own copies of the machine
+        assert self.pdp11.CPU_cycles == cycles
+        assert self.pdp11.ram.read_word(0o3000) != count_down[0]
+
+        totals = summary(results, 1.0)
+        assert totals['jobs'] == 4
+        assert totals['finished'] == 4
+        assert totals['instructions'] == sum(result['instructions'] for result in results)
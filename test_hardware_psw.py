@@ -142,6 +142,35 @@ class TestClass():
         assert self.psw.get_z() == 0
 
 
+    def test_psw_lazy_word(self):
+        self.psw.set_psw(psw=0o000003)
+        self.psw.set_result('W', 0o100000)
+        assert self.psw.pending is not None
+        # default clears V and leaves C
+        assert self.psw.get_nzvc() == '1001'
+        assert self.psw.pending is None
+
+    def test_psw_lazy_byte(self):
+        self.psw.set_psw(psw=0o000010)
+        self.psw.set_result('B', 0o177400, 0o000003)
+        assert self.psw.get_psw() == 0o000004
+
+    def test_psw_lazy_overwritten(self):
+        # the first result's C is kept even though its N and Z are never worked out
+        self.psw.set_psw(psw=0)
+        self.psw.set_result('W', 0, 0o000003, 0o000001)
+        self.psw.set_result('W', 0o1, 0)
+        assert self.psw.get_nzvc() == '0001'
+
+    def test_psw_lazy_set_psw(self):
+        # setting bits directly sees the pending result first
+        self.psw.set_psw(psw=0)
+        self.psw.set_result('W', 0)
+        self.psw.set_psw(c=1)
+        assert self.psw.get_nzvc() == '0101'
+        self.psw.set_result('W', 0o1)
+        self.psw.set_psw(psw=0o000010)
+        assert self.psw.get_nzvc() == '1000'
 
     #def test_psw_addb_z(self):
 
@@ -6,9 +6,13 @@
 import logging
 import threading
 
+import pytest
+
 from pdp11_logger import Logger
 from pdp11_config import Config
 from pdp11_hardware import Ram
+from pdp11_hardware import NonExistentMemory
+from pdp11_hardware import LittleEndianWords
 from pdp11_hardware import Registers as reg
 from pdp11_hardware import PSW
 from pdp11_hardware import Stack
@@ -145,4 +149,110 @@ class TestClass():
 
             assert low_byte == expected_low_byte
             assert high_byte == expected_high_byte
-            assert sum == value
\ No newline at end of file
+            assert sum == value
+
+    def test_ram_io_dispatch(self):
+        logging.info('test_ram_io_dispatch')
+        ram = Ram(threading.Lock(), reg, bits=16)
+        written = []
+        ram.register_io_reader(0o177550, lambda: 0o123456)
+        ram.register_io_writer(0o177550, written.append)
+        assert ram.read_word(0o177550) == 0o123456
+        ram.write_word(0o177550, 0o654321 & MASK_WORD)
+        ram.write_byte(0o177550, 0o252)
+        assert written == [0o654321 & MASK_WORD, 0o252]
+        # the device's registers don't go in the shadow RAM
+        assert ram.memory[0o177550] == 0
+        # io page addresses without a device are shadow RAM
+        ram.write_word(0o177552, 0o1234)
+        assert ram.read_word(0o177552) == 0o1234
+        assert ram.read_byte(0o177553) == 0o2
+
+    def test_ram_word_view(self):
+        logging.info('test_ram_word_view')
+        self.ram.write_word(0o4000, 0o123456)
+        assert self.ram.words[0o4000 >> 1] == 0o123456
+        self.ram.words[0o4002 >> 1] = 0o654321 & MASK_WORD
+        assert self.ram.read_byte(0o4002) == 0o654321 & MASK_LOW_BYTE
+        assert self.ram.read_byte(0o4003) == (0o654321 & MASK_HIGH_BYTE) >> 8
+        # what a big-endian host uses instead
+        words = LittleEndianWords(self.ram.memory)
+        assert words[0o4000 >> 1] == 0o123456
+        words[0o4004 >> 1] = 0o1234
+        assert self.ram.read_word(0o4004) == 0o1234
+
+    def test_ram_initial_contents(self):
+        logging.info('test_ram_initial_contents')
+        for bits in [16, 18, 22]:
+            ram = Ram(threading.Lock(), reg, bits=bits)
+            # vectors are filled with 277, the rest of memory and the io page shadow RAM with 0
+            assert ram.read_byte(0) == 0o277
+            assert ram.read_byte(ram.top_of_vector_space - 1) == 0o277
+            assert ram.read_byte(ram.top_of_vector_space) == 0
+            assert ram.read_byte(ram.io_base) == 0
+            assert ram.read_byte_physical(ram.io_space) == 0
+            assert ram.memory[:].count(0o277) == ram.top_of_vector_space
+
+    def test_ram_physical_address(self):
+        logging.info('test_ram_physical_address')
+        ram = Ram(threading.Lock(), reg, bits=18)
+        # the CPU accessors take 16-bit CPU addresses and say where physical ones go
+        with pytest.raises(AssertionError, match='read_byte_physical'):
+            ram.read_byte(ram.io_space)
+        with pytest.raises(AssertionError, match='write_word_physical'):
+            ram.write_word(0o400000, 5)
+        with pytest.raises(AssertionError, match='read_word_physical'):
+            ram.read_word(0o400000)
+        with pytest.raises(AssertionError, match='write_byte_physical'):
+            ram.write_byte(0o400001, 5)
+        ram.write_word_physical(0o400000, 5)
+        assert ram.read_word_physical(0o400000) == 5
+
+    def test_ram_resident_pages(self):
+        logging.info('test_ram_resident_pages')
+        ram = Ram(threading.Lock(), reg, bits=22)
+        # only the page with the vectors has anything in it
+        pages = ram.resident_pages()
+        assert [address for address, page in pages] == [0]
+        assert pages[0][1][:ram.top_of_vector_space] == bytes([0o277]) * ram.top_of_vector_space
+        ram.write_word_physical(0o10000002, 0o1234)
+        assert [address for address, page in ram.resident_pages()] == [0, 0o10000000]
+        assert ram.resident_pages()[1][1][2:4] == bytes([0o234, 0o2])
+
+    def test_ram_blocks(self):
+        logging.info('test_ram_blocks')
+        ram = Ram(threading.Lock(), reg, bits=18)
+        sector = bytes(range(256)) * 2
+        ram.write_block(0o400000, sector)
+        assert ram.read_word(0o2) != 0o1402
+        assert ram.read_word_physical(0o400002) == 0o1402
+        block = ram.read_block(0o400000, len(sector))
+        assert block == sector
+        # the block is a view of memory, not a copy
+        ram.write_byte_physical(0o400000, 0o123)
+        assert block[0] == 0o123
+
+        # writing a block tells the code caches about the words in it
+        invalidated = []
+        ram.watch_code(0o1000, invalidated.append)
+        ram.watch_code(0o1010, invalidated.append)
+        ram.write_block(0o1001, b'\1\2')
+        assert invalidated == [0o1000]
+
+        with pytest.raises(NonExistentMemory):
+            ram.read_block(0o777000, 0o1001)
+        with pytest.raises(NonExistentMemory):
+            ram.write_block(0o777776, b'\0\0\0\0')
+
+    def test_ram_block_io_page(self):
+        logging.info('test_ram_block_io_page')
+        ram = Ram(threading.Lock(), reg, bits=18)
+        written = []
+        ram.register_io_writer(0o777560, written.append)
+        ram.register_io_reader(0o777562, lambda: 0o4321)
+        # a block that runs into the io page goes through its device registers a word at a time
+        ram.write_block(0o777556, bytes([1, 2, 3, 4, 5, 6]))
+        assert ram.read_word_physical(0o777556) == 0o1001
+        assert written == [0o2003]
+        block = ram.read_block(0o777556, 8)
+        assert bytes(block) == bytes([1, 2, 0, 0, 0o321, 0o10, 0, 0])
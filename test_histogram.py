@@ -0,0 +1,82 @@
+"""test_histogram"""
+import csv
+import json
+import logging
+
+from pdp11 import PDP11
+from pdp11_boot import pdp11Boot
+from pdp11_dl11 import Fifo
+
+hello_world = [0o012702, 0o177564,  # 2000 start:  MOV #177564,R2
+               0o012701, 0o002032,  # 2004         MOV #2032,R1
+               0o112100,            # 2010 nxtchr: MOVB (R1)+,R0
+               0o001405,            # 2012         BEQ done
+               0o110062, 0o000002,  # 2014         MOVB R0,2(R2)
+               0o105712,            # 2020 wait:   TSTB (R2)
+               0o100376,            # 2022         BPL wait
+               0o000771,            # 2024         BR nxtchr
+               0o000000,            # 2026 done:   HALT
+               0o000763]            # 2030         BR start
+                                    # 2032         "Hello, World!"
+
+class TestClass():
+    pdp11 = PDP11()
+    boot = pdp11Boot(pdp11.reg, pdp11.ram)
+
+    def run_hello_world(self):
+        self.boot.load_machine_code(hello_world, 0o2000)
+        address = 0o2032
+        for character in "Hello, World!\n" + chr(0):
+            self.pdp11.ram.write_byte(address, ord(character))
+            address = address + 1
+        self.pdp11.reg.set_pc(0o2000, "test_histogram")
+        # a one-character transmit FIFO, so the guest waits for the terminal after every character
+        self.pdp11.dl11.transmit_fifo = Fifo(1)
+        self.pdp11.device_polls.append(self.pdp11.terminal.cycle)
+        self.pdp11.run_until(lambda pdp11: False, 1000000)
+        self.pdp11.device_polls.remove(self.pdp11.terminal.cycle)
+
+    def test_counts(self):
+        logging.info('test_counts')
+        self.pdp11.count_instructions()
+        start = self.pdp11.CPU_cycles
+        self.run_hello_world()
+        histogram = self.pdp11.histogram
+        # every instruction was counted
+        assert histogram.total() == self.pdp11.CPU_cycles - start
+        # 14 characters and the terminating 0
+        assert histogram.counts[0o112100] == 15
+        assert histogram.counts[0o110062] == 14
+        assert histogram.counts[0o000000] == 1
+        assert histogram.counts[0o105712] >= 14
+        assert histogram.total() == sum(count for instruction, count in histogram.instructions())
+        assert histogram.instructions()[0][0] in [0o105712, 0o100376]
+
+        modes = histogram.modes()
+        assert modes[(0o110000, 2, 0)] == 15      # MOVB (R1)+,R0
+        assert modes[(0o110000, 0, 6)] == 14      # MOVB R0,2(R2)
+        assert modes[(0o005700 | 0o100000, 0, 1)] == histogram.counts[0o105712]   # TSTB (R2)
+        histogram.report(5)
+        self.pdp11.count_instructions(False)
+
+    def test_export(self, tmp_path):
+        logging.info('test_export')
+        self.pdp11.count_instructions()
+        self.run_hello_world()
+        histogram = self.pdp11.histogram
+
+        histogram.to_json(tmp_path / 'histogram.json')
+        with open(tmp_path / 'histogram.json') as jsonfile:
+            report = json.load(jsonfile)
+        assert report['total'] == histogram.total()
+        movb = [entry for entry in report['instructions'] if entry['instruction'] == '112100'][0]
+        assert movb['name'] == 'MOVB'
+        assert movb['count'] == 15
+
+        histogram.to_csv(tmp_path / 'histogram.csv')
+        with open(tmp_path / 'histogram.csv', newline='') as csvfile:
+            rows = list(csv.reader(csvfile))
+        assert rows[0] == ['instruction', 'name', 'kind', 'src_mode', 'dst_mode', 'count']
+        assert ['112100', 'MOVB', 'ssdd', '2', '0', '15'] in rows
+        assert ['110000', 'MOVB', '2', '0', '15'] in rows
+        self.pdp11.count_instructions(False)
@@ -0,0 +1,133 @@
+"""test_icache"""
+import logging
+import threading
+
+from pdp11_hardware import Registers as reg
+from pdp11_hardware import Ram
+from pdp11_hardware import PSW
+from pdp11_hardware import Stack
+from pdp11_hardware import AddressModes as am
+
+from pdp11_br_ops import br_ops
+from pdp11_cc_ops import cc_ops
+from pdp11_noopr_ops import noopr_ops
+from pdp11_other_ops import other_ops
+from pdp11_rss_ops import rss_ops
+from pdp11_ss_ops import ss_ops
+from pdp11_ssdd_ops import ssdd_ops
+from pdp11_decode import DecodeTable
+from pdp11_icache import InstructionCache
+
+from stopwatches import StopWatches as sw
+
+class TestClass():
+    reg = reg()
+    ram = Ram(threading.Lock(), reg, 16)
+    psw = PSW(ram)
+    stack = Stack(reg, ram, psw)
+    am = am(reg, ram, psw)
+    sw = sw()
+
+    br_ops = br_ops(reg, ram, psw, sw)
+    cc_ops = cc_ops(psw, sw)
+    noopr_ops = noopr_ops(reg, ram, psw, stack, sw)
+    other_ops = other_ops(reg, ram, psw, am, sw)
+    rss_ops = rss_ops(reg, ram, psw, am, sw)
+    ss_ops = ss_ops(reg, ram, psw, am, sw)
+    ssdd_ops = ssdd_ops(reg, ram, psw, am, sw)
+
+    decode = DecodeTable(cc_ops, br_ops, noopr_ops, ss_ops, rss_ops, ssdd_ops, other_ops)
+    icache = InstructionCache(ram, decode)
+
+    def load(self, code, address):
+        for word in code:
+            self.ram.write_word(address, word)
+            address = address + 2
+
+    def cycle(self):
+        """one instruction the way PDP11.instruction_cycle runs it from the cache"""
+        handler, decoded, words = self.icache.lookup(self.reg.get_pc())
+        self.reg.inc_pc('test')
+        self.am.prefetched = words
+        result = handler(decoded)
+        self.am.prefetched = ()
+        return result
+
+    def test_fill(self):
+        logging.info('test_fill')
+        # MOV #5,R0
+        self.load([0o012700, 0o000005], 0o1000)
+        handler, decoded, words = self.icache.lookup(0o1000)
+        assert handler == self.ssdd_ops.exec_ssdd_op
+        assert decoded.instruction == 0o012700
+        assert words == (0o000005,)
+        hits = self.icache.hits
+        self.icache.lookup(0o1000)
+        assert self.icache.hits == hits + 1
+
+    def test_immediate(self):
+        logging.info('test_immediate')
+        # MOV #5,R0
+        self.load([0o012700, 0o000005], 0o1100)
+        self.reg.set(0, 0)
+        self.reg.set_pc(0o1100)
+        run = self.cycle()
+        assert run
+        assert self.reg.get(0) == 0o5
+        assert self.reg.get_pc() == 0o1104
+
+    def test_write_invalidates(self):
+        logging.info('test_write_invalidates')
+        # MOV #5,R0 then change the immediate word
+        self.load([0o012700, 0o000005], 0o1200)
+        self.reg.set_pc(0o1200)
+        self.cycle()
+        assert self.reg.get(0) == 0o5
+        assert 0o1200 in self.icache.entries
+
+        self.ram.write_word(0o1202, 0o7)
+        assert 0o1200 not in self.icache.entries
+        self.reg.set_pc(0o1200)
+        self.cycle()
+        assert self.reg.get(0) == 0o7
+
+    def test_byte_write_invalidates(self):
+        logging.info('test_byte_write_invalidates')
+        # CLR R0, then make it INC R0 by writing its low byte
+        self.load([0o005000], 0o1300)
+        self.reg.set(0, 0o100)
+        self.reg.set_pc(0o1300)
+        self.cycle()
+        assert self.reg.get(0) == 0
+
+        self.ram.write_byte(0o1300, 0o200)
+        assert 0o1300 not in self.icache.entries
+        self.reg.set_pc(0o1300)
+        self.cycle()
+        assert self.reg.get(0) == 1
+
+    def test_index_modes(self):
+        logging.info('test_index_modes')
+        # MOV 2(R1),4(R1)
+        self.load([0o016161, 0o000002, 0o000004], 0o1400)
+        self.reg.set(1, 0o3000)
+        self.ram.write_word(0o3002, 0o1234)
+        self.reg.set_pc(0o1400)
+        handler, decoded, words = self.icache.lookup(0o1400)
+        assert words == (0o2, 0o4)
+        self.cycle()
+        assert self.ram.read_word(0o3004) == 0o1234
+        assert self.reg.get_pc() == 0o1406
+
+    def test_jmp_absolute(self):
+        logging.info('test_jmp_absolute')
+        # JMP @#2000
+        self.load([0o000137, 0o002000], 0o1500)
+        self.reg.set_pc(0o1500)
+        self.cycle()
+        assert self.reg.get_pc() == 0o2000
+
+    def test_io_page_not_cached(self):
+        logging.info('test_io_page_not_cached')
+        self.ram.register_io_reader(0o177000, self.psw.get_psw)
+        assert self.icache.lookup(0o177000) is None
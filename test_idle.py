@@ -0,0 +1,123 @@
+"""test_idle"""
+import logging
+import threading
+
+from pdp11_hardware import Registers as reg
+from pdp11_hardware import Ram
+from pdp11_hardware import PSW
+from pdp11_hardware import Stack
+from pdp11_hardware import AddressModes as am
+
+from pdp11_br_ops import br_ops
+from pdp11_cc_ops import cc_ops
+from pdp11_noopr_ops import noopr_ops
+from pdp11_other_ops import other_ops
+from pdp11_rss_ops import rss_ops
+from pdp11_ss_ops import ss_ops
+from pdp11_ssdd_ops import ssdd_ops
+from pdp11_decode import DecodeTable
+from pdp11_dl11 import DL11
+from pdp11_idle import IdleLoops
+
+from stopwatches import StopWatches as sw
+
+class TestClass():
+    reg = reg()
+    ram = Ram(threading.Lock(), reg, 16)
+    psw = PSW(ram)
+    stack = Stack(reg, ram, psw)
+    am = am(reg, ram, psw)
+    sw = sw()
+
+    br_ops = br_ops(reg, ram, psw, sw)
+    cc_ops = cc_ops(psw, sw)
+    noopr_ops = noopr_ops(reg, ram, psw, stack, sw)
+    other_ops = other_ops(reg, ram, psw, am, sw)
+    rss_ops = rss_ops(reg, ram, psw, am, sw)
+    ss_ops = ss_ops(reg, ram, psw, am, sw)
+    ssdd_ops = ssdd_ops(reg, ram, psw, am, sw)
+
+    decode = DecodeTable(cc_ops, br_ops, noopr_ops, ss_ops, rss_ops, ssdd_ops, other_ops)
+    dl11 = DL11(ram, 0o177560)
+    idle = IdleLoops(reg, ram, decode)
+
+    def load(self, code, address):
+        for word in code:
+            self.ram.write_word(address, word)
+            address = address + 2
+
+    def test_register_deferred(self):
+        logging.info('test_register_deferred')
+        self.load([0o105712,            # 1000 TSTB (R2)
+                   0o100376], 0o1000)   # 1002 BPL 1000
+        self.reg.set(2, 0o177564)
+        assert self.idle.is_idle(0o1000)
+        # the same loop pointed at ordinary memory isn't waiting for a device
+        self.reg.set(2, 0o2000)
+        assert not self.idle.is_idle(0o1000)
+
+    def test_absolute_and_relative(self):
+        logging.info('test_absolute_and_relative')
+        self.load([0o105737, 0o177560,  # 1100 TSTB @#177560
+                   0o100375], 0o1100)   # 1104 BPL 1100
+        assert self.idle.is_idle(0o1100)
+        self.load([0o032767, 0o000200, 0o176352,    # 1200 BIT #200,177560 (relative)
+                   0o001774], 0o1200)   # 1206 BEQ 1200
+        assert self.idle.is_idle(0o1200)
+        self.load([0o016200, 0o000004,  # 1300 MOV 4(R2),R0
+                   0o100375], 0o1300)   # 1304 BPL 1300
+        assert not self.idle.is_idle(0o1300)
+
+    def test_not_polling(self):
+        logging.info('test_not_polling')
+        self.reg.set(2, 0o177564)
+        self.load([0o105722,            # 1400 TSTB (R2)+
+                   0o100376], 0o1400)   # 1402 BPL 1400
+        assert not self.idle.is_idle(0o1400)
+        self.load([0o105712,            # 1500 TSTB (R2)
+                   0o100001], 0o1500)   # 1502 BPL 1506
+        assert not self.idle.is_idle(0o1500)
+        self.load([0o000777], 0o1600)   # 1600 BR 1600
+        assert not self.idle.is_idle(0o1600)
+
+    def test_invalidate(self):
+        logging.info('test_invalidate')
+        self.load([0o105712,            # 1700 TSTB (R2)
+                   0o100376], 0o1700)   # 1702 BPL 1700
+        self.reg.set(2, 0o177564)
+        assert self.idle.is_idle(0o1700)
+        self.ram.write_word(0o1700, 0o105722)   # TSTB (R2)+
+        assert 0o1700 not in self.idle.loops
+        assert not self.idle.is_idle(0o1700)
+
+    def test_signal(self):
+        logging.info('test_signal')
+        self.ram.io_event.clear()
+        assert not self.ram.wait_io(0.001)
+        # a character arriving wakes a waiting CPU
+        self.dl11.type_character(0o101)
+        assert self.ram.wait_io(1.0)
+        assert not self.ram.io_event.is_set()
+
+    def test_signal_after_timeout(self):
+        logging.info('test_signal_after_timeout')
+        ram = self.ram
+        saved = ram.io_event
+
+        class LateEvent(threading.Event):
+            """a device signals just after the wait times out"""
+            def wait(self, timeout=None):
+                signalled = super().wait(timeout)
+                if not signalled:
+                    ram.signal_io()
+                return signalled
+
+        ram.io_event = LateEvent()
+        try:
+            assert not ram.wait_io(0.001)
+            # the late signal is not lost
+            assert ram.io_event.is_set()
+            assert ram.wait_io(0)
+            assert not ram.io_event.is_set()
+        finally:
+            ram.io_event = saved
@@ -0,0 +1,162 @@
+# test_mmu.py
+# test the pdp11_mmu.py module using pytest
+# pip3 install --upgrade pip
+# pip install -U pytest
+
+import logging
+import threading
+
+import pytest
+
+from pdp11_logger import Logger
+from pdp11_config import Config
+from pdp11_hardware import Ram
+from pdp11_hardware import Registers as reg
+from pdp11_hardware import PSW
+from pdp11_hardware import AddressModes as am
+from pdp11_ss_ops import ss_ops
+from pdp11_disassembler import Disassembler
+from pdp11_mmu import MMU, MMUAbort
+from pdp11_mmu import SR0_ADDRESS, SR2_ADDRESS, SR0_NONRESIDENT, SR0_PAGE_LENGTH, SR0_READ_ONLY
+from stopwatches import StopWatches as sw
+
+KERNEL_PDR = 0o172300
+KERNEL_PAR = 0o172340
+USER_PDR = 0o177600
+USER_PAR = 0o177640
+READ_WRITE = 0o077406   # full-length page, read and write
+READ_ONLY = 0o077402
+
+class TestClass():
+    # assert 'actual' == 'expected'
+    reg = reg()
+    config = Config()
+    Logger()
+    ram = Ram(threading.Lock(), reg, 18)
+    psw = PSW(ram)
+    am = am(reg, ram, psw)
+    sw = sw()
+    disassembler = Disassembler(ram)
+    ss_ops = ss_ops(reg, ram, psw, am, sw, disassembler)
+    mmu = MMU(ram, psw, reg)
+
+    def map_kernel(self):
+        """kernel pages 0-6 map straight through; page 7 is the io page"""
+        for page in range(7):
+            self.ram.write_word(KERNEL_PAR + 2 * page, page * 0o200)
+            self.ram.write_word(KERNEL_PDR + 2 * page, READ_WRITE)
+        self.ram.write_word(KERNEL_PAR + 0o16, 0o7600)
+        self.ram.write_word(KERNEL_PDR + 0o16, READ_WRITE)
+        self.psw.set_psw(psw=0)
+
+    def test_io_page(self):
+        logging.info('test_io_page')
+        # Without memory management, the top 8kB of the CPU's addresses are the io page at the top of memory.
+        assert self.ram.io_space == 0o760000
+        assert self.ram.physical(0o177560) == 0o777560
+        self.ram.write_word(0o160000, 0o1234)
+        assert self.ram.memory[0o760000] == 0o234
+        assert self.ram.read_word(0o160000) == 0o1234
+        assert self.ram.read_word(0o177776) == self.psw.psw
+
+    def test_translate(self):
+        logging.info('test_translate')
+        self.map_kernel()
+        self.ram.write_word(KERNEL_PAR, 0o1000)
+        self.ram.write_word(SR0_ADDRESS, 1)
+        try:
+            assert self.mmu.enabled
+            self.ram.write_word(0o100, 0o4321)
+            assert self.ram.memory[0o100101] == 0o4321 >> 8
+            assert self.ram.read_word(0o100) == 0o4321
+            self.ram.write_byte(0o103, 0o77)
+            assert self.ram.memory[0o100103] == 0o77
+            # the io page through kernel page 7
+            assert self.ram.read_word(0o177776) == self.psw.psw
+            # writing a page register drops its translation
+            self.ram.write_word(KERNEL_PAR, 0o2000)
+            self.ram.write_word(0o100, 0o1111)
+            assert self.ram.words[0o200100 >> 1] == 0o1111
+            assert self.ram.words[0o100100 >> 1] == 0o4321
+        finally:
+            self.ram.write_word(SR0_ADDRESS, 0)
+        assert not self.mmu.enabled
+        assert self.ram.read_word(0o100) != 0o1111
+
+    def test_abort(self):
+        logging.info('test_abort')
+        self.map_kernel()
+        self.ram.write_word(KERNEL_PDR + 2, READ_ONLY)
+        self.ram.write_word(KERNEL_PDR + 4, 0o000000)
+        # page 3 is 0o200 bytes long
+        self.ram.write_word(KERNEL_PDR + 6, 0o000406)
+        self.ram.write_word(SR0_ADDRESS, 1)
+        try:
+            self.ram.read_word(0o20000)
+            with pytest.raises(MMUAbort):
+                self.ram.write_word(0o20000, 1)
+            assert self.mmu.sr0 & SR0_READ_ONLY
+            assert (self.mmu.sr0 >> 1) & 0o7 == 1
+            with pytest.raises(MMUAbort):
+                self.ram.read_word(0o40000)
+            assert self.mmu.sr0 & SR0_NONRESIDENT
+            self.ram.read_word(0o60176)
+            with pytest.raises(MMUAbort):
+                self.ram.read_word(0o60200)
+            assert self.mmu.sr0 & SR0_PAGE_LENGTH
+        finally:
+            self.ram.write_word(SR0_ADDRESS, 0)
+
+    def test_peek_aborting_page(self):
+        logging.info('test_peek_aborting_page')
+        self.map_kernel()
+        # page 2 is not resident; page 3 is 0o200 bytes long
+        self.ram.write_word(KERNEL_PDR + 4, 0o000000)
+        self.ram.write_word(KERNEL_PDR + 6, 0o000406)
+        self.ram.write_word(0o1000, 0o012700)   # MOV #20000,R0
+        self.ram.write_word(0o1002, 0o020000)
+        self.ram.write_word(SR0_ADDRESS, 1)
+        try:
+            sr0 = self.ram.read_word(SR0_ADDRESS)
+            sr2 = self.ram.read_word(SR2_ADDRESS)
+            # disassembling and dumping through pages the kernel can't read leaves SR0 and SR2 alone
+            assert self.disassembler.disassemble(0o1000)[1] == 'MOV #20000,R0'
+            self.disassembler.disassemble_range(0o37770, 0o40010)
+            self.disassembler.disassemble_range(0o60170, 0o60210)
+            assert self.ram.peek_word(0o40000) == 0
+            assert self.ram.peek_word(0o60200) == 0
+            assert self.ram.read_word(SR0_ADDRESS) == sr0
+            assert self.ram.read_word(SR2_ADDRESS) == sr2
+        finally:
+            self.ram.write_word(SR0_ADDRESS, 0)
+
+    def test_previous_space(self):
+        logging.info('test_previous_space')
+        self.map_kernel()
+        # user page 0 is at 0o300000
+        self.ram.write_word(USER_PAR, 0o3000)
+        self.ram.write_word(USER_PDR, READ_WRITE)
+        self.ram.write_word(SR0_ADDRESS, 1)
+        try:
+            # kernel mode, previous mode user
+            self.psw.set_psw(psw=0o030000)
+            self.ram.words[0o300200 >> 1] = 0o123456
+            self.reg.set_sp(0o1000)
+            self.reg.set(1, 0o200)
+            self.reg.set_pc(0o2000)
+            self.ss_ops.do_ss_op(0o006511)   # MFPI (R1)
+            assert self.reg.get_sp() == 0o776
+            assert self.ram.read_word(0o776) == 0o123456
+            assert self.psw.get_n() == 1
+
+            self.ram.write_word(0o776, 0o654)
+            self.reg.set_pc(0o2000)
+            self.ss_ops.do_ss_op(0o106621)   # MTPD (R1)+
+            assert self.reg.get_sp() == 0o1000
+            assert self.reg.get(1) == 0o202
+            assert self.ram.words[0o300200 >> 1] == 0o654
+            assert self.ram.read_word(0o200) != 0o654
+            assert self.psw.get_z() == 0
+        finally:
+            self.ram.write_word(SR0_ADDRESS, 0)
+            self.psw.set_psw(psw=0)
@@ -0,0 +1,80 @@
+"""test_profiler"""
+import logging
+
+from pdp11 import PDP11
+from pdp11_profiler import Profiler
+from pdp11_profiler import Symbols
+
+hello_world = [0o012702, 0o177564,  # 2000 start:  MOV #177564,R2
+               0o012701, 0o002032,  # 2004         MOV #2032,R1
+               0o112100,            # 2010 nxtchr: MOVB (R1)+,R0
+               0o001405,            # 2012         BEQ done
+               0o110062, 0o000002,  # 2014         MOVB R0,2(R2)
+               0o105712,            # 2020 wait:   TSTB (R2)
+               0o100376,            # 2022         BPL wait
+               0o000771,            # 2024         BR nxtchr
+               0o000000,            # 2026 done:   HALT
+               0o000763]            # 2030         BR start
+                                    # 2032 string: "Hello, World!"
+
+class TestClass():
+    pdp11 = PDP11()
+
+    def test_helloworld_listing(self):
+        logging.info('test_helloworld_listing')
+        symbols = Symbols()
+        symbols.read_listing('source/helloworld.txt')
+        # start: is on a line by itself, wait: shares a line with its instruction
+        assert symbols.lookup(0o2000) == 'start'
+        assert symbols.lookup(0o2020) == 'wait'
+        assert symbols.lookup(0o2022) == 'wait+2'
+        assert symbols.lookup(0o1000) == '001000'
+
+    def test_macro11_listing(self):
+        logging.info('test_macro11_listing')
+        symbols = Symbols()
+        symbols.read_listing('source/23-248F1.lst')
+        assert symbols.lookup(0o165004) == 'data1'
+        # DIAG: and T1: both label 165020; the first one is kept
+        assert symbols.lookup(0o165020) == 'DIAG'
+        # 1$: is local, so it counts toward nxtcmd
+        assert symbols.routine(0o165234) == 'nxtcmd'
+
+    def test_rom_listing(self):
+        logging.info('test_rom_listing')
+        symbols = Symbols()
+        symbols.read_listing('source/M9301-YA.txt')
+        assert symbols.lookup(0o165000) == 'DIAGS'
+        assert symbols.lookup(0o165074) == 'JMPT'
+
+    def test_sampling(self):
+        logging.info('test_sampling')
+        profiler = Profiler(3)
+        for i in range(9):
+            profiler.count(0o2000 + 2 * (i % 3))
+        # every third instruction is the one at 2004
+        assert profiler.hot_spots() == [(0o2004, 3)]
+
+    def test_profile_hello_world(self):
+        logging.info('test_profile_hello_world')
+        self.pdp11.profile(1, ['source/helloworld.txt'])
+        self.pdp11.boot.load_machine_code(hello_world, 0o2000)
+        address = 0o2032
+        for character in "Hello, World!\n" + chr(0):
+            self.pdp11.ram.write_byte(address, ord(character))
+            address = address + 1
+        self.pdp11.reg.set_pc(0o2000, "test_profile_hello_world")
+        self.pdp11.device_polls.append(self.pdp11.terminal.cycle)
+        assert not self.pdp11.run_until(lambda pdp11: False, 1000000)
+        self.pdp11.device_polls.remove(self.pdp11.terminal.cycle)
+
+        profiler = self.pdp11.profiler
+        assert profiler.total() > 0
+        profile = profiler.flat_profile()
+        routines = [routine for routine, count, percent, cumulative in profile]
+        assert set(routines) <= {'start', 'nxtchr', 'wait', 'done'}
+        assert profile[-1][3] == 100.0
+        # MOVB (R1)+,R0 runs once for each of the 14 characters and the 0
+        assert profiler.samples[0o2010 >> 1] == 15
+        profiler.report(5, self.pdp11.disassembler)
+        self.pdp11.profile(0)
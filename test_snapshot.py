@@ -0,0 +1,74 @@
+"""test_snapshot"""
+import logging
+
+import pytest
+
+from pdp11 import PDP11
+from pdp11_boot import pdp11Boot
+import pdp11_snapshot
+from pdp11_serial import Serial
+
+class TestClass():
+
+    def test_warm_start(self, tmp_path):
+        logging.info('test_warm_start')
+        script = 'ONE\rTWO\r'
+        pdp11 = PDP11()
+        boot = pdp11Boot(pdp11.reg, pdp11.ram)
+        boot.load_machine_code(boot.echo, boot.echo_address)
+        serial = Serial(pdp11.dl11, script)
+        pdp11.device_polls.append(serial.poll)
+        pdp11.run_until(lambda pdp11: len(serial.output) >= 4, 100000)
+        pdp11.save_snapshot(tmp_path / 'echo.snapshot')
+        typed = serial.typed
+        output = len(serial.output)
+        registers = list(pdp11.reg.get_register_file())
+        psw = pdp11.psw.psw
+        pdp11.run_until(lambda pdp11: len(serial.output) == len(script), 100000)
+        assert serial.text() == script
+
+        # a new machine picks up where the first one was when the snapshot was saved
+        warm = PDP11()
+        memory = warm.ram.memory
+        warm.load_snapshot(tmp_path / 'echo.snapshot')
+        assert warm.reg.get_register_file() == registers
+        assert warm.psw.psw == psw
+        assert warm.ram.read_word(boot.echo_address) == boot.echo[0]
+        warm_serial = Serial(warm.dl11, script)
+        warm_serial.typed = typed
+        warm.device_polls.append(warm_serial.poll)
+        warm.run_until(lambda pdp11: len(warm_serial.output) == len(script) - output, 100000)
+        assert warm_serial.text() == script[output:]
+        # the memory it replaced is closed
+        assert memory.closed
+        # memory is the snapshot's copy; writing it doesn't change the file
+        warm.ram.write_word(0o100, 0o1234)
+        again = PDP11()
+        again.load_snapshot(tmp_path / 'echo.snapshot')
+        assert again.ram.read_word(0o100) != 0o1234
+
+    def test_not_a_snapshot(self, tmp_path):
+        logging.info('test_not_a_snapshot')
+        pdp11 = PDP11()
+        file = tmp_path / 'not.snapshot'
+        file.write_bytes(bytes(pdp11_snapshot.HEADER.size))
+        with pytest.raises(ValueError):
+            pdp11.load_snapshot(file)
+
+    def test_dl11_fifos(self, tmp_path):
+        logging.info('test_dl11_fifos')
+        pdp11 = PDP11()
+        for character in 'TYPED':
+            pdp11.dl11.type_character(ord(character))
+        pdp11.ram.write_word(pdp11.dl11.XBUF_address, ord('X'))
+        pdp11.save_snapshot(tmp_path / 'fifos.snapshot')
+
+        warm = PDP11()
+        receive_fifo = warm.dl11.receive_fifo
+        warm.dl11.type_character(ord('Z'))
+        warm.load_snapshot(tmp_path / 'fifos.snapshot')
+        # a terminal attached to the DL11 keeps the same queues
+        assert warm.dl11.receive_fifo is receive_fifo
+        assert warm.dl11.receive_fifo.contents() == [ord(character) for character in 'TYPED']
+        assert warm.dl11.transmitted_character() == ord('X')
+        assert warm.dl11.transmitted_character() is None
@@ -14,6 +14,7 @@ from pdp11_other_ops import other_ops
 from pdp11_rss_ops import rss_ops
 from pdp11_ss_ops import ss_ops
 from pdp11_ssdd_ops import ssdd_ops
+from pdp11_disassembler import Disassembler
 
 from stopwatches import StopWatches as sw
 
@@ -30,14 +31,15 @@ class TestClass():
     stack = Stack(reg, ram, psw)
     am = am(reg, ram, psw)
     sw = sw()
+    disassembler = Disassembler(ram)
 
-    br_ops = br_ops(reg, ram, psw, sw)
-    cc_ops = cc_ops(psw, sw)
-    noopr_ops = noopr_ops(reg, ram, psw, stack, sw)
-    other_ops = other_ops(reg, ram, psw, am, sw)
-    rss_ops = rss_ops(reg, ram, psw, am, sw)
-    ss_ops = ss_ops(reg, ram, psw, am, sw)
-    ssdd_ops = ssdd_ops(reg, ram, psw, am, sw)
+    br_ops = br_ops(reg, ram, psw, sw, disassembler)
+    cc_ops = cc_ops(psw, sw, disassembler)
+    noopr_ops = noopr_ops(reg, ram, psw, stack, sw, disassembler)
+    other_ops = other_ops(reg, ram, psw, am, sw, disassembler)
+    rss_ops = rss_ops(reg, ram, psw, am, sw, disassembler)
+    ss_ops = ss_ops(reg, ram, psw, am, sw, disassembler)
+    ssdd_ops = ssdd_ops(reg, ram, psw, am, sw, disassembler)
 
     def test_byte_mask_w(self):
         logging.info('\ntest_byte_mask_w')
@@ -425,3 +427,28 @@ class TestClass():
         assert r1 == 0b1110011000011001
         condition_codes = self.psw.get_nzvc()
         assert condition_codes == "0011" # NZVC  I think it shoud be 1010
+
+    def test_MFPS_register(self):
+        logging.info('\ntest_MFPS_register')
+        # register mode sign-extends PSW bit 7 through the high byte
+        self.psw.set_psw(psw=0o000210)
+        self.reg.set(0, 0o012345)
+        instruction = 0o106700  # MFPS R0
+        assert self.ss_ops.is_ss_op(instruction)
+        run, operand1, operand2, assembly, report = self.ss_ops.do_ss_op(instruction)
+        assert assembly == "MFPS R0"
+        assert self.reg.get(0) == 0o177610
+        condition_codes = self.psw.get_nzvc()
+        assert condition_codes == "1000" # NZVC
+
+    def test_MFPS_memory(self):
+        logging.info('\ntest_MFPS_memory')
+        # a byte in memory gets only the low byte
+        self.psw.set_psw(psw=0o000210)
+        self.reg.set(1, 0o2000)
+        self.ram.write_word(0o2000, 0o052525)
+        instruction = 0o106711  # MFPS (R1)
+        assert self.ss_ops.is_ss_op(instruction)
+        run, operand1, operand2, assembly, report = self.ss_ops.do_ss_op(instruction)
+        assert assembly == "MFPS (R1)"
+        assert self.ram.read_word(0o2000) == 0o052610
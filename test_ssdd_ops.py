@@ -16,6 +16,7 @@ from pdp11_other_ops import other_ops
 from pdp11_rss_ops import rss_ops
 from pdp11_ss_ops import ss_ops
 from pdp11_ssdd_ops import ssdd_ops
+from pdp11_disassembler import Disassembler
 
 from stopwatches import StopWatches as sw
 
@@ -40,14 +41,15 @@ class TestClass():
     stack = Stack(reg, ram, psw)
     am = am(reg, ram, psw)
     sw = sw()
+    disassembler = Disassembler(ram)
 
-    br_ops = br_ops(reg, ram, psw, sw)
-    cc_ops = cc_ops(psw, sw)
-    noopr_ops = noopr_ops(reg, ram, psw, stack, sw)
-    other_ops = other_ops(reg, ram, psw, am, sw)
-    rss_ops = rss_ops(reg, ram, psw, am, sw)
-    ss_ops = ss_ops(reg, ram, psw, am, sw)
-    ssdd_ops = ssdd_ops(reg, ram, psw, am, sw)
+    br_ops = br_ops(reg, ram, psw, sw, disassembler)
+    cc_ops = cc_ops(psw, sw, disassembler)
+    noopr_ops = noopr_ops(reg, ram, psw, stack, sw, disassembler)
+    other_ops = other_ops(reg, ram, psw, am, sw, disassembler)
+    rss_ops = rss_ops(reg, ram, psw, am, sw, disassembler)
+    ss_ops = ss_ops(reg, ram, psw, am, sw, disassembler)
+    ssdd_ops = ssdd_ops(reg, ram, psw, am, sw, disassembler)
 
     def SS(self, mode, register):
         return (mode << 3 | register) << 6
@@ -268,7 +270,7 @@ class TestClass():
         self.reg.set_pc(0o165250)
         assert self.ssdd_ops.is_ssdd_op(instruction)
         run, operand1, operand2, assembly, report = self.ssdd_ops.do_ssdd_op(instruction)
-        assert assembly == "MOVB (R5)+,@R2"
+        assert assembly == "MOVB (R5)+,(R2)"
         assert self.reg.get(5) == 0o165321
         atr2  = self.ram.read_byte(self.reg.get(2))
         logging.info(f'@R2={oct(atr2)} {bin(atr2)}')
@@ -462,7 +464,7 @@ class TestClass():
         assert self.ssdd_ops.is_ssdd_op(instruction)
         run, operand1, operand2, assembly, report = self.ssdd_ops.do_ssdd_op(instruction)
         logging.info('assembly:'+assembly)
-        assert assembly == 'SUB R4,R6'
+        assert assembly == 'SUB R4,SP'
 
     def test_SUB_zp_N(self): #1 zero minus small positive
         logging.info('test_SUB_zp_N')
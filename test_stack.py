@@ -15,6 +15,7 @@ from pdp11_other_ops import other_ops
 from pdp11_rss_ops import rss_ops
 from pdp11_ss_ops import ss_ops
 from pdp11_ssdd_ops import ssdd_ops
+from pdp11_disassembler import Disassembler
 
 from stopwatches import StopWatches as sw
 
@@ -31,14 +32,15 @@ class TestClass():
     stack = Stack(reg, ram, psw)
     am = am(reg, ram, psw)
     sw = sw()
-
-    br_ops = br_ops(reg, ram, psw, sw)
-    cc_ops = cc_ops(psw, sw)
-    noopr_ops = noopr_ops(reg, ram, psw, stack, sw)
-    other_ops = other_ops(reg, ram, psw, am, sw)
-    rss_ops = rss_ops(reg, ram, psw, am, sw)
-    ss_ops = ss_ops(reg, ram, psw, am, sw)
-    ssdd_ops = ssdd_ops(reg, ram, psw, am, sw)
+    disassembler = Disassembler(ram)
+
+    br_ops = br_ops(reg, ram, psw, sw, disassembler)
+    cc_ops = cc_ops(psw, sw, disassembler)
+    noopr_ops = noopr_ops(reg, ram, psw, stack, sw, disassembler)
+    other_ops = other_ops(reg, ram, psw, am, sw, disassembler)
+    rss_ops = rss_ops(reg, ram, psw, am, sw, disassembler)
+    ss_ops = ss_ops(reg, ram, psw, am, sw, disassembler)
+    ssdd_ops = ssdd_ops(reg, ram, psw, am, sw, disassembler)
 
     def test_jsr_R5(self):
         # pdp11-40 4-58
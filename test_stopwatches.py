@@ -0,0 +1,135 @@
+"""test_stopwatches"""
+import json
+import logging
+import time
+
+from stopwatches import StopWatches
+from stopwatches import BUCKETS
+from stopwatches import bucket_index
+from stopwatches import bucket_range
+
+class TestClass():
+
+    def test_enabled(self):
+        logging.info('test_enabled')
+        sw = StopWatches()
+        for i in range(5):
+            sw.start('section')
+            sw.stop('section')
+        assert sw.get_watch('section').get_count() == 5
+
+    def test_disabled(self):
+        logging.info('test_disabled')
+        sw = StopWatches(enabled=False)
+        sw.start('section')
+        sw.stop('section')
+        assert sw.stop_watch_dict == {}
+        # record still records
+        sw.record('run', time.clock_gettime_ns(time.CLOCK_MONOTONIC))
+        assert sw.get_watch('run').get_count() == 1
+        # turning it back on
+        sw.set_mode(True)
+        sw.start('section')
+        sw.stop('section')
+        assert sw.get_watch('section').get_count() == 1
+
+    def test_sampled(self):
+        logging.info('test_sampled')
+        sw = StopWatches(sample=4)
+        for i in range(10):
+            sw.start('section')
+            sw.stop('section')
+        watch = sw.get_watch('section')
+        # calls 1, 5 and 9 were timed
+        assert watch.count == 3
+        assert watch.get_count() == 10
+        assert watch.get_sum() == watch.get_mean() * 10
+        assert watch.to_string().split()[5] == '10'
+
+    def test_buckets(self):
+        logging.info('test_buckets')
+        # the buckets cover every duration without gaps, each within 1/16 of its value
+        previous_high = -1
+        for index in range(BUCKETS - 1):
+            low, high = bucket_range(index)
+            assert low == previous_high + 1
+            assert high - low <= max(low // 16, 0) + 1
+            assert bucket_index(low) == index
+            assert bucket_index(high) == index
+            previous_high = high
+
+    def test_percentiles(self):
+        logging.info('test_percentiles')
+        sw = StopWatches()
+        for duration in range(1, 1001):
+            sw.record('section', time.clock_gettime_ns(time.CLOCK_MONOTONIC) - duration * 1000000)
+        watch = sw.get_watch('section')
+        # 1 ms to 1000 ms; every recorded duration is a little over its nominal value
+        assert 500000000 <= watch.get_percentile(50) <= 500000000 * 17 / 16 + 1000000
+        assert 990000000 <= watch.get_percentile(99) <= 990000000 * 17 / 16 + 1000000
+        assert watch.get_percentile(99.9) <= watch.get_max()
+
+    def test_nesting(self, tmp_path):
+        logging.info('test_nesting')
+        sw = StopWatches(histograms=True)
+        for i in range(3):
+            sw.start('instruction_cycle')
+            sw.start('ssdd')
+            sw.stop('ssdd')
+            sw.stop('instruction_cycle')
+        sw.start('report')
+        sw.stop('report')
+        tree = [(depth, watch.get_id()) for depth, watch in sw.tree()]
+        assert tree == [(0, 'instruction_cycle'), (1, 'ssdd'), (0, 'report')]
+        assert sw.get_watch('ssdd').parent == 'instruction_cycle'
+        assert sw.get_watch('ssdd').to_string(1).startswith('  ssdd ')
+        sw.report()
+
+        sw.to_json(tmp_path / 'stopwatches.json')
+        with open(tmp_path / 'stopwatches.json') as jsonfile:
+            watches = json.load(jsonfile)
+        assert [watch['id'] for watch in watches] == ['instruction_cycle', 'ssdd', 'report']
+        assert watches[1]['parent'] == 'instruction_cycle'
+        assert watches[1]['count'] == 3
+        assert sum(bucket[2] for bucket in watches[1]['buckets']) == 3
+        assert set(watches[1]['percentiles']) == {'50', '90', '99', '99.9'}
+
+    def test_plain(self):
+        logging.info('test_plain')
+        # without sampling or histograms, start and stop keep only the totals
+        sw = StopWatches()
+        sw.start('instruction_cycle')
+        sw.start('ssdd')
+        sw.stop('ssdd')
+        sw.stop('instruction_cycle')
+        sw.start('instruction_cycle')
+        sw.start('ssdd')
+        sw.stop('ssdd')
+        sw.stop('instruction_cycle')
+        sw.start('report')
+        sw.stop('report')
+        # the first start of each one decides where it goes in the tree
+        assert sw.get_watch('ssdd').parent == 'instruction_cycle'
+        assert sw.get_watch('report').parent is None
+        tree = [(depth, watch.get_id()) for depth, watch in sw.tree()]
+        assert tree == [(0, 'instruction_cycle'), (1, 'ssdd'), (0, 'report')]
+        assert sw.get_watch('ssdd').get_count() == 2
+        assert sw.get_watch('ssdd').get_percentile(50) == -1
+        assert sw.running.current is None
+
+    def test_nesting_modes(self):
+        logging.info('test_nesting_modes')
+        # the way instruction_cycle runs in pdp11: a different op StopWatch inside it each time
+        for mode in [{}, {'sample': 100}, {'histograms': True}]:
+            sw = StopWatches(**mode)
+            for op in ['ssdd', 'ssdd', 'br', 'ss', 'br', 'noopr']:
+                sw.start('instruction_cycle')
+                sw.start(op)
+                sw.stop(op)
+                sw.stop('instruction_cycle')
+            sw.start('report')
+            sw.stop('report')
+            tree = [(depth, watch.get_id()) for depth, watch in sw.tree()]
+            assert tree == [(0, 'instruction_cycle'), (1, 'ssdd'), (1, 'br'), (1, 'ss'), (1, 'noopr'),
+                            (0, 'report')]
+            assert sw.running.current is None
@@ -0,0 +1,73 @@
+"""test_trace"""
+import logging
+
+from pdp11 import PDP11
+from pdp11_boot import pdp11Boot
+from pdp11_trace import InstructionTrace
+from pdp11_trace import RECORD
+from pdp11_trace import read_trace
+from pdp11_trace import decode_trace
+
+count_down = [0o012700, 0o000005,  # 1000 start: MOV #5,R0
+              0o005300,            # 1004 loop:  DEC R0
+              0o001376,            # 1006        BNE loop
+              0o000000]            # 1010        HALT
+
+negate = [0o012700, 0o000005,  # 1000 MOV #5,R0
+          0o005400,            # 1004 NEG R0
+          0o000000]            # 1006 HALT
+
+class TestClass():
+    pdp11 = PDP11()
+    boot = pdp11Boot(pdp11.reg, pdp11.ram)
+
+    def test_ring(self):
+        logging.info('test_ring')
+        trace = InstructionTrace(3)
+        for cycle in range(5):
+            trace.append(cycle, 0o1000 + 2 * cycle, b'\x00\x00', [cycle] * 8, 0)
+        assert trace.count == 5
+        records = trace.records()
+        # only the last three are left, oldest first
+        assert len(records) == 3 * RECORD.size
+        assert records[0] == 2
+
+    def test_dump_on_halt(self, tmp_path):
+        logging.info('test_dump_on_halt')
+        self.boot.load_machine_code(count_down, 0o1000)
+        self.pdp11.trace_file = tmp_path / 'pdp11.trace'
+        self.pdp11.trace_instructions(4)
+        start = self.pdp11.CPU_cycles
+        assert not self.pdp11.run_until(lambda pdp11: False, 1000)
+        self.pdp11.trace_instructions(0)
+
+        records = read_trace(tmp_path / 'pdp11.trace')
+        assert len(records) == 4
+        # BNE, the last DEC and BNE, and the HALT, with the registers after each, counted from 0
+        assert [record[0] - start for record in records] == [8, 9, 10, 11]
+        assert [record[1] for record in records] == [0o1006, 0o1004, 0o1006, 0o1010]
+        cycle, pc, code, *registers, psw = records[1]
+        assert code[:2] == bytes([0o300, 0o012])
+        assert registers[0] == 0
+        assert psw & 0o4
+
+        lines = decode_trace(tmp_path / 'pdp11.trace')
+        assert lines[1].split(';')[0].split() == [str(start + 9), '001004', '005300', 'DEC', 'R0']
+        assert lines[1].endswith('NZVC:0100')
+        assert 'HALT' in lines[3]
+
+    def test_negative_register(self, tmp_path):
+        logging.info('test_negative_register')
+        # NEG leaves R0 below 0; the trace keeps it and reads it back
+        self.boot.load_machine_code(negate, 0o1000)
+        self.pdp11.trace_file = tmp_path / 'pdp11.trace'
+        self.pdp11.trace_instructions(100)
+        assert not self.pdp11.run_until(lambda pdp11: False, 1000)
+        self.pdp11.trace_instructions(0)
+
+        records = read_trace(tmp_path / 'pdp11.trace')
+        assert [record[1] for record in records] == [0o1000, 0o1004, 0o1006]
+        cycle, pc, code, *registers, psw = records[1]
+        assert registers[0] == self.pdp11.reg.get(0) < 0
+        lines = decode_trace(tmp_path / 'pdp11.trace')
+        assert lines[1].split(';')[1].split()[0] == '177773'
@@ -0,0 +1,83 @@
+"""test_tracecheck"""
+import gzip
+import logging
+
+from pdp11 import PDP11
+from pdp11_boot import pdp11Boot
+from pdp11_tracecheck import TraceChecker
+from pdp11_tracecheck import read_step
+from pdp11_tracecheck import MAGIC
+from pdp11_mmu import MMU
+
+count_down = [0o012700, 0o000144,  # 1000 start: MOV #100.,R0
+              0o012701, 0o002000,  # 1004        MOV #2000,R1
+              0o010021,            # 1010 loop:  MOV R0,(R1)+
+              0o005300,            # 1012        DEC R0
+              0o001375,            # 1014        BNE loop
+              0o000000]            # 1016        HALT
+
+mapping = [0o012737, 0o000001, 0o177572,   # 1000 MOV #1,@#177572     turn memory management on
+           0o012737, 0o000123, 0o002000,   # 1006 MOV #123,@#2000
+           0o005037, 0o177572,             # 1014 CLR @#177572        and off
+           0o012737, 0o000456, 0o002002,   # 1020 MOV #456,@#2002
+           0o000000]                       # 1026 HALT
+
+class TestClass():
+    pdp11 = PDP11()
+    boot = pdp11Boot(pdp11.reg, pdp11.ram)
+    checker = TraceChecker(pdp11)
+
+    def load(self):
+        # record and verify have to start from the same state
+        for register in range(6):
+            self.pdp11.reg.set(register, 0)
+        self.boot.load_machine_code(count_down, 0o1000)
+
+    def test_verify(self, tmp_path):
+        logging.info('test_verify')
+        self.load()
+        assert self.checker.record(tmp_path / 'golden.trace') == 303
+        self.load()
+        self.pdp11.use_blocks = False
+        assert self.checker.verify(tmp_path / 'golden.trace') is None
+        # the loop is compiled after it has run a few times
+        self.load()
+        self.pdp11.use_blocks = True
+        assert self.checker.verify(tmp_path / 'golden.trace') is None
+        # Ram is back the way it was
+        assert 'write_word' not in self.pdp11.ram.__dict__
+
+    def test_difference(self, tmp_path):
+        logging.info('test_difference')
+        self.load()
+        self.checker.record(tmp_path / 'golden.trace')
+        # count down from 101 instead
+        self.load()
+        self.pdp11.ram.write_word(0o1002, 0o145)
+        difference = self.checker.verify(tmp_path / 'golden.trace')
+        lines = difference.split('\n')
+        assert lines[0] == 'after 0 instructions:'
+        assert lines[1].startswith('golden  001000 012700 MOV #145,R0')
+        assert lines[3] == 'R0: golden 000144 actual 000145'
+
+    def test_mapping_during_run(self, tmp_path):
+        logging.info('test_mapping_during_run')
+        pdp11 = PDP11()
+        # kernel pages map straight through; page 7 is the io page
+        pdp11.mmu = MMU(pdp11.ram, pdp11.psw, pdp11.reg, pdp11.mapping_changed)
+        for page in range(8):
+            pdp11.ram.write_word(0o172340 + 2 * page, page * 0o200 if page < 7 else 0o7600)
+            pdp11.ram.write_word(0o172300 + 2 * page, 0o077406)
+        pdp11Boot(pdp11.reg, pdp11.ram).load_machine_code(mapping, 0o1000)
+        pdp11.use_blocks = False
+        checker = TraceChecker(pdp11)
+        assert checker.record(tmp_path / 'golden.trace') == 5
+
+        with gzip.open(tmp_path / 'golden.trace', 'rb') as golden:
+            assert golden.read(len(MAGIC)) == MAGIC
+            writes = [read_step(golden).writes for step in range(5)]
+        # every write is noted once, whether memory management is on or not
+        assert writes == [[(0o177572, 1, 2)], [(0o2000, 0o123, 2)], [(0o177572, 0, 2)], [(0o2002, 0o456, 2)], []]
+        assert not pdp11.mmu.enabled
+        for name in ['write_byte', 'write_word', 'write_byte_physical', 'write_word_physical']:
+            assert name not in pdp11.ram.__dict__